@@ -0,0 +1,80 @@
+"""Encode/decode del Compressed JSON: json.dumps/loads de antes contra scripts.codec (stdlib, orjson, zlib).
+
+    python -m benchmarks.bench_codec --profiles 5000 --experiences 40
+"""
+import argparse
+import json
+import random
+import time
+from typing import Callable, Dict, List
+
+
+def _time_per_item(fn: Callable, items: List, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for item in items:
+            fn(item)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(items) * 1e6
+
+
+def _datasets(n: int, experiences: int) -> Dict[str, List[Dict]]:
+    from .stub_airtable import synthetic_applicant
+
+    rnd = random.Random(7)
+    small = [{k: v for k, v in synthetic_applicant(i, rnd).items() if k != "Applicant ID"} for i in range(n)]
+    # Long careers: the profiles that get close to Airtable's 100k-character long text limit
+    large = []
+    for p in small[:max(n // 10, 1)]:
+        history = [dict(e, Title=f"{e['Title']} {j}") for j in range(experiences) for e in p["experience"][:1]]
+        large.append({**p, "experience": history})
+    return {f"synthetic x{len(small)}": small, f"long careers x{len(large)}": large}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=5000)
+    parser.add_argument("--experiences", type=int, default=40, help="Jobs per profile in the long-careers set")
+    parser.add_argument("--repeat", type=int, default=3, help="Best of N passes")
+    args = parser.parse_args()
+
+    from scripts import codec
+
+    variants = [("json (before)", lambda p: json.dumps(p, ensure_ascii=False), json.loads)]
+    if codec.orjson is not None:
+        variants.append(("codec orjson", lambda p: codec.encode(p, "json"), codec.decode))
+    else:
+        print("orjson not installed: the codec runs on the stdlib json module")
+
+    def stdlib_encode(p):
+        backend, codec.orjson = codec.orjson, None
+        try:
+            return codec.encode(p, "json")
+        finally:
+            codec.orjson = backend
+
+    def stdlib_decode(text):
+        backend, codec.orjson = codec.orjson, None
+        try:
+            return codec.decode(text)
+        finally:
+            codec.orjson = backend
+
+    variants.append(("codec stdlib", stdlib_encode, stdlib_decode))
+    variants.append(("codec zlib", lambda p: codec.encode(p, "zlib", 0), codec.decode))
+
+    print(f"\n{'dataset':<24}{'codec':<15}{'encode us':>11}{'decode us':>11}{'avg chars':>11}{'max chars':>11}")
+    for name, profiles in _datasets(args.profiles, args.experiences).items():
+        for label, enc, dec in variants:
+            texts = [enc(p) for p in profiles]
+            assert all(dec(t) == p for t, p in zip(texts[:50], profiles[:50])), label
+            enc_us = _time_per_item(enc, profiles, args.repeat)
+            dec_us = _time_per_item(dec, texts, args.repeat)
+            lengths = [len(t) for t in texts]
+            print(f"{name:<24}{label:<15}{enc_us:>11.1f}{dec_us:>11.1f}"
+                  f"{sum(lengths) / len(lengths):>11.0f}{max(lengths):>11}")
+
+
+if __name__ == "__main__":
+    main()
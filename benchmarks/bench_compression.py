@@ -0,0 +1,61 @@
+"""Compara compress_for_applicant (3 queries por applicant) contra el índice precargado.
+
+    python -m benchmarks.bench_compression --applicants 500 --latency-ms 20
+"""
+import argparse
+import os
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--applicants", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="Simulated per-request latency")
+    args = parser.parse_args()
+
+    from .stub_airtable import StubAirtable, seed_base
+
+    stub = StubAirtable(latency=args.latency_ms / 1000.0)
+    os.environ["AIRTABLE_API_BASE"] = stub.start()
+    os.environ["AIRTABLE_API_KEY"] = "bench"
+    os.environ["AIRTABLE_BASE_ID"] = "appBench"
+
+    # Imported after the environment points at the stub
+    from scripts import config
+    from scripts.airtable_client import list_records
+    from scripts.compression import compress_for_applicant, build_child_index, compress_from_index
+
+    seed_base(stub, args.applicants, {
+        "applicants": config.TABLE_APPLICANTS,
+        "personal": config.TABLE_PERSONAL,
+        "salary": config.TABLE_SALARY,
+        "experience": config.TABLE_EXPERIENCE,
+    })
+    applicants = list_records(config.TABLE_APPLICANTS)
+
+    stub.reset_counters()
+    t0 = time.perf_counter()
+    per_applicant = {r["id"]: compress_for_applicant(r["fields"][config.FIELD_APPLICANT_ID]) for r in applicants}
+    per_applicant_secs = time.perf_counter() - t0
+    per_applicant_reqs = stub.request_count
+
+    stub.reset_counters()
+    t0 = time.perf_counter()
+    index = build_child_index()
+    bulk = {r["id"]: compress_from_index(index, r["id"]) for r in applicants}
+    bulk_secs = time.perf_counter() - t0
+    bulk_reqs = stub.request_count
+
+    stub.stop()
+
+    assert per_applicant == bulk, "bulk compression diverged from the per-applicant path"
+    print(f"\n{'mode':<15}{'requests':>10}{'wall (s)':>12}")
+    print(f"{'per-applicant':<15}{per_applicant_reqs:>10}{per_applicant_secs:>12.2f}")
+    print(f"{'bulk index':<15}{bulk_reqs:>10}{bulk_secs:>12.2f}")
+    print(f"\n{args.applicants} applicants, {args.latency_ms:.0f} ms/request: "
+          f"{per_applicant_reqs / max(bulk_reqs, 1):.1f}x fewer requests, "
+          f"{per_applicant_secs / max(bulk_secs, 1e-9):.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
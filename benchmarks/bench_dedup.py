@@ -0,0 +1,75 @@
+"""Arma el DedupIndex sobre N perfiles sintéticos con copias inyectadas y mide tiempo, precisión y recall.
+
+    python -m benchmarks.bench_dedup --profiles 20000 --copies 0.05
+"""
+import argparse
+import copy
+import random
+import time
+
+
+def _copy_of(profile, kind: str, rnd: random.Random):
+    """Copia como las que genera el intake: mismo email con otro formato, mismo LinkedIn, o perfil retipeado."""
+    dup = copy.deepcopy(profile)
+    personal = dup["personal"]
+    if kind == "email":
+        local, domain = personal["Email"].split("@")
+        personal["Email"] = f"{local.upper()}+{rnd.randint(1, 9)}@{domain}"
+        personal["LinkedIn"] = ""
+    elif kind == "linkedin":
+        personal["Email"] = f"other{rnd.randint(0, 10 ** 9)}@example.org"
+        personal["LinkedIn"] = personal["LinkedIn"].replace("https://", "https://www.") + "/?trk=public"
+    else:
+        personal["Email"] = f"other{rnd.randint(0, 10 ** 9)}@example.org"
+        personal["LinkedIn"] = ""
+        # One dropped or doubled letter in the name, dates typed as another format
+        name = personal["Full Name"]
+        cut = rnd.randint(1, len(name) - 1)
+        personal["Full Name"] = name[:cut] + name[cut + 1:] if rnd.random() < 0.5 else name[:cut] + name[cut - 1:]
+        for e in dup["experience"]:
+            e["Start"] = e["Start"].replace("-", "/")
+    return dup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=20000)
+    parser.add_argument("--copies", type=float, default=0.05, help="Share of extra applicants that are copies")
+    args = parser.parse_args()
+
+    from scripts.dedup import DedupIndex
+    from .stub_airtable import synthetic_applicant
+
+    rnd = random.Random(7)
+    profiles = [(f"rec{i}", synthetic_applicant(i, rnd)) for i in range(args.profiles)]
+    expected = {}
+    kinds = ("email", "linkedin", "profile")
+    for j in range(int(args.profiles * args.copies)):
+        rid, original = profiles[rnd.randrange(args.profiles)]
+        kind = kinds[j % len(kinds)]
+        dup_rid = f"dup{j}"
+        expected[dup_rid] = (rid, kind)
+        profiles.append((dup_rid, _copy_of(original, kind, rnd)))
+    rnd.shuffle(profiles)
+
+    t0 = time.perf_counter()
+    index = DedupIndex()
+    for rid, profile in profiles:
+        # "~" sorts after digits: the injected copies never become the canonical applicant
+        index.add(rid, ("~" if rid.startswith("dup") else "") + profile["Applicant ID"], profile)
+    index.finish()
+    elapsed = time.perf_counter() - t0
+
+    found = {rid for rid, _ in profiles if index.canonical_of(rid)}
+    print(f"{len(profiles)} applicants indexed in {elapsed:.2f}s ({elapsed / len(profiles) * 1e6:.0f} us each)")
+    print(f"matches: {index.matches}")
+    for kind in kinds:
+        wanted = [rid for rid, (_, k) in expected.items() if k == kind]
+        hit = sum(1 for rid in wanted if index.canonical_of(rid) == expected[rid][0])
+        print(f"  {kind:<9} copies found: {hit}/{len(wanted)}")
+    false_positives = len(found - set(expected))
+    print(f"applicants wrongly marked as duplicates: {false_positives}")
+
+
+if __name__ == "__main__":
+    main()
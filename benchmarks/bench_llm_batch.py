@@ -0,0 +1,60 @@
+"""Compara call_llm (un applicant por request) contra call_llm_batch (K por request) sobre el LLM falso.
+
+    python -m benchmarks.bench_llm_batch --profiles 200 --batch 10 --latency-ms 300 --bad-item-rate 0.05
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=200)
+    parser.add_argument("--batch", type=int, default=10, help="Profiles per batched request (K)")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Simulated per-request model latency")
+    parser.add_argument("--bad-item-rate", type=float, default=0.05,
+                        help="Fraction of batched items the fake model answers with an invalid score")
+    args = parser.parse_args()
+
+    from .stub_airtable import synthetic_applicant
+    from .stub_llm import StubLLM
+
+    stub = StubLLM(latency=args.latency_ms / 1000.0, bad_item_rate=args.bad_item_rate)
+    os.environ["OPENAI_BASE_URL"] = stub.start()
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["LLM_PROVIDER"] = "openai"
+    os.environ["OPENAI_RATE_PER_SEC"] = "0"
+
+    # Imported after the environment points at the stub
+    from scripts.llm_client import call_llm
+    from scripts.llm_batch import call_llm_batch
+
+    rnd = random.Random(7)
+    items = [(f"app{i}", json.dumps(synthetic_applicant(i, rnd), ensure_ascii=False)) for i in range(args.profiles)]
+
+    stub.reset_counters()
+    t0 = time.perf_counter()
+    for _, text in items:
+        call_llm(text)
+    single_secs = time.perf_counter() - t0
+    single = (stub.request_count, stub.prompt_chars)
+
+    stub.reset_counters()
+    t0 = time.perf_counter()
+    results, errors = call_llm_batch(items, args.batch)
+    batch_secs = time.perf_counter() - t0
+    batch = (stub.request_count, stub.prompt_chars)
+
+    stub.stop()
+
+    print(f"\n{'mode':<14}{'requests':>10}{'prompt tok':>12}{'wall (s)':>10}")
+    print(f"{'per-applicant':<14}{single[0]:>10}{single[1] // 4:>12}{single_secs:>10.2f}")
+    print(f"{'batch K=' + str(args.batch):<14}{batch[0]:>10}{batch[1] // 4:>12}{batch_secs:>10.2f}")
+    print(f"\n{len(results)}/{args.profiles} evaluated in batch mode ({len(errors)} unresolved), "
+          f"{single[0] / max(batch[0], 1):.1f}x fewer requests, {single[1] / max(batch[1], 1):.2f}x fewer prompt tokens")
+
+
+if __name__ == "__main__":
+    main()
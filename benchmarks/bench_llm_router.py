@@ -0,0 +1,63 @@
+"""Latencia de cola por applicant con un proveedor degradado: proveedor único, failover y failover + hedging.
+
+    python -m benchmarks.bench_llm_router --calls 300 --slow-rate 0.03 --error-rate 0.05
+"""
+import argparse
+import os
+import time
+
+
+def _pct(samples, pct):
+    s = sorted(samples)
+    return s[min(len(s) - 1, int(round(pct / 100.0 * (len(s) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Normal latency of both fake providers")
+    parser.add_argument("--slow-rate", type=float, default=0.03, help="Fraction of slow calls on the primary")
+    parser.add_argument("--slow-ms", type=float, default=2000.0)
+    parser.add_argument("--error-rate", type=float, default=0.05, help="Fraction of 503s on the primary")
+    args = parser.parse_args()
+
+    from .stub_llm import StubLLM
+
+    primary = StubLLM(latency=args.latency_ms / 1000.0, slow_rate=args.slow_rate,
+                      slow_latency=args.slow_ms / 1000.0, error_rate=args.error_rate)
+    backup = StubLLM(latency=args.latency_ms / 1000.0, seed=8)
+    os.environ.update({
+        "OPENAI_BASE_URL": primary.start(), "OPENAI_API_KEY": "bench",
+        "ANTHROPIC_BASE_URL": backup.start(), "ANTHROPIC_API_KEY": "bench",
+        "LLM_RETRY_BASE_SECONDS": "0.2", "OPENAI_RATE_PER_SEC": "0", "ANTHROPIC_RATE_PER_SEC": "0",
+        "LLM_PROVIDERS": "openai,anthropic",
+    })
+
+    # Imported after the environment points at the stubs
+    from scripts.llm_router import LLMRouter
+
+    modes = {
+        "single": LLMRouter(providers=["openai"]),
+        "failover": LLMRouter(providers=["openai", "anthropic"]),
+        "failover+hedge": LLMRouter(providers=["openai", "anthropic"], hedge=True, hedge_min_samples=20),
+    }
+    print(f"\n{'mode':<16}{'p50 (s)':>9}{'p95 (s)':>9}{'p99 (s)':>9}{'max (s)':>9}{'failed':>8}")
+    for name, router in modes.items():
+        latencies, failed = [], 0
+        for i in range(args.calls):
+            t0 = time.perf_counter()
+            try:
+                router.complete(f"Profile:\nname=Applicant {i}", 350)
+            except Exception:
+                failed += 1
+            latencies.append(time.perf_counter() - t0)
+        print(f"{name:<16}{_pct(latencies, 50):>9.2f}{_pct(latencies, 95):>9.2f}{_pct(latencies, 99):>9.2f}"
+              f"{max(latencies):>9.2f}{failed:>8}")
+        print(f"{'':<16}{router.stats()}")
+
+    primary.stop()
+    backup.stop()
+
+
+if __name__ == "__main__":
+    main()
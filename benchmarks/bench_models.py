@@ -0,0 +1,103 @@
+"""Memoria y throughput de un set de applicants en memoria: dicts del Compressed JSON contra scripts.models.
+
+    python -m benchmarks.bench_models --profiles 200000
+"""
+import argparse
+import gc
+import random
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, Iterator, List, Tuple
+
+
+def _measure(build: Callable[[], object]) -> Tuple[object, float, int]:
+    """(resultado, segundos, bytes que sigue ocupando el resultado); el tiempo se toma sin tracemalloc."""
+    gc.collect()
+    t0 = time.perf_counter()
+    build()
+    elapsed = time.perf_counter() - t0
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, elapsed, size
+
+
+def _child_rows(profiles: List[Dict], key: str) -> Iterator[Dict]:
+    """Filas de una tabla hija con la forma de la API de Airtable (id, createdTime, link), creadas al paginar."""
+    for i, p in enumerate(profiles):
+        link = {"Applicant ID": [f"recA{i:012d}"]}
+        rows = p[key] if key == "experience" else [p[key]]
+        for j, fields in enumerate(rows):
+            yield {"id": f"rec{key[0].upper()}{i:010d}{j:02d}", "createdTime": "2024-01-01T00:00:00.000Z",
+                   "fields": {**fields, **link}}
+
+
+def _grouped_rows(list_fn: Callable[[str], Iterator[Dict]], tables: Dict[str, str]) -> Dict[str, Dict[str, List[Dict]]]:
+    """build_child_index antes de scripts.models: guardaba las filas de Airtable agrupadas por applicant."""
+    index: Dict[str, Dict[str, List[Dict]]] = {}
+    for key, table_name in tables.items():
+        for r in list_fn(table_name):
+            for rid in r["fields"]["Applicant ID"]:
+                index.setdefault(rid, {"personal": [], "salary": [], "experience": []})[key].append(r)
+    return index
+
+
+def _assemble_rows(entry: Dict[str, List[Dict]]) -> Dict:
+    from scripts.compression import _assemble
+
+    return _assemble(entry["personal"], entry["salary"], entry["experience"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=200000)
+    args = parser.parse_args()
+
+    from scripts import codec, compression
+    from scripts.config import TABLE_PERSONAL, TABLE_SALARY, TABLE_EXPERIENCE
+    from scripts.models import Applicant
+    from scripts.rule_engine import default_rules
+    from .stub_airtable import synthetic_applicant
+
+    rnd = random.Random(7)
+    profiles = [{k: v for k, v in synthetic_applicant(i, rnd).items() if k != "Applicant ID"}
+                for i in range(args.profiles)]
+    texts = [codec.encode(p) for p in profiles]
+    now = datetime(2026, 1, 1)
+    rules = default_rules()
+
+    print(f"\n{args.profiles} applicants")
+    print(f"{'set':<34}{'build s':>10}{'MB held':>10}{'rules s':>10}")
+    results = {}
+    for label, build in (("dicts (codec.decode)", lambda: [codec.decode(t) for t in texts]),
+                         ("models (Applicant.from_json)", lambda: [Applicant.from_json(t) for t in texts])):
+        held, elapsed, size = _measure(build)
+        t0 = time.perf_counter()
+        results[label] = rules.evaluate_batch(held, now)
+        rules_s = time.perf_counter() - t0
+        print(f"{label:<34}{elapsed:>10.2f}{size / 2 ** 20:>10.1f}{rules_s:>10.2f}")
+        del held
+    verdicts = list(results.values())
+    assert verdicts[0] == verdicts[1], "models and dicts disagree"
+
+    # The bulk child index of run_all: raw Airtable rows grouped per applicant before, models now.
+    # Rows are generated while "paging", so each index holds only what it keeps
+    tables = {"personal": TABLE_PERSONAL, "salary": TABLE_SALARY, "experience": TABLE_EXPERIENCE}
+    by_table = {name: key for key, name in tables.items()}
+
+    def list_fn(table_name: str, **_) -> Iterator[Dict]:
+        return _child_rows(profiles, by_table[table_name])
+
+    old_index, old_s, old_size = _measure(lambda: _grouped_rows(list_fn, tables))
+    new_index, new_s, new_size = _measure(lambda: compression.build_child_index(list_fn))
+    print(f"{'child index, raw rows (before)':<34}{old_s:>10.2f}{old_size / 2 ** 20:>10.1f}")
+    print(f"{'child index, models':<34}{new_s:>10.2f}{new_size / 2 ** 20:>10.1f}")
+    sample = list(new_index)[:1000]
+    assert all(new_index[rid].to_dict() == _assemble_rows(old_index[rid]) for rid in sample)
+
+
+if __name__ == "__main__":
+    main()
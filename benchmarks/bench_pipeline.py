@@ -0,0 +1,194 @@
+"""Benchmark de punta a punta: run_all, decompression y shortlist contra los stubs locales de Airtable y LLM.
+
+    python -m benchmarks.bench_pipeline --sizes 100,1000,10000 --workers 8
+    python -m benchmarks.bench_pipeline --sizes 1000 --compare benchmarks/results/pipeline-20261017-120000.json
+
+Cada escenario corre en un proceso hijo (el pico de RSS medido es el del pipeline, no el
+del stub) contra una base sintética recién cargada. Los resultados se guardan en JSON
+para compararlos entre commits con --compare.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+SCENARIOS = ("decompress", "run_all", "shortlist")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _child(scenario: str, file_path: Optional[str], opts: Dict) -> Dict:
+    """Corre un escenario en este proceso (ya apuntado a los stubs por el entorno)."""
+    from scripts.log import setup_logging
+    setup_logging("WARNING")
+
+    failed = 0
+    t0 = time.perf_counter()
+    if scenario == "decompress":
+        from scripts.decompression import decompress_from_json_file
+        decompress_from_json_file(file_path)
+    elif scenario == "run_all":
+        from scripts.run_all import run
+        failed = len(run(workers=opts["workers"], llm_cache_mode="bypass", llm_batch=opts["llm_batch"],
+                         llm_concurrency=opts["llm_concurrency"]))
+    elif scenario == "shortlist":
+        from scripts.shortlist import run_shortlist
+        run_shortlist()
+    wall = time.perf_counter() - t0
+
+    from scripts.metrics import get_metrics
+    return {"wall_s": round(wall, 3), "peak_rss_mb": round(_peak_rss_mb(), 1), "failed": failed,
+            "http_429_retries": get_metrics().counter("http_429_retries_total")}
+
+
+def _seed(stub, scenario: str, size: int, tables: Dict[str, str], workdir: str) -> Optional[str]:
+    """Carga la base que necesita el escenario; devuelve el archivo a descomprimir si corresponde."""
+    from .stub_airtable import LINK_FIELD, seed_base, synthetic_applicant
+    import random
+
+    if scenario == "run_all":
+        seed_base(stub, size, tables)
+        return None
+
+    rnd = random.Random(7)
+    if scenario == "decompress":
+        # Parent rows only: decompression creates every child row
+        path = os.path.join(workdir, f"applicants-{size}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for i in range(1, size + 1):
+                profile = synthetic_applicant(i, rnd)
+                stub.insert(tables["applicants"], {LINK_FIELD: profile["Applicant ID"]})
+                f.write(json.dumps(profile, ensure_ascii=False) + "\n")
+        return path
+
+    # shortlist: applicants that already carry their Compressed JSON
+    for i in range(1, size + 1):
+        profile = synthetic_applicant(i, rnd)
+        compressed = {"personal": profile["personal"], "experience": profile["experience"], "salary": profile["salary"]}
+        stub.insert(tables["applicants"], {LINK_FIELD: profile["Applicant ID"],
+                                           tables["compressed"]: json.dumps(compressed, ensure_ascii=False)})
+    return None
+
+
+def _run_case(scenario: str, size: int, args) -> Dict:
+    from .stub_airtable import StubAirtable
+    from .stub_llm import StubLLM
+
+    stub = StubAirtable(latency=args.latency_ms / 1000.0, rate_limit=args.airtable_rps)
+    llm = StubLLM(latency=args.llm_latency_ms / 1000.0)
+    with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as workdir:
+        env = dict(os.environ)
+        env.update({
+            "AIRTABLE_API_BASE": stub.start(), "AIRTABLE_API_KEY": "bench", "AIRTABLE_BASE_ID": "appBench",
+            "AIRTABLE_RATE_PER_SEC": str(args.airtable_rps),
+            "OPENAI_BASE_URL": llm.start(), "OPENAI_API_KEY": "bench",
+            "LLM_PROVIDER": "openai", "LLM_PROVIDERS": "openai", "OPENAI_RATE_PER_SEC": str(args.llm_rps),
+            "LLM_CACHE_PATH": os.path.join(workdir, "llm_cache.sqlite"),
+            "CHECKPOINT_PATH": os.path.join(workdir, "checkpoint.json"),
+            "METRICS_PATH": "", "LOG_LEVEL": "WARNING",
+        })
+        os.environ.update(env)
+        from scripts import config
+        tables = {"applicants": config.TABLE_APPLICANTS, "personal": config.TABLE_PERSONAL,
+                  "salary": config.TABLE_SALARY, "experience": config.TABLE_EXPERIENCE,
+                  "compressed": config.FIELD_COMPRESSED_JSON}
+        file_path = _seed(stub, scenario, size, tables, workdir)
+
+        stub.reset_counters()
+        cmd = [sys.executable, "-m", "benchmarks.bench_pipeline", "--child", scenario,
+               "--workers", str(args.workers), "--llm-batch", str(args.llm_batch),
+               "--llm-concurrency", str(args.llm_concurrency)]
+        if file_path:
+            cmd += ["--file", file_path]
+        proc = subprocess.run(cmd, env=env, capture_output=True, text=True)
+        stub.stop()
+        llm.stop()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{scenario} x {size} failed:\n{proc.stderr[-2000:]}")
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result.update({
+        "scenario": scenario, "size": size,
+        "airtable_requests": stub.request_count, "airtable_by_method": dict(stub.requests_by_method),
+        "airtable_throttled": stub.throttled_count, "llm_requests": llm.request_count,
+        "applicants_per_s": round(size / max(result["wall_s"], 1e-9), 1),
+    })
+    return result
+
+
+def _git_rev() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def _print_table(results: List[Dict], baseline: Optional[Dict] = None):
+    print(f"\n{'scenario':<12}{'size':>8}{'wall (s)':>10}{'app/s':>9}{'airtable':>10}{'429s':>7}"
+          f"{'llm':>7}{'RSS MB':>8}" + ("  vs baseline (wall, requests, RSS)" if baseline else ""))
+    for r in results:
+        line = (f"{r['scenario']:<12}{r['size']:>8}{r['wall_s']:>10.2f}{r['applicants_per_s']:>9.0f}"
+                f"{r['airtable_requests']:>10}{r['airtable_throttled']:>7}{r['llm_requests']:>7}{r['peak_rss_mb']:>8.0f}")
+        old = (baseline or {}).get((r["scenario"], r["size"]))
+        if old:
+            line += "  " + ", ".join(
+                f"{(r[k] - old[k]) / old[k] * 100:+.0f}%" if old[k] else "n/a"
+                for k in ("wall_s", "airtable_requests", "peak_rss_mb"))
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000", help="Comma-separated applicant counts (up to 100000)")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help=f"Subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated Airtable latency per request")
+    parser.add_argument("--airtable-rps", type=float, default=5.0,
+                        help="Stub throttles with 429 above this rate, and the client is set to it (0 = off)")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0, help="Simulated LLM latency per request")
+    parser.add_argument("--llm-rps", type=float, default=0.0, help="Client-side LLM rate limit (0 = unlimited)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--llm-batch", type=int, default=1)
+    parser.add_argument("--llm-concurrency", type=int, default=1)
+    parser.add_argument("--out", help="Results file (default: benchmarks/results/pipeline-<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier results file to diff against")
+    parser.add_argument("--child", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.file, vars(args))))
+        return
+
+    results = []
+    for size in (int(s) for s in args.sizes.split(",") if s.strip()):
+        for scenario in (s.strip() for s in args.scenarios.split(",") if s.strip()):
+            print(f"[BENCH] {scenario} x {size} ...", flush=True)
+            results.append(_run_case(scenario, size, args))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = {(r["scenario"], r["size"]): r for r in json.load(f)["results"]}
+    _print_table(results, baseline)
+
+    out = args.out or os.path.join("benchmarks", "results", f"pipeline-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    settings = {k: v for k, v in vars(args).items() if k not in ("child", "file", "out", "compare")}
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump({"git_rev": _git_rev(), "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                   "settings": settings, "results": results}, f, indent=2)
+    print(f"\nSaved to {out}")
+
+
+if __name__ == "__main__":
+    main()
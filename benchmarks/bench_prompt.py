@@ -0,0 +1,50 @@
+"""Tokens de prompt promedio por applicant: JSON verbatim contra el formato compacto de prompt_encoding.
+
+    python -m benchmarks.bench_prompt --file sample_compressed.json --profiles 1000
+"""
+import argparse
+import json
+import random
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--file", default="sample_compressed.json", help="Compressed profiles (JSON array)")
+    parser.add_argument("--profiles", type=int, default=1000, help="Synthetic profiles added to the file's ones")
+    args = parser.parse_args()
+
+    from scripts.prompt_encoding import COMPACT_FORMAT_NOTE, encode_profile, estimate_tokens
+    from .stub_airtable import synthetic_applicant
+
+    with open(args.file, "r", encoding="utf-8") as f:
+        sample = json.load(f)
+    rnd = random.Random(7)
+    datasets = {
+        args.file: sample,
+        f"synthetic x{args.profiles}": [synthetic_applicant(i, rnd) for i in range(args.profiles)],
+    }
+
+    print(f"\n{'dataset':<26}{'format':<9}{'avg tokens':>12}{'avg chars':>11}{'encode us':>11}")
+    for name, profiles in datasets.items():
+        # What run_all sends today: the compressed object without the Applicant ID wrapper key
+        bodies = [{k: v for k, v in p.items() if k != "Applicant ID"} for p in profiles]
+        t0 = time.perf_counter()
+        verbose = [json.dumps(b, ensure_ascii=False) for b in bodies]
+        json_us = (time.perf_counter() - t0) / len(bodies) * 1e6
+        t0 = time.perf_counter()
+        compact = [encode_profile(b) for b in bodies]
+        compact_us = (time.perf_counter() - t0) / len(bodies) * 1e6
+        for fmt, texts, us in (("json", verbose, json_us), ("compact", compact, compact_us)):
+            tokens = sum(estimate_tokens(t) for t in texts) / len(texts)
+            chars = sum(len(t) for t in texts) / len(texts)
+            print(f"{name:<26}{fmt:<9}{tokens:>12.1f}{chars:>11.1f}{us:>11.1f}")
+        saved = 1 - sum(map(estimate_tokens, compact)) / sum(map(estimate_tokens, verbose))
+        print(f"{'':<26}{'saved':<9}{saved:>11.0%}")
+
+    print(f"\nThe compact header adds {estimate_tokens(COMPACT_FORMAT_NOTE)} tokens once per request "
+          f"(once per batch with --llm-batch).")
+
+
+if __name__ == "__main__":
+    main()
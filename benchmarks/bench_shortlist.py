@@ -0,0 +1,76 @@
+"""Re-evalúa N perfiles con las reglas originales (una regex por término) y con ShortlistRules en lote.
+
+    python -m benchmarks.bench_shortlist --profiles 100000
+"""
+import argparse
+import random
+import re
+import time
+from datetime import datetime
+
+
+def _legacy_evaluate(compressed, tier1, countries, max_rate, min_avail):
+    """Copia de evaluate_shortlist antes del rule engine, usada como referencia."""
+    def parse(s):
+        if not s:
+            return None
+        for fmt in ("%Y-%m-%d", "%Y/%m/%d", "%d-%m-%Y", "%d/%m/%Y"):
+            try:
+                return datetime.strptime(s.strip(), fmt)
+            except ValueError:
+                continue
+        return None
+
+    def worked_tier1(exps):
+        joined = " | ".join([str(e.get("Company", "")) for e in exps])
+        return any(re.search(rf"\b{re.escape(b)}\b", joined, re.IGNORECASE) for b in tier1)
+
+    personal = compressed.get("personal") or {}
+    salary = compressed.get("salary") or {}
+    exps = compressed.get("experience") or []
+    days = 0
+    for e in exps:
+        start = parse(str(e.get("Start", "")))
+        end = parse(str(e.get("End", ""))) or datetime.utcnow()
+        if start and end and end > start:
+            days += (end - start).days
+    yrs = round(days / 365.25, 2)
+    loc = str(personal.get("Location", ""))
+    cond_loc = any(re.search(rf"\b{re.escape(c)}\b", loc, re.IGNORECASE) for c in countries)
+    cond_exp = yrs >= 4 or worked_tier1(exps)
+    cond_comp = (float(salary.get("Preferred Rate", 1e9)) <= max_rate
+                 and float(salary.get("Availability (hrs/wk)", 0)) >= min_avail)
+    return cond_exp and cond_comp and cond_loc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=100000)
+    args = parser.parse_args()
+
+    from scripts.config import TIER1_COMPANIES, SHORTLIST_COUNTRIES, MAX_RATE_USD, MIN_AVAIL_HOURS
+    from scripts.rule_engine import ShortlistRules
+    from .stub_airtable import synthetic_applicant
+
+    rnd = random.Random(7)
+    profiles = [synthetic_applicant(i, rnd) for i in range(args.profiles)]
+
+    t0 = time.perf_counter()
+    legacy = [_legacy_evaluate(p, TIER1_COMPANIES, SHORTLIST_COUNTRIES, MAX_RATE_USD, MIN_AVAIL_HOURS)
+              for p in profiles]
+    legacy_secs = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    rules = ShortlistRules()
+    batch = [v["meets"] for v in rules.evaluate_batch(profiles)]
+    batch_secs = time.perf_counter() - t0
+
+    assert legacy == batch, "batch rule engine diverged from the legacy verdicts"
+    print(f"\n{'engine':<16}{'wall (s)':>10}{'profiles/s':>14}")
+    print(f"{'legacy':<16}{legacy_secs:>10.2f}{args.profiles / legacy_secs:>14,.0f}")
+    print(f"{'compiled batch':<16}{batch_secs:>10.2f}{args.profiles / batch_secs:>14,.0f}")
+    print(f"\n{sum(batch)} of {args.profiles} shortlisted, {legacy_secs / batch_secs:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+"""Servidor local que imita el subset de la API REST de Airtable que usa scripts.airtable_client.
+
+Incluye paginación con offset, filterByFormula (Applicant ID, RECORD_ID, IS_AFTER, OR/AND/NOT),
+el límite de 10 records por escritura y, con rate_limit > 0, respuestas 429 al pasar de
+rate_limit requests en una ventana de un segundo (como el límite de 5 req/s por base).
+
+También hace de notificador de webhooks falso: endpoints de creación/refresh/payloads, el
+esquema de /meta (IDs de tablas y campos) y pings firmados con HMAC a la notificationUrl.
+"""
+import base64
+import calendar
+import collections
+import hashlib
+import hmac
+import itertools
+import json
+import urllib.request
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Deque, Dict, List, Optional
+from urllib.parse import parse_qsl, unquote, urlsplit
+
+LINK_FIELD = "Applicant ID"
+APPLICANTS_TABLE = "Applicants"
+MAX_BATCH = 10
+
+_EQ_RE = re.compile(r"^\{(?P<field>[^}]+)\}\s*=\s*'(?P<value>[^']*)'$")
+_SEARCH_RE = re.compile(r"^SEARCH\('(?P<value>[^']*)',\s*ARRAYJOIN\(\{(?P<field>[^}]+)\}\)\)$")
+_RECORD_ID_RE = re.compile(r"^RECORD_ID\(\)\s*=\s*'(?P<value>[^']*)'$")
+_IS_AFTER_RE = re.compile(
+    r"^IS_AFTER\((?P<fn>LAST_MODIFIED_TIME|CREATED_TIME)\((?:\{(?P<field>[^}]+)\})?\),\s*"
+    r"(?:DATETIME_PARSE\()?'(?P<value>[^']*)'\)?\)$"
+)
+
+
+def _split_args(inner: str) -> List[str]:
+    """Separa los argumentos de nivel superior de OR(...)/AND(...)."""
+    args, depth, quoted, cur = [], 0, False, []
+    for ch in inner:
+        if ch == "'":
+            quoted = not quoted
+        elif not quoted and ch == "(":
+            depth += 1
+        elif not quoted and ch == ")":
+            depth -= 1
+        elif not quoted and ch == "," and depth == 0:
+            args.append("".join(cur).strip())
+            cur = []
+            continue
+        cur.append(ch)
+    if cur:
+        args.append("".join(cur).strip())
+    return args
+
+
+def _parse_ts(value: str) -> float:
+    return calendar.timegm(time.strptime(value[:19], "%Y-%m-%dT%H:%M:%S"))
+
+
+class StubAirtable:
+    def __init__(self, latency: float = 0.0, rate_limit: float = 0.0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.tables: Dict[str, Dict[str, Dict]] = {}
+        self.request_count = 0
+        self.throttled_count = 0
+        self.requests_by_method: Dict[str, int] = {}
+        self._window: Deque[float] = collections.deque()
+        # Row lists reused across pages; dropped whenever a table gains or loses records
+        self._rows: Dict[str, List[Dict]] = {}
+        self._ids = itertools.count(1)
+        self.created: Dict[str, float] = {}
+        self.modified: Dict[str, Dict[str, float]] = {}
+        # Field names seen per table, in order; served as the /meta schema
+        self.fields_seen: Dict[str, Dict[str, None]] = {}
+        self.webhooks: Dict[str, Dict] = {}
+        self.pings_sent = 0
+        self._ping = threading.Event()
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # --- data helpers -------------------------------------------------
+    def table(self, name: str) -> Dict[str, Dict]:
+        return self.tables.setdefault(name, {})
+
+    def insert(self, table_name: str, fields: Dict, record_id: Optional[str] = None) -> Dict:
+        with self._lock:
+            now = time.time()
+            rec = {
+                "id": record_id or f"rec{next(self._ids):014d}",
+                "createdTime": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(now)),
+                "fields": dict(fields),
+            }
+            self.table(table_name)[rec["id"]] = rec
+            self._rows.pop(table_name, None)
+            self.created[rec["id"]] = now
+            self.modified[rec["id"]] = {k: now for k in fields}
+            self._record_change(table_name, "created", rec["id"], rec["fields"])
+        return rec
+
+    def update(self, table_name: str, record_id: str, fields: Dict) -> Optional[Dict]:
+        """Aplica un PATCH y registra la hora de modificación por campo (para LAST_MODIFIED_TIME)."""
+        with self._lock:
+            rec = self.table(table_name).get(record_id)
+            if rec is None:
+                return None
+            now = time.time()
+            previous = {k: rec["fields"].get(k) for k in fields}
+            rec["fields"].update(fields)
+            self.modified[record_id].update({k: now for k in fields})
+            self._record_change(table_name, "changed", record_id, rec["fields"], previous)
+        return rec
+
+    def delete(self, table_name: str, record_id: str) -> bool:
+        with self._lock:
+            found = self.table(table_name).pop(record_id, None) is not None
+            if found:
+                self._rows.pop(table_name, None)
+                self._record_change(table_name, "destroyed", record_id, {})
+        return found
+
+    def rows(self, table_name: str) -> List[Dict]:
+        with self._lock:
+            rows = self._rows.get(table_name)
+            if rows is None:
+                rows = self._rows[table_name] = list(self.table(table_name).values())
+        return rows
+
+    def load_snapshot(self, path: str) -> int:
+        """Carga un snapshot de scripts.snapshot (mismos record IDs) para usarlo como fixture."""
+        import sqlite3
+        conn = sqlite3.connect(path)
+        n = 0
+        for tbl, rid, fields in conn.execute("SELECT tbl, id, fields FROM records ORDER BY tbl, seq"):
+            self.insert(tbl, json.loads(fields), record_id=rid)
+            n += 1
+        conn.close()
+        return n
+
+    # --- webhooks -----------------------------------------------------
+    @staticmethod
+    def table_id(table_name: str) -> str:
+        return "tbl" + hashlib.md5(table_name.encode("utf-8")).hexdigest()[:14]
+
+    @staticmethod
+    def field_id(table_name: str, field: str) -> str:
+        return "fld" + hashlib.md5(f"{table_name}\0{field}".encode("utf-8")).hexdigest()[:14]
+
+    def schema(self) -> Dict:
+        """Respuesta de GET /v0/meta/bases/{baseId}/tables con los campos vistos hasta ahora."""
+        with self._lock:
+            return {"tables": [
+                {"id": self.table_id(name), "name": name,
+                 "fields": [{"id": self.field_id(name, f), "name": f} for f in self.fields_seen.get(name, {})]}
+                for name in self.tables
+            ]}
+
+    def _cells(self, table_name: str, fields: Dict) -> Dict:
+        out = {}
+        for k, v in fields.items():
+            if table_name != APPLICANTS_TABLE and k == LINK_FIELD and isinstance(v, list):
+                # Webhook payloads carry links as {"id", "name"} objects
+                v = [{"id": rid} for rid in v]
+            out[self.field_id(table_name, k)] = v
+        return out
+
+    def _record_change(self, table_name: str, kind: str, rec_id: str, fields: Dict,
+                       previous: Optional[Dict] = None):
+        """Agrega un payload por cambio a cada webhook (con el lock tomado) y despierta al notificador."""
+        seen = self.fields_seen.setdefault(table_name, {})
+        for k in fields:
+            seen.setdefault(k, None)
+        if not self.webhooks:
+            return
+        tbl = self.table_id(table_name)
+        for hook in self.webhooks.values():
+            change: Dict = {}
+            if kind == "created":
+                change["createdRecordsById"] = {rec_id: {"cellValuesByFieldId": self._cells(table_name, fields)}}
+            elif kind == "destroyed":
+                change["destroyedRecordIds"] = [rec_id]
+            else:
+                changed = {k: fields.get(k) for k in previous or {}}
+                entry = {"current": {"cellValuesByFieldId": self._cells(table_name, changed)}}
+                if hook["include_previous"]:
+                    entry["previous"] = {"cellValuesByFieldId": self._cells(table_name, previous or {})}
+                included = {k: v for k, v in fields.items()
+                            if k not in changed and (hook["include_all"]
+                                                     or self.field_id(table_name, k) in hook["include_ids"])}
+                if included:
+                    entry["unchanged"] = {"cellValuesByFieldId": self._cells(table_name, included)}
+                change["changedRecordsById"] = {rec_id: entry}
+            hook["payloads"].append({
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime()),
+                "baseTransactionNumber": len(hook["payloads"]) + 1,
+                "payloadFormat": "v0",
+                "actionMetadata": {"source": "publicApi"},
+                "changedTablesById": {tbl: change},
+            })
+        self._ping.set()
+
+    def create_webhook(self, body: Dict) -> Dict:
+        spec = body.get("specification", {}).get("options", {})
+        includes = spec.get("includes", {})
+        cell_ids = includes.get("includeCellValuesInFieldIds") or []
+        secret = hashlib.sha256(str(time.time_ns()).encode()).digest()
+        with self._lock:
+            wid = f"ach{next(self._ids):014d}"
+            self.webhooks[wid] = {
+                "url": body.get("notificationUrl"), "secret": secret, "payloads": [],
+                "include_all": cell_ids == "all", "include_ids": set(cell_ids if cell_ids != "all" else []),
+                "include_previous": bool(includes.get("includePreviousCellValues")),
+            }
+            if len(self.webhooks) == 1:
+                threading.Thread(target=self._notify_loop, daemon=True).start()
+        return {"id": wid, "macSecretBase64": base64.b64encode(secret).decode("ascii"),
+                "expirationTime": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime(time.time() + 7 * 86400))}
+
+    def webhook_payloads(self, wid: str, cursor: int, limit: int = 50) -> Optional[Dict]:
+        with self._lock:
+            hook = self.webhooks.get(wid)
+            if hook is None:
+                return None
+            start = max(cursor, 1) - 1
+            page = hook["payloads"][start:start + limit]
+            return {"payloads": page, "cursor": start + len(page) + 1,
+                    "mightHaveMore": start + len(page) < len(hook["payloads"])}
+
+    def _notify_loop(self):
+        """Un ping por tanda de cambios (como Airtable, sin datos: el receptor pide los payloads)."""
+        while self._ping.wait():
+            self._ping.clear()
+            with self._lock:
+                hooks = [(wid, h["url"], h["secret"]) for wid, h in self.webhooks.items() if h["url"]]
+            for wid, url, secret in hooks:
+                raw = json.dumps({"base": {"id": "appStub"}, "webhook": {"id": wid},
+                                  "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", time.gmtime())}).encode()
+                mac = "hmac-sha256=" + hmac.new(secret, raw, hashlib.sha256).hexdigest()
+                req = urllib.request.Request(url, data=raw, method="POST", headers={
+                    "Content-Type": "application/json", "X-Airtable-Content-MAC": mac})
+                try:
+                    urllib.request.urlopen(req, timeout=5).read()
+                    self.pings_sent += 1
+                except OSError:
+                    pass
+
+    def reset_counters(self):
+        with self._lock:
+            self.request_count = 0
+            self.throttled_count = 0
+            self.requests_by_method = {}
+
+    def _count(self, method: str) -> Optional[float]:
+        """Cuenta el request; si excede rate_limit en el último segundo devuelve el Retry-After a enviar."""
+        with self._lock:
+            self.request_count += 1
+            self.requests_by_method[method] = self.requests_by_method.get(method, 0) + 1
+            if self.rate_limit <= 0:
+                return None
+            now = time.monotonic()
+            while self._window and now - self._window[0] >= 1.0:
+                self._window.popleft()
+            if len(self._window) >= self.rate_limit:
+                self.throttled_count += 1
+                return 1.0 - (now - self._window[0])
+            self._window.append(now)
+        return None
+
+    def _matches(self, table_name: str, rec: Dict, formula: str) -> bool:
+        formula = formula.strip()
+        for op, combine in (("OR(", any), ("AND(", all)):
+            if formula.startswith(op) and formula.endswith(")"):
+                return combine(self._matches(table_name, rec, arg) for arg in _split_args(formula[len(op):-1]))
+        if formula.startswith("NOT(") and formula.endswith(")"):
+            return not self._matches(table_name, rec, formula[4:-1])
+        m = _EQ_RE.match(formula)
+        if m:
+            value = rec["fields"].get(m["field"])
+            if isinstance(value, list):
+                # Link field: compare against the primary field of the linked Applicants
+                applicants = self.table(APPLICANTS_TABLE)
+                return any(applicants.get(rid, {}).get("fields", {}).get(LINK_FIELD) == m["value"] for rid in value)
+            return str(value if value is not None else "") == m["value"]
+        m = _SEARCH_RE.match(formula)
+        if m:
+            value = rec["fields"].get(m["field"]) or []
+            return m["value"] in ",".join(value if isinstance(value, list) else [str(value)])
+        m = _RECORD_ID_RE.match(formula)
+        if m:
+            return rec["id"] == m["value"]
+        m = _IS_AFTER_RE.match(formula)
+        if m:
+            if m["fn"] == "CREATED_TIME":
+                ts = self.created.get(rec["id"], 0.0)
+            else:
+                per_field = self.modified.get(rec["id"], {})
+                if m["field"]:
+                    ts = per_field.get(m["field"], 0.0)
+                else:
+                    ts = max(per_field.values(), default=self.created.get(rec["id"], 0.0))
+            return ts > _parse_ts(m["value"])
+        raise ValueError(f"Unsupported filterByFormula: {formula}")
+
+    # --- server -------------------------------------------------------
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        stub = self
+
+        class Handler(_Handler):
+            pass
+        Handler.stub = stub
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}/v0"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    stub: StubAirtable
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this each response waits on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # noqa: A002 - silence default stderr logging
+        pass
+
+    def _send(self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _table_and_query(self):
+        parts = urlsplit(self.path)
+        segments = [unquote(s) for s in parts.path.split("/") if s]
+        # /v0/{baseId}/{tableName}
+        table_name = segments[2] if len(segments) >= 3 else ""
+        return table_name, parse_qsl(parts.query, keep_blank_values=True)
+
+    def _body(self) -> Dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _start(self, method: str) -> bool:
+        """False si el request fue rechazado con 429 (ya respondido)."""
+        retry_after = self.stub._count(method)
+        if retry_after is not None:
+            # Drain the body so the keep-alive connection stays usable
+            self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            self._send(429, {"errors": [{"error": "RATE_LIMIT_REACHED"}]}, {"Retry-After": f"{retry_after:.3f}"})
+            return False
+        if self.stub.latency:
+            time.sleep(self.stub.latency)
+        return True
+
+    def _base_api(self, method: str) -> bool:
+        """Endpoints fuera de las tablas: /v0/meta/bases/{id}/tables y /v0/bases/{id}/webhooks/..."""
+        segments = [unquote(s) for s in urlsplit(self.path).path.split("/") if s]
+        if len(segments) < 2 or segments[1] not in ("meta", "bases"):
+            return False
+        if segments[1] == "meta":
+            self._send(200, self.stub.schema())
+            return True
+        hook_path = segments[4:]
+        if method == "POST" and not hook_path:
+            self._send(200, self.stub.create_webhook(self._body()))
+        elif method == "GET" and len(hook_path) == 2 and hook_path[1] == "payloads":
+            cursor = int(dict(parse_qsl(urlsplit(self.path).query)).get("cursor", 1))
+            page = self.stub.webhook_payloads(hook_path[0], cursor)
+            if page is None:
+                self._send(404, {"error": "NOT_FOUND"})
+            else:
+                self._send(200, page)
+        elif method == "POST" and len(hook_path) == 2 and hook_path[1] == "refresh":
+            self._body()
+            if hook_path[0] not in self.stub.webhooks:
+                self._send(404, {"error": "NOT_FOUND"})
+            else:
+                expires = time.gmtime(time.time() + 7 * 86400)
+                self._send(200, {"expirationTime": time.strftime("%Y-%m-%dT%H:%M:%S.000Z", expires)})
+        elif method == "DELETE" and len(hook_path) == 1:
+            self.stub.webhooks.pop(hook_path[0], None)
+            self._send(200, {})
+        else:
+            self._send(404, {"error": "NOT_FOUND"})
+        return True
+
+    def do_GET(self):
+        if not self._start("GET") or self._base_api("GET"):
+            return
+        table_name, query = self._table_and_query()
+        params = dict(query)
+        page_size = min(int(params.get("pageSize", 100)), 100)
+        offset = int(params.get("offset", 0))
+        fields = [v for k, v in query if k.startswith("fields[")]
+        formula = params.get("filterByFormula")
+
+        rows = self.stub.rows(table_name)
+        if formula:
+            try:
+                rows = [r for r in rows if self.stub._matches(table_name, r, formula)]
+            except ValueError as e:
+                return self._send(422, {"error": {"type": "INVALID_FILTER_BY_FORMULA", "message": str(e)}})
+
+        page = rows[offset:offset + page_size]
+        if fields:
+            page = [{**r, "fields": {k: v for k, v in r["fields"].items() if k in fields}} for r in page]
+        body: Dict = {"records": page}
+        if offset + page_size < len(rows):
+            body["offset"] = str(offset + page_size)
+        self._send(200, body)
+
+    def do_POST(self):
+        if not self._start("POST") or self._base_api("POST"):
+            return
+        table_name, _ = self._table_and_query()
+        records = self._body().get("records", [])
+        if len(records) > MAX_BATCH:
+            return self._send(422, {"error": {"type": "INVALID_RECORDS", "message": "Too many records"}})
+        created = [self.stub.insert(table_name, r.get("fields", {})) for r in records]
+        self._send(200, {"records": created})
+
+    def do_PATCH(self):
+        if not self._start("PATCH"):
+            return
+        table_name, _ = self._table_and_query()
+        records = self._body().get("records", [])
+        if len(records) > MAX_BATCH:
+            return self._send(422, {"error": {"type": "INVALID_RECORDS", "message": "Too many records"}})
+        updated = []
+        for r in records:
+            rec = self.stub.update(table_name, r.get("id"), r.get("fields", {}))
+            if rec is None:
+                return self._send(404, {"error": {"type": "NOT_FOUND", "message": r.get("id")}})
+            updated.append(rec)
+        self._send(200, {"records": updated})
+
+    def do_DELETE(self):
+        if not self._start("DELETE") or self._base_api("DELETE"):
+            return
+        table_name, query = self._table_and_query()
+        ids = [v for k, v in query if k == "records[]"]
+        if len(ids) > MAX_BATCH:
+            return self._send(422, {"error": {"type": "INVALID_RECORDS", "message": "Too many records"}})
+        deleted = [{"id": rid, "deleted": True} for rid in ids if self.stub.delete(table_name, rid)]
+        self._send(200, {"records": deleted})
+
+
+# --- synthetic data ---------------------------------------------------
+COMPANIES = ["Google", "Acme Co", "Initech", "Meta", "Globex", "Stripe", "Umbrella", "Hooli", "Vandelay", "Nvidia"]
+TITLES = ["SWE", "Senior SWE", "Data Engineer", "ML Engineer", "Staff Engineer", "Backend Dev"]
+LOCATIONS = ["NYC, United States", "Toronto, Canada", "Berlin, Germany", "Lagos, Nigeria",
+             "London, UK", "Bangalore, India", "Lima, Peru", "Madrid, Spain"]
+TECH = ["Python", "Go", "GCP", "AWS", "Kubernetes", "React", "Postgres", "Spark", "Rust"]
+
+
+def synthetic_applicant(i: int, rnd: random.Random) -> Dict:
+    """Perfil comprimido sintético con la misma forma que sample_compressed.json."""
+    experiences: List[Dict] = []
+    year = 2010 + rnd.randint(0, 8)
+    for _ in range(rnd.randint(1, 4)):
+        span = rnd.randint(1, 4)
+        experiences.append({
+            "Company": rnd.choice(COMPANIES),
+            "Title": rnd.choice(TITLES),
+            "Start": f"{year}-0{rnd.randint(1, 9)}-01",
+            "End": f"{year + span}-0{rnd.randint(1, 9)}-01",
+            "Technologies": ", ".join(rnd.sample(TECH, 2)),
+        })
+        year += span
+    return {
+        "Applicant ID": f"{i:06d}",
+        "personal": {
+            "Full Name": f"Applicant {i}",
+            "Email": f"applicant{i}@example.com",
+            "Location": rnd.choice(LOCATIONS),
+            "LinkedIn": f"https://linkedin.com/in/applicant{i}",
+        },
+        "experience": experiences,
+        "salary": {
+            "Preferred Rate": rnd.choice([40, 60, 80, 100, 120, 150]),
+            "Minimum Rate": rnd.choice([30, 50, 70]),
+            "Currency": "USD",
+            "Availability (hrs/wk)": rnd.choice([10, 20, 30, 40]),
+        },
+    }
+
+
+def seed_base(stub: StubAirtable, n: int, tables: Dict[str, str], seed: int = 7) -> List[Dict]:
+    """Carga n applicants sintéticos (padre + tablas hijas) directamente en el stub."""
+    rnd = random.Random(seed)
+    profiles = []
+    for i in range(1, n + 1):
+        profile = synthetic_applicant(i, rnd)
+        parent = stub.insert(tables["applicants"], {LINK_FIELD: profile["Applicant ID"]})
+        link = {LINK_FIELD: [parent["id"]]}
+        stub.insert(tables["personal"], {**profile["personal"], **link})
+        stub.insert(tables["salary"], {**profile["salary"], **link})
+        for exp in profile["experience"]:
+            stub.insert(tables["experience"], {**exp, **link})
+        profiles.append(profile)
+    return profiles
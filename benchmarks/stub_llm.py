@@ -0,0 +1,152 @@
+"""Servidor local que imita las APIs de OpenAI, Anthropic y Gemini para probar el paso LLM sin API key.
+
+Apuntar OPENAI_BASE_URL, ANTHROPIC_BASE_URL o GEMINI_BASE_URL a la URL que devuelve start().
+"""
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+
+# Same marker scripts.llm_batch puts before each profile
+_PROFILE_RE = re.compile(r"^### applicant_id: (?P<id>\S+)\n(?P<json>.*?)(?=\n\n### applicant_id: |\Z)",
+                         re.MULTILINE | re.DOTALL)
+
+
+class StubLLM:
+    """bad_item_rate: fracción de items de un lote que se devuelven con score inválido (para ejercitar reenvíos).
+    error_rate: fracción de requests que responden 503; slow_rate/slow_latency: cola lenta de latencia.
+    """
+
+    def __init__(self, latency: float = 0.0, bad_item_rate: float = 0.0, seed: int = 7,
+                 error_rate: float = 0.0, slow_rate: float = 0.0, slow_latency: float = 0.0):
+        self.latency = latency
+        self.bad_item_rate = bad_item_rate
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.request_count = 0
+        self.error_count = 0
+        self.items_scored = 0
+        self.prompt_chars = 0
+        self._rnd = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def reset_counters(self):
+        with self._lock:
+            self.request_count = 0
+            self.error_count = 0
+            self.items_scored = 0
+            self.prompt_chars = 0
+
+    @staticmethod
+    def _score(profile_text: str) -> int:
+        # Deterministic per profile so cached and fresh results agree
+        return 1 + sum(profile_text.encode("utf-8")) % 10
+
+    def _batch_reply(self, profiles: List[Dict]) -> str:
+        out = []
+        for p in profiles:
+            with self._lock:
+                bad = self._rnd.random() < self.bad_item_rate
+            out.append({
+                "applicant_id": p["id"],
+                "summary": f"Candidate {p['id']} reviewed by the stub model.",
+                "score": "high" if bad else self._score(p["json"]),
+                "issues": [],
+                "followups": ["Can you confirm your availability?"],
+            })
+        return json.dumps(out)
+
+    def _single_reply(self, prompt: str) -> str:
+        return (
+            "Summary: Candidate reviewed by the stub model.\n"
+            f"Score: {self._score(prompt)}\n"
+            "Issues: None\n"
+            "Follow-Ups:\n"
+            "- Can you confirm your availability?"
+        )
+
+    def draw(self) -> Tuple[float, bool]:
+        """(latencia de este request, si debe fallar con 503)."""
+        with self._lock:
+            slow = self._rnd.random() < self.slow_rate
+            fail = self._rnd.random() < self.error_rate
+            if fail:
+                self.error_count += 1
+        return (self.slow_latency if slow else self.latency), fail
+
+    def reply(self, prompt: str) -> str:
+        profiles = [m.groupdict() for m in _PROFILE_RE.finditer(prompt)]
+        with self._lock:
+            self.request_count += 1
+            self.items_scored += max(len(profiles), 1)
+            self.prompt_chars += len(prompt)
+        return self._batch_reply(profiles) if profiles else self._single_reply(prompt)
+
+    def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        stub = self
+
+        class Handler(_Handler):
+            pass
+        Handler.stub = stub
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_address[1]}/v1"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    stub: StubLLM
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; without this each response waits on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # noqa: A002 - silence default stderr logging
+        pass
+
+    def _send(self, status: int, body: Dict):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        path = self.path.split("?", 1)[0]
+        if path.endswith("/chat/completions") or path.endswith("/messages"):
+            prompt = "".join(m.get("content", "") for m in body.get("messages", []) if m.get("role") == "user")
+        elif path.endswith(":generateContent"):
+            prompt = "".join(p.get("text", "") for c in body.get("contents", []) for p in c.get("parts", []))
+        else:
+            return self._send(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+        latency, fail = self.stub.draw()
+        if latency:
+            time.sleep(latency)
+        if fail:
+            return self._send(503, {"error": {"message": "stub overloaded"}})
+        content = self.stub.reply(prompt)
+        if path.endswith("/messages"):
+            self._send(200, {"content": [{"type": "text", "text": content}], "stop_reason": "end_turn"})
+        elif path.endswith(":generateContent"):
+            self._send(200, {"candidates": [{"content": {"parts": [{"text": content}]}}]})
+        else:
+            self._send(200, {
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content},
+                             "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": len(content) // 4},
+            })
@@ -1,13 +1,22 @@
+import threading
+import time
+from functools import lru_cache
 import requests
-from typing import Dict, List, Optional
-from .config import AIRTABLE_API_KEY, AIRTABLE_BASE_ID, require # type: ignore
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from .config import AIRTABLE_API_KEY, AIRTABLE_BASE_ID, AIRTABLE_API_BASE, AIRTABLE_RATE_PER_SEC, require # type: ignore
+from .http_client import get_client
+from .metrics import get_metrics
 
 # Ensure environment variables are strings for type safety
 AIRTABLE_API_KEY: str = str(AIRTABLE_API_KEY)
 AIRTABLE_BASE_ID: str = str(AIRTABLE_BASE_ID)
 
-API_BASE = "https://api.airtable.com/v0"
+API_BASE = AIRTABLE_API_BASE
 
+# Airtable accepts at most 10 records per create/update/delete request
+MAX_RECORDS_PER_REQUEST = 10
+
+@lru_cache(maxsize=1)
 def _headers():
     token = require(AIRTABLE_API_KEY, "AIRTABLE_API_KEY")
     return {
@@ -15,11 +24,34 @@ def _headers():
         "Content-Type": "application/json"
     }
 
+@lru_cache(maxsize=None)
 def _url(table_name: str):
     base_id = require(AIRTABLE_BASE_ID, "AIRTABLE_BASE_ID")
     return f"{API_BASE}/{base_id}/{requests.utils.quote(table_name, safe='')}" # type: ignore
 
-def list_records(table_name: str, filter_formula: Optional[str] = None, fields: Optional[List[str]] = None, page_size: int = 100) -> List[Dict]:
+@lru_cache(maxsize=1)
+def _bucket() -> str:
+    # Airtable's 5 req/s limit applies per base
+    name = f"airtable:{AIRTABLE_BASE_ID}"
+    get_client().set_rate(name, AIRTABLE_RATE_PER_SEC)
+    return name
+
+def _request(method: str, url: str, table_name: str, **kwargs) -> requests.Response:
+    t0 = time.perf_counter()
+    resp = None
+    try:
+        resp = get_client().request(method, url, bucket=_bucket(), headers=_headers(), timeout=30, **kwargs)
+    finally:
+        get_metrics().record_http("airtable", resp, time.perf_counter() - t0, table=table_name, method=method)
+    resp.raise_for_status()
+    return resp
+
+def iter_records(table_name: str, filter_formula: Optional[str] = None, fields: Optional[List[str]] = None,
+                 page_size: int = 100) -> Iterator[Dict]:
+    """Devuelve los records página por página, sin juntar la tabla entera en memoria.
+
+    fields limita las columnas que manda Airtable (el id viene siempre); filter_formula filtra del lado del servidor.
+    """
     url = _url(table_name)
     params = {"pageSize": page_size}
     if filter_formula:
@@ -28,40 +60,191 @@ def list_records(table_name: str, filter_formula: Optional[str] = None, fields:
         for i, fld in enumerate(fields):
             params[f"fields[{i}]"] = fld # type: ignore
 
-    out = []
     offset = None
     while True:
         if offset:
             params["offset"] = offset
-        resp = requests.get(url, headers=_headers(), params=params, timeout=30)
-        resp.raise_for_status()
+        resp = _request("GET", url, table_name, params=params)
         data = resp.json()
-        out.extend(data.get("records", []))
+        yield from data.get("records", [])
         offset = data.get("offset")
         if not offset:
             break
-    return out
+
+def base_request(method: str, path: str, label: str, **kwargs) -> requests.Response:
+    """Request a un endpoint de la base que no es una tabla (webhooks, meta); path va después de API_BASE."""
+    return _request(method, f"{API_BASE}/{path}", label, **kwargs)
+
+def list_records(table_name: str, filter_formula: Optional[str] = None, fields: Optional[List[str]] = None, page_size: int = 100) -> List[Dict]:
+    return list(iter_records(table_name, filter_formula=filter_formula, fields=fields, page_size=page_size))
 
 def create_record(table_name: str, fields: Dict) -> Dict:
     url = _url(table_name)
     payload = {"records": [{"fields": fields}]}
-    resp = requests.post(url, headers=_headers(), json=payload, timeout=30)
-    resp.raise_for_status()
+    resp = _request("POST", url, table_name, json=payload)
     return resp.json()["records"][0]
 
 def update_record(table_name: str, record_id: str, fields: Dict) -> Dict:
     url = _url(table_name)
     payload = {"records": [{"id": record_id, "fields": fields}]}
-    resp = requests.patch(url, headers=_headers(), json=payload, timeout=30)
-    resp.raise_for_status()
+    resp = _request("PATCH", url, table_name, json=payload)
     return resp.json()["records"][0]
 
+def _chunks(items: List, size: int = MAX_RECORDS_PER_REQUEST) -> Iterable[List]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def create_records(table_name: str, fields_list: List[Dict]) -> List[Dict]:
+    url = _url(table_name)
+    out = []
+    for chunk in _chunks(fields_list):
+        payload = {"records": [{"fields": f} for f in chunk]}
+        resp = _request("POST", url, table_name, json=payload)
+        out.extend(resp.json()["records"])
+    return out
+
+def update_records(table_name: str, updates: List[Tuple[str, Dict]]) -> List[Dict]:
+    url = _url(table_name)
+    out = []
+    for chunk in _chunks(updates):
+        payload = {"records": [{"id": rid, "fields": f} for rid, f in chunk]}
+        resp = _request("PATCH", url, table_name, json=payload)
+        out.extend(resp.json()["records"])
+    return out
+
 def delete_records(table_name: str, record_ids: List[str]):
     url = _url(table_name)
-    # Airtable supports batch deletes via query string ?records[]=rec1&records[]=rec2
-    params = []
-    for rid in record_ids:
-        params.append(("records[]", rid))
-    resp = requests.delete(url, headers=_headers(), params=params, timeout=30)
-    resp.raise_for_status()
-    return resp.json()
+    out = {"records": []}
+    for chunk in _chunks(record_ids):
+        # Airtable supports batch deletes via query string ?records[]=rec1&records[]=rec2
+        params = []
+        for rid in chunk:
+            params.append(("records[]", rid))
+        resp = _request("DELETE", url, table_name, params=params)
+        out["records"].extend(resp.json().get("records", []))
+    return out
+
+
+class BatchWriter:
+    """Acumula creates/updates/deletes por tabla y los envía en requests de hasta 10 records.
+
+    Updates pendientes sobre el mismo record ID se fusionan en un solo PATCH. Cada cola se
+    envía apenas llena un request y el resto al hacer flush() (o al salir del bloque with).
+    Con dry_run=True no se envía nada: solo se cuentan los records que se habrían escrito.
+    flush() espera también los envíos que otros threads tengan en vuelo; failed_sends cuenta
+    los requests que fallaron (para no dar por escrito lo que iba en ellos). create() acepta
+    on_created(record_id), llamado cuando el record ya existe en Airtable.
+    """
+
+    def __init__(self, dry_run: bool = False):
+        self.dry_run = dry_run
+        self.skipped = {"create": 0, "update": 0, "delete": 0}
+        self.failed_sends = 0
+        self._in_flight = 0
+        # Queued creates: (fields, on_created callback or None)
+        self._creates: Dict[str, List[Tuple[Dict, Optional[Callable[[str], None]]]]] = {}
+        self._updates: Dict[str, Dict[str, Dict]] = {}
+        self._deletes: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def create(self, table_name: str, fields: Dict, on_created: Optional[Callable[[str], None]] = None):
+        with self._lock:
+            queue = self._creates.setdefault(table_name, [])
+            queue.append((fields, on_created))
+            full = self._creates.pop(table_name) if len(queue) >= MAX_RECORDS_PER_REQUEST else None
+        if full:
+            self._sending(self._send_creates, table_name, full)
+
+    def update(self, table_name: str, record_id: str, fields: Dict):
+        with self._lock:
+            queue = self._updates.setdefault(table_name, {})
+            if record_id in queue:
+                queue[record_id].update(fields)
+            else:
+                queue[record_id] = dict(fields)
+            full = self._updates.pop(table_name) if len(queue) >= MAX_RECORDS_PER_REQUEST else None
+        if full:
+            self._sending(self._send_updates, table_name, full)
+
+    def delete(self, table_name: str, record_id: str):
+        with self._lock:
+            # A pending update to a record that is going away is pointless
+            self._updates.get(table_name, {}).pop(record_id, None)
+            queue = self._deletes.setdefault(table_name, [])
+            if record_id not in queue:
+                queue.append(record_id)
+            full = self._deletes.pop(table_name) if len(queue) >= MAX_RECORDS_PER_REQUEST else None
+        if full:
+            self._sending(self._send_deletes, table_name, full)
+
+    def flush(self):
+        # Queues are swapped out under the lock and sent outside it, so other
+        # threads can keep queueing while a request is in flight
+        with self._lock:
+            creates, self._creates = self._creates, {}
+            updates, self._updates = self._updates, {}
+            deletes, self._deletes = self._deletes, {}
+        sends = ([(self._send_creates, t, q) for t, q in creates.items() if q]
+                 + [(self._send_updates, t, p) for t, p in updates.items() if p]
+                 + [(self._send_deletes, t, ids) for t, ids in deletes.items() if ids])
+        error: Optional[Exception] = None
+        for send_fn, table_name, batch in sends:
+            # One failed request must not drop the batches queued behind it
+            try:
+                self._sending(send_fn, table_name, batch)
+            except Exception as e:
+                error = error or e
+        with self._lock:
+            while self._in_flight:
+                self._idle.wait()
+        if error is not None:
+            raise error
+
+    def _sending(self, send_fn, table_name: str, batch):
+        with self._lock:
+            self._in_flight += 1
+        try:
+            send_fn(table_name, batch)
+        except Exception:
+            with self._lock:
+                self.failed_sends += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                if not self._in_flight:
+                    self._idle.notify_all()
+
+    def _send_creates(self, table_name: str, queue: List[Tuple[Dict, Optional[Callable[[str], None]]]]):
+        if self.dry_run:
+            self._count_skipped("create", len(queue))
+            return
+        created = create_records(table_name, [fields for fields, _ in queue])
+        # Airtable returns the new records in request order
+        for (_, on_created), rec in zip(queue, created):
+            if on_created is not None:
+                on_created(rec["id"])
+
+    def _send_updates(self, table_name: str, pending: Dict[str, Dict]):
+        if self.dry_run:
+            self._count_skipped("update", len(pending))
+        else:
+            update_records(table_name, list(pending.items()))
+
+    def _send_deletes(self, table_name: str, ids: List[str]):
+        if self.dry_run:
+            self._count_skipped("delete", len(ids))
+        else:
+            delete_records(table_name, ids)
+
+    def _count_skipped(self, op: str, n: int):
+        with self._lock:
+            self.skipped[op] += n
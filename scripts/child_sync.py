@@ -0,0 +1,116 @@
+import hashlib
+import json
+from typing import Dict, Iterable, List, Sequence, Set, Tuple
+
+from .config import (
+    TABLE_PERSONAL, TABLE_EXPERIENCE, TABLE_SALARY, FIELD_APPLICANT_ID
+)
+
+# Columns the importer owns in each child table (see the schema in README). A column
+# listed here but missing from the incoming row is cleared on update.
+SYNC_FIELDS: Dict[str, Tuple[str, ...]] = {
+    TABLE_PERSONAL: ("Full Name", "Email", "Location", "LinkedIn"),
+    TABLE_EXPERIENCE: ("Company", "Title", "Start", "End", "Technologies"),
+    TABLE_SALARY: ("Preferred Rate", "Minimum Rate", "Currency", "Availability (hrs/wk)"),
+}
+
+
+def _empty(value) -> bool:
+    return value is None or value == "" or value == []
+
+
+def _project(fields: Dict, keys: Iterable[str]) -> Dict:
+    # Airtable omits empty cells, so empty and missing are the same thing here
+    return {k: fields[k] for k in keys if k in fields and not _empty(fields[k])}
+
+
+def fingerprint(fields: Dict, keys: Iterable[str]) -> str:
+    """Hash estable de una fila normalizada, restringida a las columnas sincronizadas."""
+    canonical = json.dumps(_project(fields, keys), sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class SyncPlan:
+    """Conjunto mínimo de writes para que las filas existentes queden iguales a las entrantes."""
+
+    def __init__(self):
+        self.creates: List[Dict] = []
+        self.updates: List[Tuple[str, Dict]] = []
+        self.deletes: List[str] = []
+        self.unchanged = 0
+
+
+def _diff(current: Dict, wanted: Dict, keys: Sequence[str]) -> Dict:
+    """Solo los campos que cambian; None borra una columna sincronizada que ya no viene."""
+    changes = {k: v for k, v in wanted.items() if current.get(k) != v}
+    for k in keys:
+        if k not in wanted and not _empty(current.get(k)):
+            changes[k] = None
+    return changes
+
+
+def reconcile(existing: List[Dict], incoming: List[Dict], keys: Sequence[str], single: bool = False) -> SyncPlan:
+    """Empareja filas existentes ({"id", "fields"}) con filas entrantes ya normalizadas.
+
+    1) filas con el mismo fingerprint se conservan sin tocar;
+    2) las que quedan se emparejan por cantidad de columnas iguales y se actualizan en sitio
+       (conservando record ID e historial); con single=True se empareja aunque no coincida nada;
+    3) lo que sobra se crea o se borra.
+    """
+    plan = SyncPlan()
+    wanted = [_project(row, keys) for row in incoming]
+
+    by_fp: Dict[str, List[int]] = {}
+    for i, row in enumerate(existing):
+        by_fp.setdefault(fingerprint(row.get("fields", {}), keys), []).append(i)
+
+    used: Set[int] = set()
+    pending: List[int] = []
+    for j, row in enumerate(wanted):
+        candidates = by_fp.get(fingerprint(row, keys))
+        if candidates:
+            used.add(candidates.pop(0))
+            plan.unchanged += 1
+        else:
+            pending.append(j)
+
+    leftovers = [i for i in range(len(existing)) if i not in used]
+    scored: List[Tuple[int, int, int]] = []
+    for j in pending:
+        for i in leftovers:
+            current = _project(existing[i].get("fields", {}), keys)
+            score = sum(1 for k, v in wanted[j].items() if current.get(k) == v)
+            if score > 0 or single:
+                scored.append((score, i, j))
+    # Best matches first; ties keep file order
+    scored.sort(key=lambda t: (-t[0], t[2], t[1]))
+
+    matched_j: Set[int] = set()
+    for _, i, j in scored:
+        if i in used or j in matched_j:
+            continue
+        used.add(i)
+        matched_j.add(j)
+        changes = _diff(existing[i].get("fields", {}), wanted[j], keys)
+        if changes:
+            plan.updates.append((existing[i]["id"], changes))
+        else:
+            plan.unchanged += 1
+
+    for j in pending:
+        if j not in matched_j:
+            plan.creates.append(wanted[j])
+    for i in range(len(existing)):
+        if i not in used:
+            plan.deletes.append(existing[i]["id"])
+    return plan
+
+
+def sync_keys(table_name: str, incoming: List[Dict]) -> List[str]:
+    """Columnas a comparar: las del esquema más cualquier otra que venga en el archivo (sin el link)."""
+    keys = list(SYNC_FIELDS.get(table_name, ()))
+    for row in incoming:
+        for k in row:
+            if k not in keys and k != FIELD_APPLICANT_ID:
+                keys.append(k)
+    return keys
@@ -0,0 +1,149 @@
+import base64
+import hashlib
+import json
+import math
+import zlib
+from typing import Any, Callable, Dict, List
+
+from .config import COMPRESSED_JSON_ENCODING, COMPRESSED_JSON_ZLIB_MIN_CHARS
+
+try:
+    import orjson
+except ImportError:  # optional: _stdlib_dumps writes the same canonical text, only slower
+    orjson = None
+
+# Version of the Compressed JSON layout; bump it and add a migration when the shape changes
+SCHEMA_VERSION = 1
+VERSION_KEY = "_v"
+
+# Stored values starting with this are base64'd zlib of the canonical JSON
+ZLIB_PREFIX = "zlib:"
+
+ENCODINGS = ("json", "zlib")
+
+# MIGRATIONS[v] upgrades a decoded profile from version v to v + 1
+# v0 is the untagged format written before versioning; its shape is the same as v1
+MIGRATIONS: Dict[int, Callable[[Dict], Dict]] = {
+    0: lambda profile: profile,
+}
+
+
+def _float_text(value: float) -> str:
+    """Float como lo escribe orjson: el repr de Python, con exponente sin "+" ni ceros (1e16, 1e-7),
+    decimal en el rango e-5 (0.00001) y null para nan/inf."""
+    if not math.isfinite(value):
+        return "null"
+    text = float.__repr__(value)
+    mantissa, e, exponent = text.partition("e")
+    if not e:
+        return text
+    exponent = int(exponent)
+    if exponent == -5:
+        sign = "-" if mantissa.startswith("-") else ""
+        return f"{sign}0.0000{mantissa.lstrip('-').replace('.', '')}"
+    return f"{mantissa}e{exponent}"
+
+
+def _stdlib_dumps(obj: Any, out: List[str]):
+    # The stdlib encoder writes floats as repr() (1e+16, 1e-05) and cannot be told otherwise,
+    # so the canonical text is built here; strings, ints and literals are written by json itself
+    if isinstance(obj, float):
+        out.append(_float_text(obj))
+    elif isinstance(obj, dict):
+        out.append("{")
+        for i, (key, value) in enumerate(sorted(obj.items(), key=lambda kv: kv[0])):
+            if i:
+                out.append(",")
+            # Non-string keys as json converts them ("1", "true", ...)
+            out.append(json.dumps(key, ensure_ascii=False) if isinstance(key, str)
+                       else json.dumps({key: 0}, ensure_ascii=False)[1:-3])
+            out.append(":")
+            _stdlib_dumps(value, out)
+        out.append("}")
+    elif isinstance(obj, (list, tuple)):
+        out.append("[")
+        for i, value in enumerate(obj):
+            if i:
+                out.append(",")
+            _stdlib_dumps(value, out)
+        out.append("]")
+    else:
+        out.append(json.dumps(obj, ensure_ascii=False))
+
+
+def dumps(obj: Any) -> str:
+    """JSON canónico: claves ordenadas, sin espacios, UTF-8 sin escapar (mismo texto con o sin orjson)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+        except TypeError:
+            # Integers beyond 64 bits and other types orjson refuses
+            pass
+    out: List[str] = []
+    _stdlib_dumps(obj, out)
+    return "".join(out)
+
+
+def loads(text: str) -> Any:
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def encode(profile: Dict, encoding: str = COMPRESSED_JSON_ENCODING,
+           zlib_min_chars: int = COMPRESSED_JSON_ZLIB_MIN_CHARS) -> str:
+    """Texto a guardar en Compressed JSON: JSON canónico con la versión de esquema.
+
+    Con encoding="zlib", los perfiles de al menos zlib_min_chars se guardan como "zlib:<base64>".
+    """
+    if encoding not in ENCODINGS:
+        raise ValueError(f"Unsupported Compressed JSON encoding: {encoding}")
+    text = dumps({**profile, VERSION_KEY: SCHEMA_VERSION})
+    if encoding == "zlib" and len(text) >= zlib_min_chars:
+        packed = base64.b64encode(zlib.compress(text.encode("utf-8"), 9)).decode("ascii")
+        # Only worth it when the base64 overhead does not eat the gain
+        if len(packed) + len(ZLIB_PREFIX) < len(text):
+            return ZLIB_PREFIX + packed
+    return text
+
+
+def decode(text: str) -> Dict:
+    """Perfil a partir de cualquier formato guardado (sin versión, versionado o zlib), migrado a SCHEMA_VERSION.
+
+    Lanza ValueError si el texto no es un perfil válido o viene de un esquema más nuevo.
+    """
+    if text.startswith(ZLIB_PREFIX):
+        try:
+            text = zlib.decompress(base64.b64decode(text[len(ZLIB_PREFIX):])).decode("utf-8")
+        except (zlib.error, ValueError) as e:
+            raise ValueError(f"Corrupt zlib Compressed JSON: {e}") from e
+    profile = loads(text)
+    if not isinstance(profile, dict):
+        raise ValueError("Compressed JSON is not an object")
+    version = profile.pop(VERSION_KEY, 0)
+    if not isinstance(version, int) or version > SCHEMA_VERSION:
+        raise ValueError(f"Compressed JSON schema version {version} is newer than {SCHEMA_VERSION}")
+    while version < SCHEMA_VERSION:
+        profile = MIGRATIONS[version](profile)
+        version += 1
+    return profile
+
+
+def content_key(text: str) -> str:
+    """JSON canónico del contenido, sin versión ni zlib: igual para todo texto que guarde el mismo perfil."""
+    return dumps(decode(text))
+
+
+def content_hash(profile: Dict) -> str:
+    return hashlib.sha256(dumps(profile).encode("utf-8")).hexdigest()
+
+
+def same_profile(stored_text: str, profile: Dict) -> bool:
+    """True si el texto guardado (en cualquier formato) tiene exactamente este perfil."""
+    try:
+        return decode(stored_text) == profile
+    except ValueError:
+        return False
+
+
+def plain_json(text: str) -> str:
+    """Texto JSON legible (para el prompt en formato json): los valores zlib se expanden."""
+    return dumps(decode(text)) if text.startswith(ZLIB_PREFIX) else text
@@ -1,10 +1,38 @@
-import json
-from typing import Dict, List
+import logging
+from typing import Callable, Dict, Iterable, List, Optional
 from .config import (
     TABLE_APPLICANTS, TABLE_PERSONAL, TABLE_EXPERIENCE, TABLE_SALARY,
     FIELD_APPLICANT_ID, FIELD_COMPRESSED_JSON
 )
-from .airtable_client import list_records, update_record
+from .airtable_client import BatchWriter, iter_records, list_records, update_record
+from .codec import encode
+from .models import Applicant
+
+log = logging.getLogger(__name__)
+
+
+def _clean_child_fields(row: Dict) -> Dict:
+    """Copia los fields de una fila hija sin el link a Applicants y con fechas cortadas a YYYY-MM-DD."""
+    fields = row["fields"].copy()
+    fields.pop(FIELD_APPLICANT_ID, None)
+
+    for key in ["Start", "End"]:
+        if fields.get(key) and isinstance(fields[key], str):
+            fields[key] = fields[key][:10]
+
+    return fields
+
+
+def _assemble(personal_rows: List[Dict], salary_rows: List[Dict], exp_rows: List[Dict]) -> Dict:
+    personal = _clean_child_fields(personal_rows[0]) if personal_rows else {}
+    salary = _clean_child_fields(salary_rows[0]) if salary_rows else {}
+    experiences = [_clean_child_fields(r) for r in exp_rows]
+
+    return {
+        "personal": personal,
+        "experience": experiences,
+        "salary": salary
+    }
 
 
 def compress_for_applicant(applicant_id: str) -> Dict:
@@ -13,40 +41,57 @@ def compress_for_applicant(applicant_id: str) -> Dict:
 
     # 1) Personal Details (one-to-one)
     personal_rows = list_records(TABLE_PERSONAL, filter_formula=filt)
-    personal = {}
-    if personal_rows:
-        personal = personal_rows[0]["fields"].copy()
-        personal.pop(FIELD_APPLICANT_ID, None)
 
     # 2) Salary Preferences (one-to-one)
     salary_rows = list_records(TABLE_SALARY, filter_formula=filt)
-    salary = {}
-    if salary_rows:
-        salary = salary_rows[0]["fields"].copy()
-        salary.pop(FIELD_APPLICANT_ID, None)
 
     # 3) Work Experience (one-to-many)
     exp_rows = list_records(TABLE_EXPERIENCE, filter_formula=filt)
-    experiences = []
-    for r in exp_rows:
-        fields = r["fields"].copy()
-        fields.pop(FIELD_APPLICANT_ID, None)
 
-        for key in ["Start", "End"]:
-            if fields.get(key) and isinstance(fields[key], str):
-                fields[key] = fields[key][:10]  
+    return _assemble(personal_rows, salary_rows, exp_rows)
 
-        experiences.append(fields)
 
-    return {
-        "personal": personal,
-        "experience": experiences,
-        "salary": salary
-    }
+def build_child_index(list_fn: Callable[..., Iterable[Dict]] = iter_records) -> Dict[str, Applicant]:
+    """Pagina cada tabla hija una sola vez y arma el perfil de cada Applicant vinculado (por record ID).
+
+    Las filas se vuelcan a models.Applicant a medida que llegan, así el índice de toda la base
+    no guarda las filas de Airtable. list_fn permite leer de otra fuente con la misma interfaz
+    (p. ej. SnapshotStore.list_records).
+    """
+    index: Dict[str, Applicant] = {}
+    for key, table_name in (("personal", TABLE_PERSONAL), ("salary", TABLE_SALARY), ("experience", TABLE_EXPERIENCE)):
+        n = 0
+        for n, r in enumerate(list_fn(table_name), 1):
+            # Link fields come back as a list of Applicants record IDs
+            links = r.get("fields", {}).get(FIELD_APPLICANT_ID) or []
+            if not links:
+                continue
+            fields = _clean_child_fields(r)
+            for applicant_rec_id in links:
+                entry = index.get(applicant_rec_id)
+                if entry is None:
+                    entry = index[applicant_rec_id] = Applicant()
+                entry.add_row(key, fields)
+        log.info(f"[COMPRESS] Prefetched {n} rows from {table_name}")
+    return index
+
+
+def compress_from_index(index: Dict[str, Applicant], applicant_record_id: str) -> Dict:
+    """Arma el JSON comprimido de un applicant a partir del índice precargado, sin requests extra."""
+    entry: Optional[Applicant] = index.get(applicant_record_id)
+    if entry is None:
+        return _assemble([], [], [])
+    return entry.to_dict()
+
 
+def write_compressed_json_to_applicant(applicant_record_id: str, compressed_obj: Dict,
+                                       writer: Optional[BatchWriter] = None, compressed_text: Optional[str] = None):
+    """Escribe el JSON comprimido en la fila Applicants correspondiente (vía writer si se pasa uno).
 
-def write_compressed_json_to_applicant(applicant_record_id: str, compressed_obj: Dict):
-    """Escribe el JSON comprimido en la fila Applicants correspondiente."""
-    update_record(TABLE_APPLICANTS, applicant_record_id, {
-        FIELD_COMPRESSED_JSON: json.dumps(compressed_obj, ensure_ascii=False)
-    })
+    compressed_text: el texto ya codificado con codec.encode, para no serializar dos veces.
+    """
+    fields = {FIELD_COMPRESSED_JSON: compressed_text if compressed_text is not None else encode(compressed_obj)}
+    if writer is not None:
+        writer.update(TABLE_APPLICANTS, applicant_record_id, fields)
+    else:
+        update_record(TABLE_APPLICANTS, applicant_record_id, fields)
@@ -5,6 +5,7 @@ load_dotenv()
 
 AIRTABLE_API_KEY = os.getenv("AIRTABLE_API_KEY")
 AIRTABLE_BASE_ID = os.getenv("AIRTABLE_BASE_ID")
+AIRTABLE_API_BASE = os.getenv("AIRTABLE_API_BASE", "https://api.airtable.com/v0")
 
 TABLE_APPLICANTS = os.getenv("AIRTABLE_TABLE_APPLICANTS", "Applicants")
 TABLE_PERSONAL = os.getenv("AIRTABLE_TABLE_PERSONAL", "Personal Details")
@@ -25,25 +26,124 @@ FIELD_SL_JSON = os.getenv("FIELD_SL_JSON", "Compressed JSON")
 FIELD_SL_REASON = os.getenv("FIELD_SL_REASON", "Score Reason")
 FIELD_SL_CREATED_AT = os.getenv("FIELD_SL_CREATED_AT", "Created At")
 
+# Stored Compressed JSON format (scripts/codec.py): "json", or "zlib" to store profiles of
+# at least COMPRESSED_JSON_ZLIB_MIN_CHARS as base64'd zlib
+COMPRESSED_JSON_ENCODING = os.getenv("COMPRESSED_JSON_ENCODING", "json").strip().lower()
+COMPRESSED_JSON_ZLIB_MIN_CHARS = int(os.getenv("COMPRESSED_JSON_ZLIB_MIN_CHARS", "4000"))
+
 TIER1_COMPANIES = [s.strip() for s in os.getenv("TIER1_COMPANIES", "").split(",") if s.strip()]
 SHORTLIST_COUNTRIES = [s.strip() for s in os.getenv("SHORTLIST_COUNTRIES", "").split(",") if s.strip()]
 MAX_RATE_USD = float(os.getenv("MAX_RATE_USD", "100"))
 MIN_AVAIL_HOURS = float(os.getenv("MIN_AVAIL_HOURS", "20"))
 
-LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")
+# "gemini" (as documented in the README) and "google" name the same provider
+_PROVIDER_ALIASES = {"gemini": "google", "claude": "anthropic"}
+
+
+def provider_name(name: str) -> str:
+    name = name.strip().lower()
+    return _PROVIDER_ALIASES.get(name, name)
+
+
+LLM_PROVIDER = provider_name(os.getenv("LLM_PROVIDER", "openai"))
+# Ordered failover list for llm_router; defaults to just LLM_PROVIDER
+LLM_PROVIDERS = [provider_name(s) for s in (os.getenv("LLM_PROVIDERS") or LLM_PROVIDER).split(",") if s.strip()]
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
 
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY", "")
 ANTHROPIC_MODEL = os.getenv("ANTHROPIC_MODEL", "claude-3-5-sonnet-latest")
+ANTHROPIC_BASE_URL = os.getenv("ANTHROPIC_BASE_URL", "https://api.anthropic.com/v1")
 
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta")
 
 LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "350"))
 LLM_RETRY_MAX = int(os.getenv("LLM_RETRY_MAX", "3"))
 LLM_RETRY_BASE_SECONDS = float(os.getenv("LLM_RETRY_BASE_SECONDS", "1.2"))
+LLM_REQUEST_TIMEOUT = float(os.getenv("LLM_REQUEST_TIMEOUT", "60"))
+# How profiles are written into prompts: "compact" (scripts/prompt_encoding.py) or "json" (verbatim)
+LLM_PROMPT_FORMAT = os.getenv("LLM_PROMPT_FORMAT", "compact")
+
+# Provider routing (scripts/llm_router.py): hedge a request once it runs past the provider's p95
+LLM_HEDGE = os.getenv("LLM_HEDGE", "false").strip().lower() in ("1", "true", "yes")
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+
+# Async LLM client (run_all --llm-concurrency N, see scripts/llm_async.py); 0 disables a budget
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+OPENAI_RPM = float(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = float(os.getenv("OPENAI_TPM", "200000"))
+ANTHROPIC_RPM = float(os.getenv("ANTHROPIC_RPM", "50"))
+ANTHROPIC_TPM = float(os.getenv("ANTHROPIC_TPM", "40000"))
+GEMINI_RPM = float(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = float(os.getenv("GEMINI_TPM", "1000000"))
+
+# Which applicants get an LLM evaluation (scripts/llm_policy.py): "all", "borderline" (shortlisted
+# plus those missing a single rule) or "shortlisted"; and a per-run token budget (0 = unlimited),
+# spent on the most promising applicants first
+LLM_EVAL_POLICY = os.getenv("LLM_EVAL_POLICY", "all").strip().lower()
+LLM_RUN_TOKEN_BUDGET = int(os.getenv("LLM_RUN_TOKEN_BUDGET", "0"))
+
+# Batched LLM evaluation (run_all --llm-batch K, see scripts/llm_batch.py)
+LLM_BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "6000"))
+LLM_BATCH_MAX_ROUNDS = int(os.getenv("LLM_BATCH_MAX_ROUNDS", "2"))
+
+# Persistent LLM result cache (see scripts/llm_cache.py)
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_cache.sqlite")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+
+# Incremental runs (run_all --incremental)
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", ".cache/run_checkpoint.json")
+CHECKPOINT_OVERLAP_SECONDS = int(os.getenv("CHECKPOINT_OVERLAP_SECONDS", "60"))
+
+# Durable job queue for resumable runs (run_all --queue, see scripts/job_queue.py)
+JOB_QUEUE_PATH = os.getenv("JOB_QUEUE_PATH", ".cache/run_queue.sqlite")
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+# Jobs are marked written after the writer is flushed, every N finished applicants
+JOB_COMMIT_EVERY = int(os.getenv("JOB_COMMIT_EVERY", "50"))
+
+# Push mode (python -m scripts.webhooks): Airtable webhook receiver + debounced processing
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8787"))
+# notificationUrl given to Airtable; empty = no pings, the daemon only polls for payloads
+WEBHOOK_PUBLIC_URL = os.getenv("WEBHOOK_PUBLIC_URL", "")
+WEBHOOK_STATE_PATH = os.getenv("WEBHOOK_STATE_PATH", ".cache/webhook_state.json")
+# An applicant is processed this long after its last edit, and at most MAX_DELAY after the first
+WEBHOOK_DEBOUNCE_SECONDS = float(os.getenv("WEBHOOK_DEBOUNCE_SECONDS", "3"))
+WEBHOOK_MAX_DELAY_SECONDS = float(os.getenv("WEBHOOK_MAX_DELAY_SECONDS", "30"))
+# Payloads are also polled this often, in case a ping is lost
+WEBHOOK_POLL_SECONDS = float(os.getenv("WEBHOOK_POLL_SECONDS", "60"))
+
+# SQLite file through which run_all shards on one host share the Airtable/LLM rate limits
+RATE_COORDINATOR_PATH = os.getenv("RATE_COORDINATOR_PATH", ".cache/rate_coordinator.sqlite")
+
+# Duplicate detection (run_all --dedup, see scripts/dedup.py): applicants without a shared Email or
+# LinkedIn are merged when both the name (trigram Jaccard) and the work history reach these similarities
+DEDUP_NAME_SIMILARITY = float(os.getenv("DEDUP_NAME_SIMILARITY", "0.6"))
+DEDUP_HISTORY_SIMILARITY = float(os.getenv("DEDUP_HISTORY_SIMILARITY", "0.8"))
+
+# Local snapshot of the base (python -m scripts.snapshot, --source snapshot)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", ".cache/snapshot.sqlite")
+
+# --- HTTP / rate limits (requests per second, 0 disables the limiter) ---
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+HTTP_MAX_429_RETRIES = int(os.getenv("HTTP_MAX_429_RETRIES", "5"))
+AIRTABLE_RATE_PER_SEC = float(os.getenv("AIRTABLE_RATE_PER_SEC", "5"))
+OPENAI_RATE_PER_SEC = float(os.getenv("OPENAI_RATE_PER_SEC", "5"))
+ANTHROPIC_RATE_PER_SEC = float(os.getenv("ANTHROPIC_RATE_PER_SEC", "2"))
+GEMINI_RATE_PER_SEC = float(os.getenv("GEMINI_RATE_PER_SEC", "2"))
+
+# Logging (scripts/log.py): level switch and "text" (plain messages) or "json" (one object per line)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Run report written at the end of run_all (.json, or .prom/.txt for Prometheus text); empty = off
+METRICS_PATH = os.getenv("METRICS_PATH", "")
 
 
 def require(var_value: str, var_name: str):
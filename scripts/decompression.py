@@ -1,30 +1,14 @@
 import json
-from typing import Dict, List, Optional
+import logging
+from typing import Dict, Iterator, List, TextIO
 from .config import (
     TABLE_PERSONAL, TABLE_EXPERIENCE, TABLE_SALARY,
     FIELD_APPLICANT_ID, TABLE_APPLICANTS
 )
-from .airtable_client import list_records, create_record, update_record, delete_records
+from .airtable_client import BatchWriter, iter_records
+from .child_sync import SyncPlan, reconcile, sync_keys
 
-
-def _get_applicant_rec_id_by_id(applicant_id_value: str) -> Optional[str]:
-    """Busca el record ID interno en Applicants dado un Applicant ID lógico (ej: '0001')."""
-    print(f"[DEBUG] Buscando rec_id para Applicant ID='{applicant_id_value}'")
-    recs = list_records(
-        TABLE_APPLICANTS,
-        filter_formula=f"{{Applicant ID}} = '{applicant_id_value}'"
-    )
-    if not recs:
-        print(f"[WARN] No Applicant found with Applicant ID {applicant_id_value}")
-        return None
-    rec_id = recs[0]["id"]
-    print(f"[DEBUG] Applicant ID '{applicant_id_value}' → rec_id {rec_id}")
-    return rec_id
-
-
-def _get_child_records(table_name: str, rec_id: str) -> List[Dict]:
-    filt = f"SEARCH('{rec_id}', ARRAYJOIN({{Applicant ID}}))"
-    return list_records(table_name, filter_formula=filt)
+log = logging.getLogger(__name__)
 
 
 def _normalize_technologies(value):
@@ -47,79 +31,154 @@ def _normalize_dates(fields: Dict) -> Dict:
     return fields
 
 
-def _ensure_single_record(table_name: str, rec_id: str, fields: Dict):
-    if "Technologies" in fields:
-        fields["Technologies"] = _normalize_technologies(fields["Technologies"])
-
-    existing = _get_child_records(table_name, rec_id)
-    if existing:
-        rid = existing[0]["id"]
-        print(f"Updating {table_name} for Applicant {rec_id} with {fields}")
-        new_fields = _normalize_dates(fields.copy())
-        new_fields[FIELD_APPLICANT_ID] = [rec_id]
+def _applicant_rec_ids() -> Dict[str, str]:
+    """Una sola pasada por Applicants (solo el Applicant ID) → {Applicant ID: record ID}."""
+    out = {}
+    for r in iter_records(TABLE_APPLICANTS, fields=[FIELD_APPLICANT_ID]):
+        value = r.get("fields", {}).get(FIELD_APPLICANT_ID)
+        if value is not None:
+            out.setdefault(str(value), r["id"])
+    log.debug(f"[SYNC] Loaded {len(out)} Applicant IDs")
+    return out
+
+
+def _child_rows_by_applicant(table_name: str) -> Dict[str, List[Dict]]:
+    """Una sola pasada por una tabla hija, agrupada por record ID del Applicant vinculado."""
+    out: Dict[str, List[Dict]] = {}
+    for r in iter_records(table_name):
+        for rec_id in r.get("fields", {}).get(FIELD_APPLICANT_ID) or []:
+            out.setdefault(rec_id, []).append(r)
+    return out
+
+
+def _prepare_fields(fields: Dict) -> Dict:
+    f = _normalize_dates(fields.copy())
+    if "Technologies" in f:
+        f["Technologies"] = _normalize_technologies(f["Technologies"])
+    f.pop(FIELD_APPLICANT_ID, None)
+    return f
+
+
+def _apply_plan(table_name: str, rec_id: str, plan: SyncPlan, writer: BatchWriter, counts: Dict[str, int]):
+    for f in plan.creates:
+        log.debug(f"Creating {table_name} record for Applicant {rec_id} with {f}")
+        writer.create(table_name, {**f, FIELD_APPLICANT_ID: [rec_id]})
+    for rid, changes in plan.updates:
+        log.debug(f"Updating {table_name} record {rid} for Applicant {rec_id} with {changes}")
+        writer.update(table_name, rid, changes)
+    for rid in plan.deletes:
+        log.debug(f"Deleting {table_name} record {rid} for Applicant {rec_id}")
+        writer.delete(table_name, rid)
+    counts["created"] += len(plan.creates)
+    counts["updated"] += len(plan.updates)
+    counts["deleted"] += len(plan.deletes)
+    counts["unchanged"] += plan.unchanged
+
+
+def _ensure_single_record(table_name: str, rec_id: str, fields: Dict, existing: List[Dict], writer: BatchWriter,
+                          counts: Dict[str, int]):
+    """Tablas 1:1: una sola fila por applicant, actualizada en sitio; las filas extra se borran."""
+    incoming = [_prepare_fields(fields)]
+    if existing and not incoming[0]:
+        # Nothing in the file for this table: keep what Airtable already has
+        return
+    plan = reconcile(existing, incoming, sync_keys(table_name, incoming), single=True)
+    _apply_plan(table_name, rec_id, plan, writer, counts)
+
+
+def _sync_all_records(table_name: str, rec_id: str, rows: List[Dict], existing: List[Dict], writer: BatchWriter,
+                      counts: Dict[str, int]):
+    """Tablas 1:N: conserva las filas idénticas, actualiza las parecidas y crea/borra solo la diferencia."""
+    incoming = [_prepare_fields(row) for row in rows]
+    plan = reconcile(existing, incoming, sync_keys(table_name, incoming))
+    _apply_plan(table_name, rec_id, plan, writer, counts)
+
+
+def _iter_json_array(f: TextIO, chunk_size: int = 1 << 16) -> Iterator[Dict]:
+    """Decodifica un array JSON elemento por elemento sin cargar el archivo entero."""
+    decoder = json.JSONDecoder()
+    buf = f.read(chunk_size).lstrip()
+    if not buf.startswith("["):
+        raise ValueError("Expected a JSON array")
+    buf = buf[1:]
+    eof = False
+    while True:
+        buf = buf.lstrip().lstrip(",").lstrip()
+        if buf.startswith("]"):
+            return
         try:
-            update_record(table_name, rid, new_fields)
-        except Exception as e:
-            print(f"[ERROR] Failed to update {table_name} for {rec_id}: {e}")
-        for r in existing[1:]:
-            delete_records(table_name, [r["id"]])
-    else:
-        fields2 = _normalize_dates(fields.copy())
-        fields2[FIELD_APPLICANT_ID] = [rec_id]
-        print(f"Creating {table_name} for Applicant {rec_id} with {fields2}")
-        try:
-            create_record(table_name, fields2)
-        except Exception as e:
-            print(f"[ERROR] Failed to create {table_name} for {rec_id}: {e}")
-
-
-def _replace_all_records(table_name: str, rec_id: str, rows: List[Dict]):
-    existing = _get_child_records(table_name, rec_id)
-    if existing:
-        print(f"Deleting {len(existing)} existing {table_name} records for Applicant {rec_id}")
-        delete_records(table_name, [r["id"] for r in existing])
-    for row in rows:
-        f = _normalize_dates(row.copy())
-        if "Technologies" in f:
-            f["Technologies"] = _normalize_technologies(f["Technologies"])
-
-        f[FIELD_APPLICANT_ID] = [rec_id]
-        print(f"Creating {table_name} record for Applicant {rec_id} with {f}")
-        try:
-            create_record(table_name, f)
-        except Exception as e:
-            print(f"[ERROR] Failed to create record in {table_name} for {rec_id}: {e}")
+            obj, end = decoder.raw_decode(buf)
+        except json.JSONDecodeError:
+            obj, end = None, -1
+        if end < 0 or (end == len(buf) and not eof):
+            if eof:
+                raise ValueError("Truncated JSON array")
+            more = f.read(chunk_size)
+            eof = not more
+            buf += more
+            continue
+        yield obj
+        buf = buf[end:]
 
 
-def decompress_from_json_file(file_path: str):
+def iter_applicants(file_path: str) -> Iterator[Dict]:
+    """Lee applicants de un array JSON o de JSON Lines (un objeto por línea), en streaming."""
     with open(file_path, "r", encoding="utf-8") as f:
-        applicants = json.load(f)
+        head = f.read(1)
+        while head and head.isspace():
+            head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            yield from _iter_json_array(f)
+            return
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
 
-    print(f"\n=== Starting decompression for {len(applicants)} Applicants from {file_path} ===")
 
-    for app in applicants:
-        applicant_id_value = app.get("Applicant ID")
-        if not applicant_id_value:
-            print(f"[WARN] Applicant missing Applicant ID, skipping: {app}")
-            continue
+def decompress_from_json_file(file_path: str):
+    log.info(f"=== Starting decompression from {file_path} ===")
 
-        rec_id = _get_applicant_rec_id_by_id(applicant_id_value)
-        if not rec_id:
-            continue
+    # Resolved once up front instead of 1 + 2 queries per table per applicant
+    rec_ids = _applicant_rec_ids()
+    existing = {t: _child_rows_by_applicant(t) for t in (TABLE_PERSONAL, TABLE_SALARY, TABLE_EXPERIENCE)}
+
+    count = 0
+    counts = {"created": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+    with BatchWriter() as writer:
+        for app in iter_applicants(file_path):
+            count += 1
+            applicant_id_value = app.get("Applicant ID")
+            if not applicant_id_value:
+                log.warning(f"[WARN] Applicant missing Applicant ID, skipping: {app}")
+                continue
+
+            rec_id = rec_ids.get(str(applicant_id_value))
+            if not rec_id:
+                log.warning(f"[WARN] No Applicant found with Applicant ID {applicant_id_value}")
+                continue
 
-        personal = app.get("personal", {}) or {}
-        salary = app.get("salary", {}) or {}
-        experiences = app.get("experience", []) or []
+            personal = app.get("personal", {}) or {}
+            salary = app.get("salary", {}) or {}
+            experiences = app.get("experience", []) or []
 
-        print(f"\n--- Decompressing Applicant {applicant_id_value} ({personal.get('Full Name')}) ---")
-        _ensure_single_record(TABLE_PERSONAL, rec_id, personal)
-        _ensure_single_record(TABLE_SALARY, rec_id, salary)
-        _replace_all_records(TABLE_EXPERIENCE, rec_id, experiences)
+            log.debug(f"--- Decompressing Applicant {applicant_id_value} ({personal.get('Full Name')}) ---")
+            _ensure_single_record(TABLE_PERSONAL, rec_id, personal,
+                                  existing[TABLE_PERSONAL].get(rec_id, []), writer, counts)
+            _ensure_single_record(TABLE_SALARY, rec_id, salary,
+                                  existing[TABLE_SALARY].get(rec_id, []), writer, counts)
+            _sync_all_records(TABLE_EXPERIENCE, rec_id, experiences,
+                              existing[TABLE_EXPERIENCE].get(rec_id, []), writer, counts)
 
-        print(f"[DONE] Finished Applicant {applicant_id_value}")
+            log.debug(f"[DONE] Finished Applicant {applicant_id_value}")
 
-    print("\n=== Decompression run finished ===")
+    log.info(f"[SYNC] Child rows: {', '.join(f'{v} {k}' for k, v in counts.items())}")
+    log.info(f"=== Decompression run finished ({count} Applicants) ===")
 
 
 if __name__ == "__main__":
-    decompress_from_json_file("sample_compressed.json")
+    import sys
+    from .log import setup_logging
+    setup_logging()
+    decompress_from_json_file(sys.argv[1] if len(sys.argv) > 1 else "sample_compressed.json")
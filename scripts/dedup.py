@@ -0,0 +1,218 @@
+import hashlib
+import re
+import struct
+import threading
+import unicodedata
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+from urllib.parse import unquote
+
+from .config import FIELD_APPLICANT_ID, DEDUP_NAME_SIMILARITY, DEDUP_HISTORY_SIMILARITY
+from .compression import compress_from_index
+from .models import Applicant
+from .rule_engine import parse_date
+
+# MinHash signature of NUM_PERM 32-bit values, split into BANDS bands of ROWS for LSH.
+# Two profiles share a band (and get compared) with probability 1 - (1 - J^ROWS)^BANDS:
+# 0.998 for J = 0.85, 0.95 for J = 0.75, 0.66 for J = 0.6, 0.19 for J = 0.4
+_BANDS = 8
+_ROWS = 4
+_NUM_PERM = _BANDS * _ROWS
+# Each blake2b digest (64 bytes) gives 16 of the hash functions
+_PERSONS = [f"dedup-{i}".encode("ascii") for i in range(_NUM_PERM // 16)]
+
+_GMAIL_DOMAINS = ("gmail.com", "googlemail.com")
+_LINKEDIN_RE = re.compile(r"linkedin\.com/(?:in|pub)/([^/?#\s]+)", re.IGNORECASE)
+_WORD_RE = re.compile(r"\w+")
+
+# LLM result reused from the canonical applicant: (summary, score, follow-ups)
+Result = Tuple[str, int, str]
+
+
+def _words(value) -> List[str]:
+    text = unicodedata.normalize("NFKD", str(value or ""))
+    return _WORD_RE.findall("".join(ch for ch in text if not unicodedata.combining(ch)).lower())
+
+
+def _month(value) -> str:
+    parsed = parse_date(str(value)) if value else None
+    return parsed.strftime("%Y-%m") if parsed else str(value or "")[:7]
+
+
+def normalize_email(value) -> Optional[str]:
+    """Email comparable: minúsculas, sin "+etiqueta" y, en Gmail, sin puntos; None si no parece un email."""
+    local, at, domain = str(value or "").strip().lower().rpartition("@")
+    if not at or not local or "." not in domain:
+        return None
+    local = local.split("+", 1)[0]
+    if domain in _GMAIL_DOMAINS:
+        local, domain = local.replace(".", ""), _GMAIL_DOMAINS[0]
+    return f"{local}@{domain}" if local else None
+
+
+def normalize_linkedin(value) -> Optional[str]:
+    """Handle del perfil (linkedin.com/in/<handle>) sin esquema, subdominio, query ni barra final."""
+    m = _LINKEDIN_RE.search(str(value or ""))
+    return unquote(m.group(1)).lower() if m else None
+
+
+def profile_shingles(profile: Dict) -> Tuple[FrozenSet[str], FrozenSet[str]]:
+    """(shingles del nombre, shingles de la experiencia) de un perfil comprimido.
+
+    El nombre va en trigramas de caracteres (tolera typos); cada trabajo aporta empresa,
+    empresa+título y empresa+mes (YYYY-MM) de inicio/fin, así un dato distinto no rompe todo el trabajo.
+    """
+    name = " ".join(_words((profile.get("personal") or {}).get("Full Name")))
+    padded = f" {name} "
+    name_set = frozenset(padded[i:i + 3] for i in range(len(padded) - 2)) if name else frozenset()
+    exp = set()
+    for e in profile.get("experience") or []:
+        company = " ".join(_words(e.get("Company")))
+        exp.add(f"c:{company}")
+        exp.add(f"t:{company}|{' '.join(_words(e.get('Title')))}")
+        exp.add(f"s:{company}|{_month(e.get('Start'))}")
+        exp.add(f"e:{company}|{_month(e.get('End'))}")
+    return name_set, frozenset(exp)
+
+
+def minhash(shingles: Iterable[str]) -> Tuple[int, ...]:
+    columns = []
+    for s in shingles:
+        data = s.encode("utf-8")
+        columns.append(struct.unpack(f"<{_NUM_PERM}I", b"".join(
+            hashlib.blake2b(data, digest_size=64, person=p).digest() for p in _PERSONS)))
+    return tuple(min(col) for col in zip(*columns))
+
+
+def jaccard(a: FrozenSet[str], b: FrozenSet[str]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class DedupIndex:
+    """Grupos de applicants que son la misma persona cargada varias veces.
+
+    Se unen por Email o LinkedIn normalizado, o por nombre y experiencia casi idénticos
+    (MinHash + LSH, confirmado con Jaccard exacto sobre ambos). Cada grupo tiene un applicant
+    canónico (el de menor Applicant ID); las copias reutilizan su veredicto y su resultado del LLM.
+    """
+
+    def __init__(self, name_similarity: float = DEDUP_NAME_SIMILARITY,
+                 history_similarity: float = DEDUP_HISTORY_SIMILARITY):
+        self.name_similarity = name_similarity
+        self.history_similarity = history_similarity
+        self.matches = {"email": 0, "linkedin": 0, "profile": 0}
+        self.reused = 0
+        self._applicant_ids: Dict[str, str] = {}
+        self._parent: Dict[str, str] = {}
+        self._keys: Dict[str, str] = {}
+        self._shingles: Dict[str, Tuple[FrozenSet[str], FrozenSet[str]]] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], str] = {}
+        self._canonical: Dict[str, str] = {}
+        self._canonicals: Set[str] = set()
+        self._results: Dict[str, Result] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, recs: List[Dict], child_index: Dict[str, Applicant]) -> "DedupIndex":
+        """Índice de los applicants listados, con los perfiles armados del índice de tablas hijas precargado."""
+        index = cls()
+        for rec in recs:
+            applicant_id_value = rec.get("fields", {}).get(FIELD_APPLICANT_ID)
+            index.add(rec["id"], str(applicant_id_value or rec["id"]), compress_from_index(child_index, rec["id"]))
+        index.finish()
+        return index
+
+    def _find(self, rid: str) -> str:
+        while self._parent[rid] != rid:
+            self._parent[rid] = self._parent[self._parent[rid]]
+            rid = self._parent[rid]
+        return rid
+
+    def _union(self, a: str, b: str, reason: str):
+        root_a, root_b = self._find(a), self._find(b)
+        if root_a != root_b:
+            self._parent[root_b] = root_a
+            self.matches[reason] += 1
+
+    def _similar(self, a: str, b: str) -> bool:
+        (name_a, exp_a), (name_b, exp_b) = self._shingles[a], self._shingles[b]
+        return (jaccard(name_a, name_b) >= self.name_similarity
+                and jaccard(exp_a, exp_b) >= self.history_similarity)
+
+    def add(self, rid: str, applicant_id: str, profile: Dict):
+        self._applicant_ids[rid] = applicant_id
+        self._parent[rid] = rid
+        personal = profile.get("personal") or {}
+        for reason, key in (("email", normalize_email(personal.get("Email"))),
+                            ("linkedin", normalize_linkedin(personal.get("LinkedIn")))):
+            if key:
+                first = self._keys.setdefault(f"{reason}:{key}", rid)
+                if first != rid:
+                    self._union(first, rid, reason)
+
+        name_set, exp_set = profile_shingles(profile)
+        # A name alone (or jobs alone) is far too common to call two applicants the same person
+        if not name_set or not exp_set:
+            return
+        self._shingles[rid] = (name_set, exp_set)
+        signature = minhash([f"n:{s}" for s in name_set] + list(exp_set))
+        for band in range(_BANDS):
+            bucket = (band, signature[band * _ROWS:(band + 1) * _ROWS])
+            first = self._buckets.setdefault(bucket, rid)
+            # Compared with the bucket's first profile only, so a crowded bucket stays linear;
+            # near-identical copies share most bands and still meet in one of them
+            if first != rid and self._find(first) != self._find(rid) and self._similar(first, rid):
+                self._union(first, rid, "profile")
+
+    def finish(self):
+        """Elige el canónico de cada grupo; después de esto canonical_of/split ya responden."""
+        groups: Dict[str, List[str]] = {}
+        for rid in self._parent:
+            groups.setdefault(self._find(rid), []).append(rid)
+        self._canonical = {}
+        for members in groups.values():
+            if len(members) < 2:
+                continue
+            canonical = min(members, key=lambda r: (self._applicant_ids[r], r))
+            for rid in members:
+                if rid != canonical:
+                    self._canonical[rid] = canonical
+        self._canonicals = set(self._canonical.values())
+        # Only the verdicts and results matter from here on
+        self._shingles.clear()
+        self._buckets.clear()
+        self._keys.clear()
+
+    def canonical_of(self, rid: str) -> Optional[str]:
+        """Record ID del applicant canónico si rid es una copia; None si es único o canónico."""
+        return self._canonical.get(rid)
+
+    def split(self, recs: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """(canónicos y únicos, copias): las copias se procesan después, cuando ya hay resultados que reutilizar."""
+        firsts = [r for r in recs if r["id"] not in self._canonical]
+        copies = [r for r in recs if r["id"] in self._canonical]
+        return firsts, copies
+
+    def record(self, rid: str, result: Result):
+        """Guarda el resultado del LLM de un applicant canónico para sus copias (los demás se ignoran)."""
+        if rid not in self._canonicals:
+            return
+        with self._lock:
+            self._results[rid] = result
+
+    def reuse(self, rid: str) -> Optional[Tuple[str, Result]]:
+        """(Applicant ID canónico, resultado del LLM) para una copia; None si el canónico no tiene resultado."""
+        canonical = self._canonical.get(rid)
+        with self._lock:
+            result = self._results.get(canonical) if canonical else None
+            if result is None:
+                return None
+            self.reused += 1
+        return self._applicant_ids[canonical], result
+
+    def summary(self) -> str:
+        groups = len(self._canonicals)
+        reasons = ", ".join(f"{k}={v}" for k, v in self.matches.items())
+        return (f"{len(self._canonical)} duplicates in {groups} groups ({reasons}), "
+                f"{self.reused} LLM results reused")
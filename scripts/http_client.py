@@ -0,0 +1,190 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import HTTP_POOL_SIZE, HTTP_MAX_429_RETRIES
+from .metrics import get_metrics
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Rate limiter token-bucket: `rate` requests por segundo con ráfagas de hasta `capacity`."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedTokenBucket:
+    """Token bucket guardado en SQLite: todos los procesos del host que usan el mismo archivo
+    comparten el presupuesto (p. ej. los shards de run_all contra el límite de 5 req/s por base).
+    """
+
+    def __init__(self, path: str, name: str, rate: float, capacity: Optional[float] = None):
+        self.path = path
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(rate, 1.0)
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS buckets (name TEXT PRIMARY KEY, tokens REAL NOT NULL,"
+                           " updated REAL NOT NULL, rate REAL NOT NULL, capacity REAL NOT NULL)")
+        with self._lock:
+            # The latest configuration wins; tokens already spent by other processes stay spent
+            self._conn.execute("INSERT INTO buckets (name, tokens, updated, rate, capacity) VALUES (?, ?, ?, ?, ?)"
+                               " ON CONFLICT(name) DO UPDATE SET rate = excluded.rate, capacity = excluded.capacity",
+                               (name, self.capacity, time.time(), self.rate, self.capacity))
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Toma los tokens si hay; si no, devuelve los segundos a esperar antes de reintentar."""
+        if self.rate <= 0:
+            return 0.0
+        tokens = min(tokens, self.capacity)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                available, updated = self._conn.execute(
+                    "SELECT tokens, updated FROM buckets WHERE name = ?", (self.name,)).fetchone()
+                # Wall clock, shared by every process; a clock step back only delays refills
+                now = time.time()
+                available = min(self.capacity, available + max(now - updated, 0.0) * self.rate)
+                wait = 0.0
+                if available >= tokens:
+                    available -= tokens
+                else:
+                    wait = (tokens - available) / self.rate
+                self._conn.execute("UPDATE buckets SET tokens = ?, updated = ? WHERE name = ?",
+                                   (available, now, self.name))
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return wait
+
+    def acquire(self, tokens: float = 1.0):
+        while True:
+            wait = self.try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+
+def retry_after_seconds(resp: requests.Response, default: Optional[float]) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return default
+
+
+class HttpClient:
+    """Session compartida (pool de conexiones keep-alive) con un rate limiter por bucket.
+
+    Los buckets se nombran por destino ("airtable:<base>", "openai", ...) para que cada
+    API tenga su propio presupuesto aunque compartan el mismo pool.
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, max_429_retries: int = HTTP_MAX_429_RETRIES,
+                 shared_path: Optional[str] = None):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.max_429_retries = max_429_retries
+        self.shared_path = shared_path
+        self._buckets: Dict[str, Union[TokenBucket, SharedTokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def set_rate(self, bucket: str, rate: float, capacity: Optional[float] = None):
+        with self._lock:
+            if self.shared_path:
+                self._buckets[bucket] = SharedTokenBucket(self.shared_path, bucket, rate, capacity)
+            else:
+                self._buckets[bucket] = TokenBucket(rate, capacity)
+
+    def share_rates(self, path: str):
+        """Pasa los buckets (los ya creados y los que vengan) a un archivo compartido entre procesos."""
+        with self._lock:
+            self.shared_path = path
+            self._buckets = {name: SharedTokenBucket(path, name, b.rate, b.capacity)
+                             for name, b in self._buckets.items()}
+
+    def shared_bucket(self, name: str, rate: float, capacity: Optional[float] = None) -> Optional[SharedTokenBucket]:
+        """Bucket compartido para limitadores propios (p. ej. RPM/TPM de llm_async); None si no se comparte."""
+        if not self.shared_path:
+            return None
+        return SharedTokenBucket(self.shared_path, name, rate, capacity)
+
+    def _bucket(self, name: str) -> Optional[Union[TokenBucket, SharedTokenBucket]]:
+        with self._lock:
+            return self._buckets.get(name)
+
+    def request(self, method: str, url: str, bucket: Optional[str] = None, max_429_retries: Optional[int] = None,
+                **kwargs) -> requests.Response:
+        """Envía el request respetando el rate limit del bucket y reintentando 429 según Retry-After."""
+        limiter = self._bucket(bucket) if bucket else None
+        if max_429_retries is None:
+            max_429_retries = self.max_429_retries
+        backoff = 1.0
+        attempt = 0
+        while True:
+            if limiter:
+                limiter.acquire()
+            resp = self.session.request(method, url, **kwargs)
+            if resp.status_code != 429 or attempt >= max_429_retries:
+                return resp
+            wait = retry_after_seconds(resp, backoff)
+            get_metrics().inc("http_429_retries_total", bucket=bucket or "none")
+            log.info(f"[HTTP] 429 from {bucket or url}, retrying in {wait:.1f}s")
+            resp.close()
+            time.sleep(wait)
+            backoff *= 2
+            attempt += 1
+
+
+_client: Optional[HttpClient] = None
+_client_lock = threading.Lock()
+
+
+def get_client() -> HttpClient:
+    """Devuelve el HttpClient del proceso, creándolo en el primer uso."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = HttpClient()
+    return _client
@@ -0,0 +1,75 @@
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Set
+
+from .config import (
+    TABLE_APPLICANTS, TABLE_PERSONAL, TABLE_EXPERIENCE, TABLE_SALARY,
+    FIELD_APPLICANT_ID, CHECKPOINT_PATH, CHECKPOINT_OVERLAP_SECONDS
+)
+from .airtable_client import list_records
+
+# Keeps OR(RECORD_ID() = ...) formulas well under Airtable's URL length limit
+_IDS_PER_QUERY = 50
+
+
+def load_checkpoint(path: str = CHECKPOINT_PATH) -> Optional[str]:
+    """Devuelve el high-water mark guardado (ISO-8601 UTC) o None si nunca corrió."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("since")
+
+
+def save_checkpoint(since: str, path: str = CHECKPOINT_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"since": since}, f)
+    os.replace(tmp, path)
+
+
+def new_high_water_mark() -> str:
+    """Hora de inicio del run menos un margen, para tolerar desfase de reloj con Airtable."""
+    mark = datetime.now(timezone.utc) - timedelta(seconds=CHECKPOINT_OVERLAP_SECONDS)
+    return mark.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _changed_since(since: str, field: Optional[str] = None) -> str:
+    target = f"{{{field}}}" if field else ""
+    return f"IS_AFTER(LAST_MODIFIED_TIME({target}), DATETIME_PARSE('{since}'))"
+
+
+def list_changed_applicants(since: str, fields: Optional[List[str]] = None) -> List[Dict]:
+    """Applicants creados o editados desde `since`, o con alguna fila hija modificada desde entonces.
+
+    Solo se mira el Applicant ID del propio Applicant: los campos que escribe el pipeline
+    (Compressed JSON, LLM ...) no deben volver a marcarlo como cambiado. Los borrados de
+    filas hijas no actualizan LAST_MODIFIED_TIME y requieren un run completo.
+    """
+    own = list_records(
+        TABLE_APPLICANTS,
+        filter_formula=(f"OR(IS_AFTER(CREATED_TIME(), DATETIME_PARSE('{since}')), "
+                        f"{_changed_since(since, FIELD_APPLICANT_ID)})"),
+        fields=fields
+    )
+    found = {r["id"] for r in own}
+
+    linked: Set[str] = set()
+    for table_name in (TABLE_PERSONAL, TABLE_SALARY, TABLE_EXPERIENCE):
+        rows = list_records(table_name, filter_formula=_changed_since(since), fields=[FIELD_APPLICANT_ID])
+        for r in rows:
+            linked.update(r.get("fields", {}).get(FIELD_APPLICANT_ID) or [])
+
+    return list(own) + list_applicants_by_id(sorted(linked - found), fields=fields)
+
+
+def list_applicants_by_id(record_ids: List[str], fields: Optional[List[str]] = None) -> List[Dict]:
+    """Applicants por record ID, en tandas de OR(RECORD_ID() = ...); los IDs borrados no vienen."""
+    out: List[Dict] = []
+    for i in range(0, len(record_ids), _IDS_PER_QUERY):
+        chunk = record_ids[i:i + _IDS_PER_QUERY]
+        formula = "OR(" + ", ".join(f"RECORD_ID() = '{rid}'" for rid in chunk) + ")"
+        out.extend(list_records(TABLE_APPLICANTS, filter_formula=formula, fields=fields))
+    return out
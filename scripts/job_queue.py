@@ -0,0 +1,391 @@
+import argparse
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .config import (
+    JOB_QUEUE_PATH, JOB_MAX_ATTEMPTS, JOB_LEASE_SECONDS, JOB_RETRY_BASE_SECONDS, JOB_COMMIT_EVERY
+)
+from .airtable_client import BatchWriter
+from .metrics import get_metrics
+
+log = logging.getLogger(__name__)
+
+# Per-applicant progress, in order; "written" means every Airtable write of the job was flushed
+STAGES = ("pending", "compressed", "shortlisted", "llm_scored", "written")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS runs ("
+    " run_id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL,"
+    " finished_at REAL, high_water TEXT)",
+    "CREATE TABLE IF NOT EXISTS jobs ("
+    " run_id INTEGER NOT NULL, rec_id TEXT NOT NULL, applicant_id TEXT, record TEXT NOT NULL,"
+    " stage TEXT NOT NULL DEFAULT 'pending', status TEXT NOT NULL DEFAULT 'ready',"
+    " attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, owner TEXT, lease_expires REAL,"
+    " available_at REAL NOT NULL DEFAULT 0, compressed TEXT, llm TEXT, updated_at REAL,"
+    " PRIMARY KEY (run_id, rec_id))",
+    "CREATE INDEX IF NOT EXISTS jobs_claim ON jobs(run_id, status, available_at)",
+)
+
+
+def _owner_alive(owner: str) -> bool:
+    """Un owner "host:pid" de otra máquina se da por vivo; uno local, solo si el pid existe."""
+    host, _, pid = owner.rpartition(":")
+    if host != socket.gethostname() or not pid.isdigit():
+        return True
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class Job:
+    """Un applicant del run con su etapa alcanzada y lo ya calculado (JSON comprimido, salida LLM)."""
+
+    def __init__(self, row: Tuple):
+        self.rec_id, self.applicant_id, record, self.stage, self.attempts, self.compressed, llm = row
+        self.record: Dict = json.loads(record)
+        # (summary, score, followups) once the LLM step is done
+        self.llm: Optional[Tuple[str, int, str]] = tuple(json.loads(llm)) if llm else None
+
+    def reached(self, stage: str) -> bool:
+        return STAGES.index(self.stage) >= STAGES.index(stage)
+
+
+class JobQueue:
+    """Cola de jobs persistente (SQLite) para runs reanudables de run_all.
+
+    Un run encola un job por applicant. Los workers (threads o procesos sobre el mismo
+    archivo) toman jobs con un lease; si el proceso muere, el lease vence (o se libera al
+    detectar que el pid local ya no existe) y otro lo retoma desde la última etapa guardada.
+    Tras max_attempts fallos el job queda como dead letter en vez de reintentarse.
+    """
+
+    def __init__(self, path: str = JOB_QUEUE_PATH, max_attempts: int = JOB_MAX_ATTEMPTS,
+                 lease_seconds: float = JOB_LEASE_SECONDS, retry_base_seconds: float = JOB_RETRY_BASE_SECONDS):
+        self.path = path
+        self.max_attempts = max(max_attempts, 1)
+        self.lease_seconds = lease_seconds
+        self.retry_base_seconds = retry_base_seconds
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Autocommit; claims open their own BEGIN IMMEDIATE so concurrent processes serialize on them
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        for stmt in _SCHEMA:
+            self._conn.execute(stmt)
+
+    def _tx(self, fn, *args):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = fn(*args)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return out
+
+    # --- runs ---------------------------------------------------------
+    def open_run(self) -> Optional[int]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE finished_at IS NULL ORDER BY run_id DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def high_water(self, run_id: int) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT high_water FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        return row[0] if row else None
+
+    def start_run(self, records: Iterable[Dict], applicant_id_field: str,
+                  high_water: Optional[str] = None) -> Tuple[int, bool]:
+        """Encola un run nuevo, salvo que otro proceso haya abierto uno antes: (run_id, creado)."""
+        def _start():
+            row = self._conn.execute(
+                "SELECT run_id FROM runs WHERE finished_at IS NULL ORDER BY run_id DESC LIMIT 1").fetchone()
+            if row:
+                return row[0], False
+            # Finished jobs of earlier runs are no longer needed; dead letters stay for inspection
+            self._conn.execute("DELETE FROM jobs WHERE status = 'done'")
+            now = time.time()
+            run_id = self._conn.execute("INSERT INTO runs (created_at, high_water) VALUES (?, ?)",
+                                        (now, high_water)).lastrowid
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs (run_id, rec_id, applicant_id, record, updated_at) VALUES (?, ?, ?, ?, ?)",
+                ((run_id, r["id"], str(r.get("fields", {}).get(applicant_id_field)),
+                  json.dumps(r, ensure_ascii=False), now) for r in records))
+            return run_id, True
+        return self._tx(_start)
+
+    def finish_run_if_complete(self, run_id: int) -> bool:
+        """Cierra el run cuando no le quedan jobs pendientes ni tomados; True si lo cerró esta llamada."""
+        def _finish():
+            left = self._conn.execute("SELECT COUNT(*) FROM jobs WHERE run_id = ? AND status IN ('ready', 'leased')",
+                                      (run_id,)).fetchone()[0]
+            if left:
+                return False
+            # Only the process that actually closes the run gets True
+            return self._conn.execute("UPDATE runs SET finished_at = ? WHERE run_id = ? AND finished_at IS NULL",
+                                      (time.time(), run_id)).rowcount == 1
+        return self._tx(_finish)
+
+    # --- jobs ---------------------------------------------------------
+    def claim(self, run_id: int, owner: str, limit: int = 10) -> List[Job]:
+        """Toma hasta `limit` jobs listos (o con el lease vencido) y los marca como propios."""
+        def _claim():
+            now = time.time()
+            rows = self._conn.execute(
+                "SELECT rec_id, applicant_id, record, stage, attempts, compressed, llm FROM jobs"
+                " WHERE run_id = ? AND ((status = 'ready' AND available_at <= ?)"
+                " OR (status = 'leased' AND lease_expires < ?)) ORDER BY rowid LIMIT ?",
+                (run_id, now, now, limit)).fetchall()
+            self._conn.executemany(
+                "UPDATE jobs SET status = 'leased', owner = ?, lease_expires = ?, updated_at = ?"
+                " WHERE run_id = ? AND rec_id = ?",
+                ((owner, now + self.lease_seconds, now, run_id, r[0]) for r in rows))
+            return [Job(r) for r in rows]
+        return self._tx(_claim)
+
+    def next_wait(self, run_id: int) -> Optional[float]:
+        """Segundos hasta que haya un job listo (reintento con backoff); None si no queda ninguno."""
+        with self._lock:
+            row = self._conn.execute("SELECT MIN(available_at) FROM jobs WHERE run_id = ? AND status = 'ready'",
+                                     (run_id,)).fetchone()
+        return None if row[0] is None else max(row[0] - time.time(), 0.0)
+
+    def advance(self, run_id: int, rec_id: str, stage: str, compressed: Optional[str] = None,
+                llm: Optional[Tuple[str, int, str]] = None):
+        """Registra la etapa alcanzada y guarda lo calculado en ella para no repetirlo al reanudar."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, compressed = COALESCE(?, compressed), llm = COALESCE(?, llm),"
+                " updated_at = ? WHERE run_id = ? AND rec_id = ?",
+                (stage, compressed, json.dumps(list(llm), ensure_ascii=False) if llm else None, time.time(),
+                 run_id, rec_id))
+
+    def mark_written(self, run_id: int, rec_ids: List[str]):
+        now = time.time()
+        self._tx(lambda: self._conn.executemany(
+            "UPDATE jobs SET stage = 'written', status = 'done', owner = NULL, lease_expires = NULL, updated_at = ?"
+            " WHERE run_id = ? AND rec_id = ?", ((now, run_id, rid) for rid in rec_ids)))
+
+    def fail(self, run_id: int, rec_id: str, error: str, count_attempt: bool = True) -> bool:
+        """Devuelve el job a la cola con backoff, o lo manda a dead letter al agotar los intentos (True).
+
+        count_attempt=False lo reencola sin gastar un intento (el error no vino del job).
+        """
+        def _fail():
+            attempts = self._conn.execute("SELECT attempts FROM jobs WHERE run_id = ? AND rec_id = ?",
+                                          (run_id, rec_id)).fetchone()[0] + (1 if count_attempt else 0)
+            dead = count_attempt and attempts >= self.max_attempts
+            delay = self.retry_base_seconds * (2 ** max(attempts - 1, 0))
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, last_error = ?, owner = NULL, lease_expires = NULL,"
+                " available_at = ?, updated_at = ? WHERE run_id = ? AND rec_id = ?",
+                ("dead" if dead else "ready", attempts, error[:1000], time.time() + delay, time.time(),
+                 run_id, rec_id))
+            return dead
+        return self._tx(_fail)
+
+    def renew(self, owner: str):
+        with self._lock:
+            self._conn.execute("UPDATE jobs SET lease_expires = ? WHERE owner = ? AND status = 'leased'",
+                               (time.time() + self.lease_seconds, owner))
+
+    def reap(self) -> int:
+        """Libera los leases de procesos locales que ya no existen (p. ej. un run matado a mitad)."""
+        def _reap():
+            owners = [r[0] for r in self._conn.execute(
+                "SELECT DISTINCT owner FROM jobs WHERE status = 'leased' AND owner IS NOT NULL")]
+            dead = [o for o in owners if not _owner_alive(o)]
+            n = 0
+            for owner in dead:
+                n += self._conn.execute(
+                    "UPDATE jobs SET status = 'ready', owner = NULL, lease_expires = NULL WHERE owner = ?"
+                    " AND status = 'leased'", (owner,)).rowcount
+            return n
+        return self._tx(_reap)
+
+    def counts(self, run_id: Optional[int] = None) -> Dict[str, int]:
+        """Jobs por estado (done/dead/leased) y, para los pendientes, por etapa alcanzada."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT CASE WHEN status = 'ready' THEN stage ELSE status END, COUNT(*) FROM jobs"
+                " WHERE (? IS NULL OR run_id = ?) GROUP BY 1", (run_id, run_id)).fetchall()
+        return dict(rows)
+
+    def dead_letters(self, run_id: Optional[int] = None) -> List[Tuple[str, str, int, str]]:
+        """(record ID, Applicant ID, intentos, último error) de los jobs en dead letter."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT rec_id, applicant_id, attempts, last_error FROM jobs"
+                " WHERE status = 'dead' AND (? IS NULL OR run_id = ?) ORDER BY run_id, rowid",
+                (run_id, run_id)).fetchall()
+
+    def requeue_dead(self) -> int:
+        """Vuelve a encolar los dead letters en el run abierto (o en el último) con los intentos en cero."""
+        def _requeue():
+            row = self._conn.execute("SELECT MAX(run_id) FROM runs").fetchone()
+            if row[0] is None:
+                return 0
+            n = self._conn.execute(
+                "UPDATE OR REPLACE jobs SET run_id = ?, status = 'ready', attempts = 0, available_at = 0,"
+                " updated_at = ? WHERE status = 'dead'", (row[0], time.time())).rowcount
+            self._conn.execute("UPDATE runs SET finished_at = NULL WHERE run_id = ?", (row[0],))
+            return n
+        return self._tx(_requeue)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class QueueSession:
+    """Lado worker de un run: toma jobs, registra etapas y marca "written" solo después de un flush.
+
+    Los jobs terminados se acumulan y cada commit_every se hace flush del BatchWriter; si algún
+    envío falló desde que se tomaron, vuelven a la cola (ya con el LLM guardado) en vez de
+    darse por escritos. Como el batch fallido pudo ser de otro job, esas vueltas no gastan
+    intentos salvo que se repitan max_attempts veces en este proceso. Un thread renueva los
+    leases mientras el run sigue vivo.
+    """
+
+    def __init__(self, queue: JobQueue, run_id: int, writer: BatchWriter, commit_every: int = JOB_COMMIT_EVERY):
+        self.queue = queue
+        self.run_id = run_id
+        self.writer = writer
+        self.commit_every = max(commit_every, 1)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.failures: List[Tuple[str, str]] = []
+        self._started: Dict[str, int] = {}
+        self._applicant_ids: Dict[str, str] = {}
+        # Requeues of each job because some write batch failed, not because of the job itself
+        self._write_retries: Dict[str, int] = {}
+        self._finished: List[str] = []
+        self._lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._renew_leases, name="job-lease", daemon=True)
+        self._heartbeat.start()
+
+    def _renew_leases(self):
+        while not self._stop.wait(self.queue.lease_seconds / 3):
+            self.queue.renew(self.owner)
+
+    def claim(self, limit: int = 10) -> List[Job]:
+        jobs = self.queue.claim(self.run_id, self.owner, limit)
+        with self._lock:
+            for job in jobs:
+                self._started[job.rec_id] = self.writer.failed_sends
+                self._applicant_ids[job.rec_id] = str(job.applicant_id)
+        return jobs
+
+    def next_wait(self) -> Optional[float]:
+        return self.queue.next_wait(self.run_id)
+
+    def advance(self, rec_id: str, stage: str, compressed: Optional[str] = None,
+                llm: Optional[Tuple[str, int, str]] = None):
+        self.queue.advance(self.run_id, rec_id, stage, compressed=compressed, llm=llm)
+
+    def finished(self, rec_id: str):
+        with self._lock:
+            self._finished.append(rec_id)
+            due = len(self._finished) >= self.commit_every
+        if due:
+            self.commit()
+
+    def failed(self, job: Job, error: BaseException):
+        with self._lock:
+            self._started.pop(job.rec_id, None)
+        self._fail(job.rec_id, str(error))
+
+    def _fail(self, rec_id: str, error: str, count_attempt: bool = True):
+        """Devuelve el job a la cola; si queda como dead letter, cuenta como falla del run."""
+        with self._lock:
+            applicant_id = self._applicant_ids.get(rec_id, rec_id)
+        if self.queue.fail(self.run_id, rec_id, error, count_attempt=count_attempt):
+            get_metrics().inc("jobs_total", outcome="dead")
+            log.error(f"[QUEUE] Applicant {applicant_id} dead-lettered after {self.queue.max_attempts} attempts: "
+                      f"{error}")
+            with self._lock:
+                self.failures.append((applicant_id, error))
+                self._applicant_ids.pop(rec_id, None)
+                self._write_retries.pop(rec_id, None)
+        else:
+            get_metrics().inc("jobs_total", outcome="retried")
+            log.warning(f"[QUEUE] Applicant {applicant_id} failed, will retry: {error}")
+
+    def _write_failed(self, rec_ids: List[str], error: str):
+        """Jobs cuyas escrituras pudieron ir en un batch fallido: se reenvían sin gastar intentos."""
+        for rid in rec_ids:
+            with self._lock:
+                self._write_retries[rid] = self._write_retries.get(rid, 0) + 1
+                # Failing that often points at the job's own writes: attempts count again from here
+                count_attempt = self._write_retries[rid] > self.queue.max_attempts
+            self._fail(rid, error, count_attempt=count_attempt)
+
+    def commit(self):
+        """Flush del writer y marca como written los jobs terminados hasta ahora."""
+        with self._commit_lock:
+            with self._lock:
+                done, self._finished = self._finished, []
+            if not done:
+                return
+            try:
+                self.writer.flush()
+            except Exception as e:
+                log.error(f"[QUEUE] Flush failed, {len(done)} applicants go back to the queue: {e}")
+                with self._lock:
+                    for rid in done:
+                        self._started.pop(rid, None)
+                self._write_failed(done, f"flush failed: {e}")
+                return
+            with self._lock:
+                failed_sends = self.writer.failed_sends
+                started = {rid: self._started.pop(rid, failed_sends) for rid in done}
+                ok = [rid for rid in done if started[rid] == failed_sends]
+                for rid in ok:
+                    self._applicant_ids.pop(rid, None)
+                    self._write_retries.pop(rid, None)
+            self.queue.mark_written(self.run_id, ok)
+            get_metrics().inc("jobs_total", len(ok), outcome="written")
+            # A batch that may have carried these jobs' writes failed: send them again
+            self._write_failed([rid for rid in done if started[rid] != failed_sends],
+                               "an Airtable write batch failed before commit")
+
+    def close(self):
+        self._stop.set()
+        self.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect the run_all job queue.")
+    parser.add_argument("--path", default=JOB_QUEUE_PATH)
+    parser.add_argument("--dead", action="store_true", help="List dead-lettered applicants")
+    parser.add_argument("--requeue-dead", action="store_true", help="Give dead letters a fresh set of attempts")
+    args = parser.parse_args()
+    queue = JobQueue(args.path)
+    if args.requeue_dead:
+        print(f"[QUEUE] Requeued {queue.requeue_dead()} dead-lettered jobs")
+    run_id = queue.open_run()
+    print(f"[QUEUE] {'Open run ' + str(run_id) if run_id else 'No open run'}; jobs: {queue.counts()}")
+    if args.dead:
+        for rec_id, applicant_id, attempts, err in queue.dead_letters():
+            print(f"[QUEUE]   {applicant_id} ({rec_id}), {attempts} attempts: {err}")
+    queue.close()
+
+
+if __name__ == "__main__":
+    main()
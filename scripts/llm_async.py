@@ -0,0 +1,199 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+import requests
+
+from .config import (
+    LLM_PROVIDERS, LLM_MAX_OUTPUT_TOKENS, LLM_RETRY_MAX, LLM_REQUEST_TIMEOUT, LLM_MAX_IN_FLIGHT,
+    OPENAI_RPM, OPENAI_TPM, ANTHROPIC_RPM, ANTHROPIC_TPM, GEMINI_RPM, GEMINI_TPM
+)
+from .http_client import SharedTokenBucket, get_client
+from .metrics import get_metrics
+from .llm_client import LLMError, backoff_delay, build_request, parse_response, prompt_for
+from .llm_router import get_router
+from .prompt_encoding import estimate_tokens
+
+# (requests per minute, tokens per minute) per provider
+PROVIDER_LIMITS: Dict[str, Tuple[float, float]] = {
+    "openai": (OPENAI_RPM, OPENAI_TPM),
+    "anthropic": (ANTHROPIC_RPM, ANTHROPIC_TPM),
+    "google": (GEMINI_RPM, GEMINI_TPM),
+}
+
+# Transport and decoding failures that are worth another attempt
+_TRANSIENT = (requests.RequestException, ValueError, KeyError, IndexError)
+
+# (id, output, error): exactly one of output/error is set
+Result = Tuple[str, Optional[str], Optional[BaseException]]
+
+
+class AsyncRateLimiter:
+    """Token bucket por minuto para asyncio; arranca con el presupuesto de un minuto completo."""
+
+    def __init__(self, per_minute: float, shared: Optional[SharedTokenBucket] = None):
+        self.per_minute = per_minute
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        # Budget shared with other processes (run_all shards) instead of this one's own
+        self._shared = shared
+
+    async def acquire(self, amount: float = 1.0):
+        if self.per_minute <= 0:
+            return
+        # A single request larger than the whole budget waits for a full bucket instead of forever
+        amount = min(amount, self.per_minute)
+        if self._shared is not None:
+            async with self._lock:
+                while True:
+                    wait = self._shared.try_acquire(amount)
+                    if wait <= 0:
+                        return
+                    await asyncio.sleep(wait)
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.per_minute, self._tokens + (now - self._updated) * self.per_minute / 60.0)
+                self._updated = now
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return
+                await asyncio.sleep((amount - self._tokens) * 60.0 / self.per_minute)
+
+
+class AsyncLLMClient:
+    """Cliente LLM asyncio: tope de requests en vuelo, presupuestos RPM/TPM y reintentos con jitter.
+
+    Como LLMRouter, cada intento prueba los proveedores de LLM_PROVIDERS en orden y pasa al
+    siguiente ante un error; un proveedor con error no reintentable (falta la key, 401/403/400)
+    sale de la rotación. El HTTP sigue siendo la Session compartida de http_client, ejecutada
+    en un pool de threads del tamaño del tope. No hay hedging: la concurrencia ya cubre la cola lenta.
+    """
+
+    def __init__(self, providers: Sequence[str] = LLM_PROVIDERS, max_in_flight: int = LLM_MAX_IN_FLIGHT,
+                 rpm: Optional[float] = None, tpm: Optional[float] = None,
+                 max_retries: int = LLM_RETRY_MAX, timeout: float = LLM_REQUEST_TIMEOUT):
+        if not providers:
+            raise ValueError("AsyncLLMClient needs at least one provider")
+        self.providers = list(providers)
+        self.max_in_flight = max(max_in_flight, 1)
+        self.max_retries = max(max_retries, 1)
+        self.timeout = timeout
+        self.requests = 0
+        self.retries = 0
+        self.failovers = 0
+        self._sem = asyncio.Semaphore(self.max_in_flight)
+        client = get_client()
+        # Each provider spends its own budgets: (rpm limiter, tpm limiter)
+        self._limits: Dict[str, Tuple[AsyncRateLimiter, AsyncRateLimiter]] = {}
+        for provider in self.providers:
+            default_rpm, default_tpm = PROVIDER_LIMITS.get(provider, (0.0, 0.0))
+            p_rpm = default_rpm if rpm is None else rpm
+            p_tpm = default_tpm if tpm is None else tpm
+            self._limits[provider] = (
+                AsyncRateLimiter(p_rpm, client.shared_bucket(f"{provider}:rpm", p_rpm / 60.0, p_rpm)),
+                AsyncRateLimiter(p_tpm, client.shared_bucket(f"{provider}:tpm", p_tpm / 60.0, p_tpm)),
+            )
+        self._executor = ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="llm")
+
+    async def _attempt(self, provider: str, prompt: str, max_tokens: int) -> str:
+        url, headers, data = build_request(provider, prompt, max_tokens)
+        post = partial(get_client().session.post, url, headers=headers, json=data, timeout=self.timeout)
+        rpm, tpm = self._limits[provider]
+        async with self._sem:
+            await rpm.acquire(1)
+            await tpm.acquire(estimate_tokens(prompt) + max_tokens)
+            self.requests += 1
+            loop = asyncio.get_running_loop()
+            t0 = time.perf_counter()
+            try:
+                resp = await loop.run_in_executor(self._executor, partial(self._timed_post, provider, post))
+                out = parse_response(provider, resp)
+            except Exception:
+                get_router().latency.record(provider, time.perf_counter() - t0, ok=False)
+                raise
+            get_router().latency.record(provider, time.perf_counter() - t0, ok=True)
+            return out
+
+    async def complete(self, prompt: str, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> str:
+        dead = set()
+        last_err: Optional[BaseException] = None
+        retry_after: Optional[float] = None
+        for attempt in range(self.max_retries):
+            order = [p for p in self.providers if p not in dead]
+            if not order:
+                break
+            for i, provider in enumerate(order):
+                try:
+                    return await self._attempt(provider, prompt, max_tokens)
+                except LLMError as e:
+                    last_err = e
+                    if not e.retryable:
+                        dead.add(provider)
+                    retry_after = e.retry_after
+                except _TRANSIENT as e:
+                    last_err = e
+                if i + 1 < len(order):
+                    self.failovers += 1
+                    get_metrics().inc("llm_failovers_total", provider=provider)
+            # Back off outside the semaphore so other requests keep flowing
+            if attempt + 1 < self.max_retries and len(dead) < len(self.providers):
+                self.retries += 1
+                get_metrics().inc("llm_retries_total", provider=order[-1])
+                await asyncio.sleep(backoff_delay(attempt, retry_after=retry_after))
+        raise LLMError(f"LLM call failed after {self.max_retries} attempts: {last_err}",
+                       retryable=len(dead) < len(self.providers))
+
+    def _timed_post(self, provider: str, post: Callable[[], requests.Response]) -> requests.Response:
+        t0 = time.perf_counter()
+        resp = None
+        try:
+            resp = post()
+            return resp
+        finally:
+            get_metrics().record_http("llm", resp, time.perf_counter() - t0, provider=provider)
+
+    async def evaluate(self, applicant_json_text: str) -> str:
+        return await self.complete(prompt_for(applicant_json_text))
+
+    async def _one(self, item_id: str, text: str) -> Result:
+        try:
+            return item_id, await self.evaluate(text), None
+        except Exception as e:
+            return item_id, None, e
+
+    async def iter_completed(self, items: Iterable[Tuple[str, str]]) -> AsyncIterator[Result]:
+        """Envía todos los (id, JSON comprimido) y entrega (id, salida, error) a medida que terminan."""
+        tasks = [asyncio.ensure_future(self._one(item_id, text)) for item_id, text in items]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield await fut
+        finally:
+            # Consumer stopped early: don't leave requests running
+            for t in tasks:
+                t.cancel()
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def evaluate_many(items: Iterable[Tuple[str, str]], on_result: Callable[[str, Optional[str], Optional[BaseException]], None],
+                  **client_kwargs) -> Dict[str, int]:
+    """Puente sincrónico: evalúa todos los perfiles en paralelo y llama on_result(id, salida, error) al terminar cada uno."""
+    async def _drive() -> Dict[str, int]:
+        client = AsyncLLMClient(**client_kwargs)
+        done = failed = 0
+        try:
+            async for item_id, output, error in client.iter_completed(items):
+                done += 1
+                failed += error is not None
+                on_result(item_id, output, error)
+        finally:
+            client.close()
+        return {"completed": done, "failed": failed, "requests": client.requests, "retries": client.retries,
+                "failovers": client.failovers}
+
+    return asyncio.run(_drive())
@@ -0,0 +1,176 @@
+import json
+import logging
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from .config import LLM_MAX_OUTPUT_TOKENS, LLM_BATCH_TOKEN_BUDGET, LLM_BATCH_MAX_ROUNDS, LLM_PROMPT_FORMAT
+from .codec import plain_json
+from .llm_client import complete
+from .prompt_encoding import COMPACT_FORMAT_NOTE, estimate_tokens, profile_text
+
+log = logging.getLogger(__name__)
+
+BATCH_PROMPT_HEADER = (
+    "You are a recruiting analyst. For EACH applicant profile below, do four things:\n"
+    "1. Provide a concise 75-word summary.\n"
+    "2. Rate overall candidate quality from 1-10 (higher is better).\n"
+    "3. List any data gaps or inconsistencies you notice.\n"
+    "4. Suggest up to three follow-up questions to clarify gaps.\n\n"
+    "Return ONLY a JSON array (no prose, no code fences) with one object per profile:\n"
+    '[{"applicant_id": "<id exactly as given>", "summary": "<text>", "score": <integer 1-10>, '
+    '"issues": ["<text>", ...], "followups": ["<question>", ...]}]'
+)
+if LLM_PROMPT_FORMAT == "compact":
+    BATCH_PROMPT_HEADER += "\n\n" + COMPACT_FORMAT_NOTE
+
+# Marker the model copies back; also what the fake LLM in benchmarks/ looks for
+PROFILE_MARKER = "### applicant_id: "
+
+MAX_FOLLOWUPS = 3
+
+# (id, compressed JSON text)
+BatchItem = Tuple[str, str]
+
+
+def _profile_block(item_id: str, text: str) -> str:
+    return f"\n\n{PROFILE_MARKER}{item_id}\n{text}"
+
+
+def build_batch_prompt(items: Sequence[BatchItem]) -> str:
+    # Like prompt_for: a zlib-stored profile goes to the model as readable JSON
+    return BATCH_PROMPT_HEADER + "".join(_profile_block(i, plain_json(t)) for i, t in items)
+
+
+def pack_batches(items: Sequence[BatchItem], max_items: int,
+                 token_budget: int = LLM_BATCH_TOKEN_BUDGET) -> List[List[BatchItem]]:
+    """Agrupa perfiles en lotes de hasta max_items sin pasar token_budget (el header cuenta una vez por lote).
+
+    Un perfil que solo no entra en el presupuesto va en un lote propio.
+    """
+    header_tokens = estimate_tokens(BATCH_PROMPT_HEADER)
+    batches: List[List[BatchItem]] = []
+    current: List[BatchItem] = []
+    used = header_tokens
+    for item in items:
+        cost = estimate_tokens(_profile_block(*item))
+        if current and (len(current) >= max_items or used + cost > token_budget):
+            batches.append(current)
+            current, used = [], header_tokens
+        current.append(item)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _extract_array(text: str) -> List:
+    """Primer '[' hasta el último ']', tolerando prosa o code fences alrededor."""
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end <= start:
+        raise ValueError("no JSON array in response")
+    data = json.loads(text[start:end + 1])
+    if not isinstance(data, list):
+        raise ValueError("response is not a JSON array")
+    return data
+
+
+def _string_list(value, name: str) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [] if value.strip().lower() in ("", "none") else [value.strip()]
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise ValueError(f"{name} must be a list of strings")
+    return [v.strip() for v in value if v.strip()]
+
+
+def validate_item(obj) -> Dict:
+    """Valida un objeto del array contra el esquema y lo devuelve normalizado; ValueError si no cumple."""
+    if not isinstance(obj, dict):
+        raise ValueError("item is not an object")
+    summary = obj.get("summary")
+    if not isinstance(summary, str) or not summary.strip():
+        raise ValueError("summary must be a non-empty string")
+    score = obj.get("score")
+    if isinstance(score, str) and score.strip().isdigit():
+        score = int(score.strip())
+    if isinstance(score, float) and score.is_integer():
+        score = int(score)
+    if isinstance(score, bool) or not isinstance(score, int) or not 1 <= score <= 10:
+        raise ValueError(f"score must be an integer 1-10, got {obj.get('score')!r}")
+    return {
+        "applicant_id": str(obj.get("applicant_id")),
+        "summary": summary.strip(),
+        "score": score,
+        "issues": _string_list(obj.get("issues"), "issues"),
+        "followups": _string_list(obj.get("followups"), "followups")[:MAX_FOLLOWUPS],
+    }
+
+
+def parse_batch_output(text: str, expected_ids: Sequence[str]) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+    """Separa la respuesta en resultados válidos por id y errores por id (faltantes o inválidos)."""
+    try:
+        data = _extract_array(text)
+    except ValueError as e:
+        return {}, {i: str(e) for i in expected_ids}
+
+    expected = set(expected_ids)
+    results: Dict[str, Dict] = {}
+    errors: Dict[str, str] = {}
+    for obj in data:
+        item_id = str(obj.get("applicant_id")) if isinstance(obj, dict) else None
+        if item_id not in expected or item_id in results:
+            continue
+        try:
+            results[item_id] = validate_item(obj)
+            errors.pop(item_id, None)
+        except ValueError as e:
+            errors[item_id] = str(e)
+    for i in expected_ids:
+        if i not in results and i not in errors:
+            errors[i] = "missing from response"
+    return results, errors
+
+
+def call_llm_batch(items: Sequence[BatchItem], batch_size: int,
+                   token_budget: int = LLM_BATCH_TOKEN_BUDGET, max_rounds: int = LLM_BATCH_MAX_ROUNDS,
+                   complete_fn: Callable[[str, int], str] = complete) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+    """Evalúa muchos perfiles con una request por lote.
+
+    Los items con salida inválida o ausente se reenvían (solo ellos) hasta max_rounds veces;
+    un lote cuya request falla del todo no se reintenta, complete() ya hizo los reintentos.
+    Devuelve (resultados por id, último error por id de los que no se pudieron evaluar).
+    """
+    results: Dict[str, Dict] = {}
+    errors: Dict[str, str] = {}
+    if LLM_PROMPT_FORMAT == "compact":
+        pending: List[BatchItem] = [(i, profile_text(t)) for i, t in items]
+    else:
+        # Expanded before packing, so the token estimates see what the model will read
+        pending = [(i, plain_json(t)) for i, t in items]
+    for round_no in range(1, max_rounds + 1):
+        retry: List[BatchItem] = []
+        for batch in pack_batches(pending, batch_size, token_budget):
+            ids = [i for i, _ in batch]
+            try:
+                output = complete_fn(build_batch_prompt(batch), LLM_MAX_OUTPUT_TOKENS * len(batch))
+            except Exception as e:
+                log.warning(f"[LLM] Batch of {len(batch)} failed: {e}")
+                errors.update({i: str(e) for i in ids})
+                continue
+            ok, bad = parse_batch_output(output, ids)
+            results.update(ok)
+            errors.update(bad)
+            for i in ok:
+                errors.pop(i, None)
+            retry.extend(item for item in batch if item[0] in bad)
+        if not retry:
+            break
+        if round_no < max_rounds:
+            log.info(f"[LLM] Re-sending {len(retry)} items with invalid output (round {round_no + 1}/{max_rounds})")
+        pending = retry
+    return results, errors
+
+
+def format_followups(followups: List[str]) -> str:
+    """Mismo formato que el parser de texto libre: una viñeta por pregunta."""
+    return "\n".join(f"• {q}" for q in followups)
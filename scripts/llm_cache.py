@@ -0,0 +1,137 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Optional, Sequence
+
+from .config import (
+    LLM_PROVIDERS, OPENAI_MODEL, ANTHROPIC_MODEL, GEMINI_MODEL, LLM_MAX_OUTPUT_TOKENS,
+    LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_MAX_AGE_DAYS
+)
+from .codec import content_key
+from .llm_client import PROMPT_HEADER
+
+CACHE_MODES = ("use", "refresh", "bypass")
+
+_MODELS = {"openai": OPENAI_MODEL, "anthropic": ANTHROPIC_MODEL, "google": GEMINI_MODEL}
+
+# Evict every N writes instead of on every put
+_EVICT_EVERY = 200
+
+
+def _canonical(compressed_json_text: str) -> str:
+    try:
+        # Same key for every stored format of a profile (legacy, versioned or zlib)
+        return content_key(compressed_json_text)
+    except ValueError:
+        return compressed_json_text
+
+
+class LLMCache:
+    """Cache persistente (SQLite) de respuestas del LLM por hash del prompt efectivo.
+
+    mode="use" lee y escribe, mode="refresh" ignora lo guardado pero escribe el resultado nuevo.
+    """
+
+    def __init__(self, path: str = LLM_CACHE_PATH, mode: str = "use",
+                 max_entries: int = LLM_CACHE_MAX_ENTRIES, max_age_days: float = LLM_CACHE_MAX_AGE_DAYS):
+        if mode not in ("use", "refresh"):
+            raise ValueError(f"Unsupported LLM cache mode: {mode}")
+        self.path = path
+        self.mode = mode
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Several run_all shards may share the file
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, output TEXT NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS llm_cache_accessed ON llm_cache(accessed_at)")
+        self._conn.commit()
+        self.evict()
+
+    @staticmethod
+    def key(compressed_json_text: str, providers: Sequence[str] = LLM_PROVIDERS,
+            prompt_header: str = PROMPT_HEADER) -> str:
+        # Any provider of the failover list may answer, so the whole list (and its models) is the key;
+        # a single provider keys exactly as before. Batched results (llm_batch) use their own prompt header
+        parts = [",".join(providers), ",".join(_MODELS.get(p, "") for p in providers), prompt_header,
+                 str(LLM_MAX_OUTPUT_TOKENS), _canonical(compressed_json_text)]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT output, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row and time.time() - row[1] <= self.max_age_seconds:
+                self._conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (time.time(), key))
+                self._conn.commit()
+                self.hits += 1
+                return row[0]
+            self.misses += 1
+            return None
+
+    def contains(self, key: str) -> bool:
+        """Como get, pero sin contar hit/miss ni tocar accessed_at (para estimar costos antes de llamar)."""
+        with self._lock:
+            row = self._conn.execute("SELECT created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        return bool(row) and time.time() - row[0] <= self.max_age_seconds
+
+    def put(self, key: str, output: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, output, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, output, now, now)
+            )
+            self._conn.commit()
+            self._writes += 1
+            due = self._writes % _EVICT_EVERY == 0
+        if due:
+            self.evict()
+
+    def evict(self):
+        """Borra entradas vencidas y, si sobra, las menos usadas recientemente."""
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE key IN ("
+                " SELECT key FROM llm_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def call(self, compressed_json_text: str, call_fn: Callable[[str], str]) -> str:
+        """Devuelve la respuesta cacheada o llama a call_fn y guarda el resultado (solo si no falla)."""
+        key = self.key(compressed_json_text)
+        if self.mode == "use":
+            cached = self.get(key)
+            if cached is not None:
+                return cached
+        else:
+            with self._lock:
+                self.misses += 1
+        output = call_fn(compressed_json_text)
+        self.put(key, output)
+        return output
+
+    def stats(self) -> str:
+        total = self.hits + self.misses
+        rate = (100.0 * self.hits / total) if total else 0.0
+        return f"{self.hits} hits, {self.misses} misses ({rate:.0f}% hit rate)"
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
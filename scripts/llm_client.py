@@ -1,11 +1,22 @@
+import random
 import time
+from typing import Dict, Optional, Tuple
 import requests
-from typing import Dict
 from .config import (
-    LLM_PROVIDER, OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL,
-    ANTHROPIC_API_KEY, ANTHROPIC_MODEL, GEMINI_API_KEY, GEMINI_MODEL,
-    LLM_MAX_OUTPUT_TOKENS, LLM_RETRY_MAX, LLM_RETRY_BASE_SECONDS
+    OPENAI_API_KEY, OPENAI_MODEL, OPENAI_BASE_URL,
+    ANTHROPIC_API_KEY, ANTHROPIC_MODEL, ANTHROPIC_BASE_URL, GEMINI_API_KEY, GEMINI_MODEL, GEMINI_BASE_URL,
+    LLM_PROVIDERS, LLM_MAX_OUTPUT_TOKENS, LLM_RETRY_BASE_SECONDS, LLM_REQUEST_TIMEOUT, LLM_PROMPT_FORMAT,
+    OPENAI_RATE_PER_SEC, ANTHROPIC_RATE_PER_SEC, GEMINI_RATE_PER_SEC
 )
+from .http_client import get_client, retry_after_seconds
+from .metrics import get_metrics
+from .codec import plain_json
+from .prompt_encoding import COMPACT_FORMAT_NOTE, profile_text
+
+# Each provider gets its own rate budget on the shared HTTP session
+get_client().set_rate("openai", OPENAI_RATE_PER_SEC)
+get_client().set_rate("anthropic", ANTHROPIC_RATE_PER_SEC)
+get_client().set_rate("google", GEMINI_RATE_PER_SEC)
 
 PROMPT_HEADER = (
     "You are a recruiting analyst. Given this JSON applicant profile, do four things:\n"
@@ -19,82 +30,139 @@ PROMPT_HEADER = (
     "Issues: <comma-separated list or 'None'>\n"
     "Follow-Ups: <bullet list>"
 )
+if LLM_PROMPT_FORMAT == "compact":
+    PROMPT_HEADER = PROMPT_HEADER.replace("this JSON applicant profile", "this applicant profile") \
+        + "\n\n" + COMPACT_FORMAT_NOTE
+
+# Rate limits, conflicts and server-side failures are worth retrying; other 4xx are not
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+class LLMError(RuntimeError):
+    """Error de un proveedor LLM; retryable=False corta los reintentos (key inválida, request mal formado)."""
+
+    def __init__(self, message: str, retryable: bool = True, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+def backoff_delay(attempt: int, base: float = LLM_RETRY_BASE_SECONDS, retry_after: Optional[float] = None) -> float:
+    """Espera antes del reintento `attempt` (0, 1, ...): Retry-After si vino, si no backoff exponencial con jitter."""
+    if retry_after is not None:
+        return retry_after
+    return base * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+def prompt_for(applicant_json_text: str) -> str:
+    if LLM_PROMPT_FORMAT == "compact":
+        return PROMPT_HEADER + "\n\nProfile:\n" + profile_text(applicant_json_text)
+    return PROMPT_HEADER + "\n\nJSON:\n" + plain_json(applicant_json_text)
 
 def call_llm(applicant_json_text: str) -> str:
-    attempt = 0
-    backoff = LLM_RETRY_BASE_SECONDS
-    last_err = None
-    while attempt < LLM_RETRY_MAX:
-        try:
-            if LLM_PROVIDER == "openai":
-                return _openai_call(applicant_json_text)
-            elif LLM_PROVIDER == "anthropic":
-                return _anthropic_call(applicant_json_text)
-            elif LLM_PROVIDER == "google":
-                return _gemini_call(applicant_json_text)
-            else:
-                raise RuntimeError(f"Unsupported LLM_PROVIDER: {LLM_PROVIDER}")
-        except Exception as e:
-            last_err = e
-            time.sleep(backoff)
-            backoff *= 2
-            attempt += 1
-    raise RuntimeError(f"LLM call failed after {LLM_RETRY_MAX} attempts: {last_err}")
-
-def _openai_call(applicant_json_text: str) -> str:
-    url = f"{OPENAI_BASE_URL}/chat/completions"
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json"
-    }
-    data = {
-        "model": OPENAI_MODEL,
-        "messages": [
-            {"role": "system", "content": "You are concise and precise."},
-            {"role": "user", "content": PROMPT_HEADER + "\n\nJSON:\n" + applicant_json_text}
-        ],
-        "max_tokens": LLM_MAX_OUTPUT_TOKENS,
-        "temperature": 0.2
-    }
-    resp = requests.post(url, headers=headers, json=data, timeout=60)
-    resp.raise_for_status()
-    j = resp.json()
-    return j["choices"][0]["message"]["content"]
+    return complete(prompt_for(applicant_json_text), LLM_MAX_OUTPUT_TOKENS)
 
-def _anthropic_call(applicant_json_text: str) -> str:
-    url = "https://api.anthropic.com/v1/messages"
-    headers = {
-        "x-api-key": ANTHROPIC_API_KEY,
-        "anthropic-version": "2023-06-01",
-        "content-type": "application/json"
-    }
-    data = {
-        "model": ANTHROPIC_MODEL,
-        "max_tokens": LLM_MAX_OUTPUT_TOKENS,
-        "temperature": 0.2,
-        "messages": [
-            {"role": "user", "content": PROMPT_HEADER + "\n\nJSON:\n" + applicant_json_text}
-        ]
-    }
-    resp = requests.post(url, headers=headers, json=data, timeout=60)
-    resp.raise_for_status()
-    j = resp.json()
-    # Anthropic returns content as a list of blocks
-    return "".join([b.get("text", "") for b in j.get("content", [])])
-
-def _gemini_call(applicant_json_text: str) -> str:
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
-    headers = {"Content-Type": "application/json"}
-    data = {
-        "contents": [{
-            "parts": [{"text": PROMPT_HEADER + "\n\nJSON:\n" + applicant_json_text}]
-        }],
-        "generationConfig": {
+def complete(prompt: str, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> str:
+    """Envía un prompt ya armado vía el router (LLM_PROVIDERS en orden, con failover y hedging)."""
+    # Imported here because llm_router builds on this module
+    from .llm_router import get_router
+    return get_router().complete(prompt, max_tokens)
+
+def call_provider(provider: str, prompt: str, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> str:
+    """Un solo intento contra un proveedor ("openai", "anthropic" o "google"), sin reintentos propios."""
+    if provider == "openai":
+        return _openai_call(prompt, max_tokens)
+    elif provider == "anthropic":
+        return _anthropic_call(prompt, max_tokens)
+    elif provider == "google":
+        return _gemini_call(prompt, max_tokens)
+    raise LLMError(f"Unsupported LLM_PROVIDER: {provider}", retryable=False)
+
+def build_request(provider: str, prompt: str, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> Tuple[str, Dict, Dict]:
+    """(url, headers, body) del request para el proveedor; falla sin reintentos si falta la API key."""
+    if provider == "openai":
+        _require_key(OPENAI_API_KEY, "OPENAI_API_KEY")
+        url = f"{OPENAI_BASE_URL}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {OPENAI_API_KEY}",
+            "Content-Type": "application/json"
+        }
+        data = {
+            "model": OPENAI_MODEL,
+            "messages": [
+                {"role": "system", "content": "You are concise and precise."},
+                {"role": "user", "content": prompt}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": 0.2
+        }
+    elif provider == "anthropic":
+        _require_key(ANTHROPIC_API_KEY, "ANTHROPIC_API_KEY")
+        url = f"{ANTHROPIC_BASE_URL}/messages"
+        headers = {
+            "x-api-key": ANTHROPIC_API_KEY,
+            "anthropic-version": "2023-06-01",
+            "content-type": "application/json"
+        }
+        data = {
+            "model": ANTHROPIC_MODEL,
+            "max_tokens": max_tokens,
             "temperature": 0.2,
-            "maxOutputTokens": LLM_MAX_OUTPUT_TOKENS
+            "messages": [
+                {"role": "user", "content": prompt}
+            ]
         }
-    }
-    resp = requests.post(url, headers=headers, json=data, timeout=60)
-    resp.raise_for_status()
+    elif provider == "google":
+        _require_key(GEMINI_API_KEY, "GEMINI_API_KEY")
+        url = f"{GEMINI_BASE_URL}/models/{GEMINI_MODEL}:generateContent?key={GEMINI_API_KEY}"
+        headers = {"Content-Type": "application/json"}
+        data = {
+            "contents": [{
+                "parts": [{"text": prompt}]
+            }],
+            "generationConfig": {
+                "temperature": 0.2,
+                "maxOutputTokens": max_tokens
+            }
+        }
+    else:
+        raise LLMError(f"Unsupported LLM_PROVIDER: {provider}", retryable=False)
+    return url, headers, data
+
+def parse_response(provider: str, resp: requests.Response) -> str:
+    """Texto de la respuesta, o LLMError clasificado según el status (con Retry-After si vino)."""
+    if resp.status_code >= 400:
+        raise LLMError(
+            f"{provider} returned HTTP {resp.status_code}: {resp.text[:200]}",
+            retryable=resp.status_code in RETRYABLE_STATUS,
+            retry_after=retry_after_seconds(resp, None)
+        )
     j = resp.json()
-    return j["candidates"][0]["content"]["parts"][0]["text"]
+    if provider == "anthropic":
+        # Anthropic returns content as a list of blocks
+        return "".join([b.get("text", "") for b in j.get("content", [])])
+    if provider == "google":
+        return j["candidates"][0]["content"]["parts"][0]["text"]
+    return j["choices"][0]["message"]["content"]
+
+def _require_key(value: str, name: str):
+    if not value:
+        raise LLMError(f"Missing required environment variable: {name}", retryable=False)
+
+def _send(provider: str, prompt: str, max_tokens: int) -> str:
+    url, headers, data = build_request(provider, prompt, max_tokens)
+    t0 = time.perf_counter()
+    resp = None
+    try:
+        # With a failover list a 429 moves on to the next provider instead of waiting here
+        resp = get_client().request("POST", url, bucket=provider, headers=headers, json=data,
+                                    timeout=LLM_REQUEST_TIMEOUT, max_429_retries=0 if len(LLM_PROVIDERS) > 1 else None)
+    finally:
+        get_metrics().record_http("llm", resp, time.perf_counter() - t0, provider=provider)
+    return parse_response(provider, resp)
+
+def _openai_call(prompt: str, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> str:
+    return _send("openai", prompt, max_tokens)
+
+def _anthropic_call(prompt: str, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> str:
+    return _send("anthropic", prompt, max_tokens)
+
+def _gemini_call(prompt: str, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> str:
+    return _send("google", prompt, max_tokens)
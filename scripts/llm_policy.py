@@ -0,0 +1,78 @@
+import threading
+from typing import Callable, Dict, List, Sequence, Set, Tuple
+
+from .config import LLM_EVAL_POLICY, LLM_RUN_TOKEN_BUDGET
+
+# "all": every applicant; "shortlisted": only those the rules shortlist; "borderline": those
+# plus the ones that miss a single rule (experience, compensation or location)
+POLICIES = ("all", "borderline", "shortlisted")
+
+
+class EvaluationPolicy:
+    """Qué applicants pasan por el LLM en un run y en qué orden.
+
+    Los que la política descarta no se evalúan. Con token_budget > 0 los elegibles se ordenan
+    por el "promise" del veredicto y solo se evalúan los que entran en el presupuesto del run;
+    el resto queda para otro run (run_all --unscored-only los retoma).
+    """
+
+    def __init__(self, mode: str = LLM_EVAL_POLICY, token_budget: int = LLM_RUN_TOKEN_BUDGET):
+        if mode not in POLICIES:
+            raise ValueError(f"Unknown LLM evaluation policy {mode!r}, expected one of {', '.join(POLICIES)}")
+        self.mode = mode
+        self.token_budget = token_budget
+        self.spent = 0
+        self.counts = {"eligible": 0, "gated": 0, "deferred": 0}
+        self._promise: Dict[str, float] = {}
+        self._changed: Set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def prioritizes(self) -> bool:
+        """True si el paso LLM tiene que esperar a todo el run para ordenarlo (hay presupuesto)."""
+        return self.token_budget > 0
+
+    def eligible(self, rid: str, verdict: Dict, changed: bool = True) -> bool:
+        """Aplica la política al veredicto del shortlist y recuerda su promise para ordenar después.
+
+        changed: el Compressed JSON cambió en este run, así que un resultado previo del LLM quedó viejo.
+        """
+        failed = len(verdict.get("failed") or ())
+        ok = self.mode == "all" or failed == 0 or (self.mode == "borderline" and failed == 1)
+        with self._lock:
+            self.counts["eligible" if ok else "gated"] += 1
+            if ok:
+                self._promise[rid] = verdict.get("promise", 0.0)
+                if changed:
+                    self._changed.add(rid)
+        return ok
+
+    def stale(self, rid: str) -> bool:
+        """True si el resultado guardado del LLM ya no corresponde al perfil (se limpia al diferirlo)."""
+        return rid in self._changed
+
+    def admit(self, jobs: Sequence[Tuple[str, str, str]],
+              cost: Callable[[str], int]) -> Tuple[List[Tuple[str, str, str]], List[Tuple[str, str, str]]]:
+        """(a evaluar, diferidos): los más prometedores primero, hasta agotar el presupuesto de tokens.
+
+        cost(texto) estima los tokens de una evaluación; 0 si no cuesta nada (p. ej. está en cache).
+        """
+        with self._lock:
+            ranked = sorted(jobs, key=lambda job: -self._promise.get(job[0], 0.0))
+            if not self.prioritizes:
+                return ranked, []
+            admitted, deferred = [], []
+            for job in ranked:
+                tokens = cost(job[2])
+                # Cheaper applicants further down may still fit once a costly one does not
+                if self.spent + tokens <= self.token_budget:
+                    self.spent += tokens
+                    admitted.append(job)
+                else:
+                    deferred.append(job)
+            self.counts["deferred"] += len(deferred)
+        return admitted, deferred
+
+    def summary(self) -> str:
+        budget = f", {self.spent}/{self.token_budget} tokens" if self.prioritizes else ""
+        return f"policy={self.mode}, " + ", ".join(f"{v} {k}" for k, v in self.counts.items()) + budget
@@ -0,0 +1,176 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+from .config import (
+    LLM_PROVIDERS, LLM_MAX_OUTPUT_TOKENS, LLM_RETRY_MAX,
+    LLM_HEDGE, LLM_HEDGE_PERCENTILE, LLM_HEDGE_MIN_SAMPLES
+)
+from .llm_client import LLMError, backoff_delay, call_provider
+from .metrics import get_metrics
+
+log = logging.getLogger(__name__)
+
+# Recent latencies kept per provider for the percentile estimate
+_WINDOW = 200
+# Threads for primary + hedged attempts; callers beyond this queue up
+_ROUTER_THREADS = 16
+
+
+class LatencyTracker:
+    """Latencias recientes (solo llamadas exitosas) y conteo de errores por proveedor."""
+
+    def __init__(self, window: int = _WINDOW):
+        self._samples: Dict[str, Deque[float]] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.window = window
+
+    def record(self, provider: str, seconds: float, ok: bool):
+        with self._lock:
+            if ok:
+                self._samples.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+            else:
+                self._errors[provider] = self._errors.get(provider, 0) + 1
+
+    def percentile(self, provider: str, pct: float, min_samples: int = 1) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        idx = min(len(samples) - 1, int(round(pct / 100.0 * (len(samples) - 1))))
+        return samples[idx]
+
+    def summary(self) -> str:
+        with self._lock:
+            providers = sorted(set(self._samples) | set(self._errors))
+        parts = []
+        for p in providers:
+            p50, p95 = self.percentile(p, 50), self.percentile(p, 95)
+            n = len(self._samples.get(p, ()))
+            lat = f"p50={p50:.2f}s p95={p95:.2f}s" if n else "no successes"
+            parts.append(f"{p}: {n} ok, {self._errors.get(p, 0)} errors, {lat}")
+        return "; ".join(parts) or "no calls"
+
+
+class LLMRouter:
+    """Reparte cada prompt sobre una lista ordenada de proveedores.
+
+    Cada ronda prueba los proveedores en orden (failover ante error o timeout); un proveedor
+    con error no reintentable (falta la key, 401) sale de la rotación para el resto de la
+    llamada. Con hedge=True, si la llamada pasa el p95 del proveedor se lanza una segunda
+    al siguiente (o al mismo, si es el único) y gana la primera que responda.
+    """
+
+    def __init__(self, providers: Sequence[str] = LLM_PROVIDERS, hedge: bool = LLM_HEDGE,
+                 hedge_percentile: float = LLM_HEDGE_PERCENTILE, hedge_min_samples: int = LLM_HEDGE_MIN_SAMPLES,
+                 rounds: int = LLM_RETRY_MAX, call_fn: Callable[[str, str, int], str] = call_provider):
+        if not providers:
+            raise ValueError("LLMRouter needs at least one provider")
+        self.providers = list(providers)
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.rounds = max(rounds, 1)
+        self.call_fn = call_fn
+        self.latency = LatencyTracker()
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=_ROUTER_THREADS, thread_name_prefix="llm-route")
+
+    def _timed(self, provider: str, prompt: str, max_tokens: int) -> str:
+        t0 = time.perf_counter()
+        try:
+            out = self.call_fn(provider, prompt, max_tokens)
+        except Exception:
+            self.latency.record(provider, time.perf_counter() - t0, ok=False)
+            raise
+        self.latency.record(provider, time.perf_counter() - t0, ok=True)
+        return out
+
+    def _hedged(self, provider: str, backup: str, prompt: str, max_tokens: int) -> str:
+        threshold = self.latency.percentile(provider, self.hedge_percentile, self.hedge_min_samples)
+        if threshold is None:
+            return self._timed(provider, prompt, max_tokens)
+        primary = self._pool.submit(self._timed, provider, prompt, max_tokens)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+
+        with self._lock:
+            self.hedges += 1
+        get_metrics().inc("llm_hedges_total", provider=provider, backup=backup)
+        second = self._pool.submit(self._timed, backup, prompt, max_tokens)
+        pending = {primary, second}
+        last_err: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                try:
+                    out = fut.result()
+                except Exception as e:
+                    last_err = e
+                    continue
+                if fut is second:
+                    with self._lock:
+                        self.hedge_wins += 1
+                    get_metrics().inc("llm_hedge_wins_total", provider=backup)
+                # The slower call finishes in the background and its result is dropped
+                return out
+        raise last_err
+
+    def complete(self, prompt: str, max_tokens: int = LLM_MAX_OUTPUT_TOKENS) -> str:
+        dead = set()
+        errors: List[str] = []
+        retry_after: Optional[float] = None
+        for round_no in range(self.rounds):
+            order = [p for p in self.providers if p not in dead]
+            if not order:
+                break
+            for i, provider in enumerate(order):
+                backup = order[i + 1] if i + 1 < len(order) else provider
+                try:
+                    if self.hedge:
+                        return self._hedged(provider, backup, prompt, max_tokens)
+                    return self._timed(provider, prompt, max_tokens)
+                except LLMError as e:
+                    errors.append(f"{provider}: {e}")
+                    if not e.retryable:
+                        dead.add(provider)
+                    retry_after = e.retry_after
+                except Exception as e:
+                    errors.append(f"{provider}: {e}")
+                if i + 1 < len(order):
+                    with self._lock:
+                        self.failovers += 1
+                    get_metrics().inc("llm_failovers_total", provider=provider)
+                    log.warning(f"[LLM] {provider} failed, failing over to {order[i + 1]}: {errors[-1]}")
+            if round_no + 1 < self.rounds and len(dead) < len(self.providers):
+                get_metrics().inc("llm_retry_rounds_total")
+                time.sleep(backoff_delay(round_no, retry_after=retry_after))
+        # Nothing left to try after non-retryable errors (e.g. no API key) -> callers skip at once
+        raise LLMError(f"LLM call failed on every provider: {'; '.join(errors[-len(self.providers):])}",
+                       retryable=len(dead) < len(self.providers))
+
+    def stats(self) -> str:
+        return (f"{self.latency.summary()} | {self.failovers} failovers, "
+                f"{self.hedges} hedged ({self.hedge_wins} won by the hedge)")
+
+
+_router: Optional[LLMRouter] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> LLMRouter:
+    """Router del proceso armado desde LLM_PROVIDERS, creado en el primer uso."""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = LLMRouter()
+    return _router
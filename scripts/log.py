@@ -0,0 +1,40 @@
+import json
+import logging
+import sys
+import time
+
+from .config import LOG_LEVEL, LOG_FORMAT
+
+# Attributes every LogRecord has; anything else came in through `extra=` and goes into the JSON line
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """Una línea JSON por evento: ts, level, logger, msg y los campos pasados con extra={...}."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        out.update({k: v for k, v in vars(record).items() if k not in _RESERVED})
+        if record.exc_info:
+            out["exc"] = self.formatException(record.exc_info)
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT):
+    """Configura el logger "scripts" para los entry points: nivel (DEBUG/INFO/WARNING...) y formato text|json.
+
+    El formato text deja los mensajes tal cual ("[TAG] ..."), igual que los prints que reemplaza.
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter("%(message)s"))
+    # A module started with `python -m scripts.x` logs as "__main__", outside the "scripts" tree
+    for name in ("scripts", "__main__"):
+        logger = logging.getLogger(name)
+        logger.handlers[:] = [handler]
+        logger.setLevel(level.upper())
+        logger.propagate = False
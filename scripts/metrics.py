@@ -0,0 +1,257 @@
+import argparse
+import calendar
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+# Upper bounds (seconds) of the latency histogram buckets, Prometheus style
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(labels: Dict[str, object]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    """Histograma acumulativo de latencias con buckets fijos; guarda también count, sum y max."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        """Estimación por bucket (cota superior del bucket que contiene el cuantil)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def merge_dict(self, data: Dict):
+        """Suma un histograma exportado con as_dict (mismos buckets)."""
+        seen = 0
+        for i, bound in enumerate(self.buckets):
+            cumulative = data["buckets"].get(str(bound), seen)
+            self.counts[i] += cumulative - seen
+            seen = cumulative
+        self.counts[-1] += data["count"] - seen
+        self.count += data["count"]
+        self.sum += data["sum"]
+        self.max = max(self.max, data["max"])
+
+    def as_dict(self) -> Dict:
+        cumulative, seen = {}, 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            cumulative[str(bound)] = seen
+        cumulative["+Inf"] = self.count
+        return {"count": self.count, "sum": round(self.sum, 6), "max": round(self.max, 6),
+                "p50": self.quantile(0.5), "p95": self.quantile(0.95), "buckets": cumulative}
+
+
+class Metrics:
+    """Contadores e histogramas en memoria indexados por nombre + labels, seguros entre threads.
+
+    Nombres usados por el pipeline: airtable_* (labels table, method, status), llm_*
+    (provider, status), http_429_retries_total (bucket) y stage_seconds (stage).
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Dict[Labels, float]] = {}
+        self._histograms: Dict[str, Dict[Labels, Histogram]] = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+        # Set on merged reports, whose duration is not "until now"
+        self.ended: Optional[float] = None
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _labels(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            hist = series.get(key)
+            if hist is None:
+                hist = series[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Mide el bloque en stage_seconds{stage=name}, también si termina con excepción."""
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe("stage_seconds", time.perf_counter() - t0, stage=name)
+
+    def record_http(self, prefix: str, resp: Optional[requests.Response], seconds: float, **labels):
+        """Request HTTP terminado (resp=None si falló sin respuesta): count, status, bytes y latencia."""
+        status = resp.status_code if resp is not None else "error"
+        self.inc(f"{prefix}_requests_total", status=status, **labels)
+        self.observe(f"{prefix}_request_seconds", seconds, **labels)
+        if resp is None:
+            return
+        body = resp.request.body if resp.request is not None else None
+        if body:
+            self.inc(f"{prefix}_request_bytes_total", len(body), **labels)
+        self.inc(f"{prefix}_response_bytes_total", len(resp.content), **labels)
+
+    def counter(self, name: str, **labels) -> float:
+        """Valor de un contador; sin labels suma todas sus series."""
+        with self._lock:
+            series = self._counters.get(name, {})
+            if labels:
+                return series.get(_labels(labels), 0)
+            return sum(series.values())
+
+    def histogram(self, name: str, **labels) -> Optional[Histogram]:
+        with self._lock:
+            return self._histograms.get(name, {}).get(_labels(labels))
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self.started = time.time()
+            self.ended = None
+
+    def to_json(self) -> Dict:
+        with self._lock:
+            counters = {name: [{"labels": dict(k), "value": v} for k, v in sorted(series.items())]
+                        for name, series in sorted(self._counters.items())}
+            histograms = {name: [{"labels": dict(k), **h.as_dict()} for k, h in sorted(series.items())]
+                          for name, series in sorted(self._histograms.items())}
+        return {"started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self.started)),
+                "duration_seconds": round((self.ended or time.time()) - self.started, 3),
+                "counters": counters, "histograms": histograms}
+
+    def to_prometheus(self) -> str:
+        """Formato de exposición de texto de Prometheus (para node_exporter textfile o un pushgateway)."""
+        lines: List[str] = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                lines.append(f"# TYPE {name} counter")
+                for key, value in sorted(series.items()):
+                    lines.append(f"{name}{_prom_labels(key)} {value:g}")
+            for name, series in sorted(self._histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                for key, h in sorted(series.items()):
+                    seen = 0
+                    for bound, n in zip(h.buckets, h.counts):
+                        seen += n
+                        lines.append(f"{name}_bucket{_prom_labels(key + (('le', str(bound)),))} {seen}")
+                    lines.append(f"{name}_bucket{_prom_labels(key + (('le', '+Inf'),))} {h.count}")
+                    lines.append(f"{name}_sum{_prom_labels(key)} {h.sum:.6f}")
+                    lines.append(f"{name}_count{_prom_labels(key)} {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def merge_json(self, report: Dict):
+        """Suma a este registro un reporte de to_json (p. ej. el de otro shard del mismo run)."""
+        with self._lock:
+            for name, series in report.get("counters", {}).items():
+                target = self._counters.setdefault(name, {})
+                for item in series:
+                    key = _labels(item["labels"])
+                    target[key] = target.get(key, 0) + item["value"]
+            for name, series in report.get("histograms", {}).items():
+                target = self._histograms.setdefault(name, {})
+                for item in series:
+                    key = _labels(item["labels"])
+                    if key not in target:
+                        target[key] = Histogram()
+                    target[key].merge_dict(item)
+
+    def write_report(self, path: str):
+        """Escribe el reporte del run: texto Prometheus si path termina en .prom/.txt, si no JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            if path.endswith((".prom", ".txt")):
+                f.write(self.to_prometheus())
+            else:
+                json.dump(self.to_json(), f, indent=2)
+
+    def summary_lines(self) -> List[str]:
+        """Resumen legible para el final del run: etapas y requests por tabla/proveedor."""
+        lines = []
+        with self._lock:
+            hist = dict(self._histograms)
+        for name in ("stage_seconds", "airtable_request_seconds", "llm_request_seconds"):
+            for key, h in sorted(hist.get(name, {}).items()):
+                what = " ".join(f"{k}={v}" for k, v in key)
+                lines.append(f"{name.split('_')[0]:<9} {what:<40} n={h.count:<6} total={h.sum:8.2f}s "
+                             f"p50={h.quantile(0.5):.3f}s p95={h.quantile(0.95):.3f}s max={h.max:.3f}s")
+        retries = self.counter("http_429_retries_total")
+        if retries:
+            lines.append(f"http      429 retries: {retries:g}")
+        return lines
+
+
+def _prom_labels(key: Labels) -> str:
+    if not key:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in key)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(key, escaped)) + "}"
+
+
+def merge_reports(paths: List[str]) -> Metrics:
+    """Un solo reporte a partir de los JSON de varios shards: series sumadas, del primer inicio al último fin."""
+    merged = Metrics()
+    starts, ends = [], []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            report = json.load(f)
+        merged.merge_json(report)
+        start = calendar.timegm(time.strptime(report["started_at"], "%Y-%m-%dT%H:%M:%SZ"))
+        starts.append(start)
+        ends.append(start + report.get("duration_seconds", 0.0))
+    if starts:
+        merged.started, merged.ended = min(starts), max(ends)
+    return merged
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """Registro de métricas del proceso (compartido por airtable_client, llm_client y run_all)."""
+    return _metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge JSON run reports (e.g. one per run_all shard).")
+    parser.add_argument("reports", nargs="+", help="JSON reports written with --metrics-out")
+    parser.add_argument("--out", help="Merged report (.json, or .prom/.txt for Prometheus text)")
+    args = parser.parse_args()
+    merged = merge_reports(args.reports)
+    for line in merged.summary_lines():
+        print(f"[METRICS] {line}")
+    if args.out:
+        merged.write_report(args.out)
+        print(f"[METRICS] Merged report written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import sys
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .codec import decode, encode
+from .rule_engine import parse_date
+
+
+def _parse_number(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class _Section:
+    """Sección de un perfil (un dict del Compressed JSON) guardada en slots en vez de un dict por applicant.
+
+    _FIELDS mapea atributo -> clave del JSON; las claves desconocidas y las conocidas con valor
+    null van a `extra`, así to_fields() devuelve exactamente el dict de entrada.
+    """
+
+    __slots__ = ("extra",)
+    _FIELDS: Tuple[Tuple[str, str, bool], ...] = ()  # (attribute, JSON key, interned)
+    _KEYS: FrozenSet[str] = frozenset()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._KEYS = frozenset(key for _, key, _ in cls._FIELDS)
+
+    def __init__(self, fields: Optional[Dict] = None):
+        fields = fields or {}
+        stored = 0
+        for attr, key, interned in self._FIELDS:
+            value = fields.get(key)
+            if value is not None:
+                stored += 1
+                # Companies, titles, locations and dates repeat across thousands of profiles: stored once
+                if interned and type(value) is str:
+                    value = sys.intern(value)
+            setattr(self, attr, value)
+        # Usually every key is a known one with a value, and no extra dict is needed
+        self.extra = None
+        if len(fields) != stored:
+            self.extra = {k: v for k, v in fields.items() if k not in self._KEYS or v is None}
+        self._parse()
+
+    def _parse(self):
+        pass
+
+    def to_fields(self) -> Dict:
+        out = {key: getattr(self, attr) for attr, key, _ in self._FIELDS if getattr(self, attr) is not None}
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def __eq__(self, other) -> bool:
+        return type(self) is type(other) and self.to_fields() == other.to_fields()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.to_fields()!r})"
+
+
+class Personal(_Section):
+    __slots__ = ("full_name", "email", "location", "linkedin")
+    _FIELDS = (("full_name", "Full Name", False), ("email", "Email", False),
+               ("location", "Location", True), ("linkedin", "LinkedIn", False))
+
+
+class Experience(_Section):
+    __slots__ = ("company", "title", "start", "end", "technologies", "start_date", "end_date")
+    _FIELDS = (("company", "Company", True), ("title", "Title", True), ("start", "Start", True),
+               ("end", "End", True), ("technologies", "Technologies", True))
+
+    def _parse(self):
+        # Parsed once here instead of on every rule evaluation; an empty End means current job
+        self.start_date = parse_date(str(self.start)) if self.start else None
+        self.end_date = parse_date(str(self.end)) if self.end else None
+
+
+class Salary(_Section):
+    __slots__ = ("preferred_rate", "minimum_rate", "currency", "availability", "rate", "hours")
+    _FIELDS = (("preferred_rate", "Preferred Rate", False), ("minimum_rate", "Minimum Rate", False),
+               ("currency", "Currency", True), ("availability", "Availability (hrs/wk)", False))
+
+    def _parse(self):
+        # None when missing or not a number; the rules then treat it like the dict profile does
+        self.rate = _parse_number(self.preferred_rate)
+        self.hours = _parse_number(self.availability)
+
+
+class Applicant:
+    """Perfil comprimido en objetos con slots: la misma información que el dict del Compressed JSON,
+    con strings repetidos internados y fechas y rates ya parseados.
+
+    La conversión es sin pérdida: Applicant.from_dict(d).to_dict() == d para todo perfil con las
+    secciones personal/experience/salary (las que escribe compression); una sección ausente vuelve vacía.
+    """
+
+    __slots__ = ("personal", "experience", "salary", "extra")
+
+    def __init__(self, personal: Optional[Personal] = None, experience: Iterable[Experience] = (),
+                 salary: Optional[Salary] = None, extra: Optional[Dict] = None):
+        self.personal = personal
+        self.experience = tuple(experience)
+        self.salary = salary
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, profile: Dict) -> "Applicant":
+        extra = {k: v for k, v in profile.items() if k not in ("personal", "experience", "salary")}
+        return cls(Personal(profile.get("personal")), [Experience(e) for e in profile.get("experience") or []],
+                   Salary(profile.get("salary")), extra)
+
+    @classmethod
+    def from_json(cls, text: str) -> "Applicant":
+        """A partir del texto guardado en Compressed JSON (cualquier formato que acepte codec.decode)."""
+        return cls.from_dict(decode(text))
+
+    def add_row(self, section: str, fields: Dict):
+        """Suma una fila hija ya limpia: como en compression, vale la primera de personal/salary y todas las de experience."""
+        if section == "experience":
+            self.experience += (Experience(fields),)
+        elif section == "personal" and self.personal is None:
+            self.personal = Personal(fields)
+        elif section == "salary" and self.salary is None:
+            self.salary = Salary(fields)
+
+    def to_dict(self) -> Dict:
+        out = {
+            "personal": self.personal.to_fields() if self.personal is not None else {},
+            "experience": [e.to_fields() for e in self.experience],
+            "salary": self.salary.to_fields() if self.salary is not None else {},
+        }
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def to_json(self, **kwargs) -> str:
+        """Texto para Compressed JSON (codec.encode), idéntico al del dict equivalente."""
+        return encode(self.to_dict(), **kwargs)
+
+    @property
+    def location(self) -> Optional[str]:
+        return self.personal.location if self.personal is not None else None
+
+    def companies(self) -> List[str]:
+        return [str(e.company) if e.company is not None else "" for e in self.experience]
+
+    def total_years(self, now: Optional[datetime] = None) -> float:
+        """Igual que rule_engine.total_years sobre el dict, sin volver a parsear fechas."""
+        now = now or datetime.utcnow()
+        days = 0
+        for e in self.experience:
+            start = e.start_date
+            end = e.end_date or now
+            if start and end > start:
+                days += (end - start).days
+        return round(days / 365.25, 2)
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, Applicant) and self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"Applicant({self.to_dict()!r})"
@@ -0,0 +1,116 @@
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from .codec import decode
+from .rule_engine import parse_date, total_years
+
+# Short aliases for the fields the model reads; anything not listed keeps its own name
+PERSONAL_ALIASES = {"Full Name": "name", "Location": "loc"}
+SALARY_ALIASES = {"Preferred Rate": "rate", "Minimum Rate": "min", "Currency": "cur",
+                  "Availability (hrs/wk)": "avail_h"}
+EXPERIENCE_COLUMNS = {"Company": "company", "Title": "title", "Start": "start", "End": "end",
+                      "Technologies": "tech"}
+
+# Contact details don't change the assessment and cost tokens on every call
+DROPPED_FIELDS = {"Email", "LinkedIn", "Applicant ID"}
+
+COMPACT_FORMAT_NOTE = (
+    "Profile format: one 'key=value' line per section (avail_h = hours/week, yrs = total years "
+    "of experience); the exp block is a table with one job per row, columns as in its header, "
+    "dates YYYY-MM, end=now for the current job."
+)
+
+_TOKEN_RE = re.compile(r"[^\W\d_]+|\d+|[^\w\s]|_")
+
+
+def estimate_tokens(text: str) -> int:
+    """Aproxima tokens BPE sin tokenizer: palabras de ~6 letras, dígitos de a 3, un token por signo."""
+    n = 0
+    for m in _TOKEN_RE.finditer(text):
+        piece = m.group()
+        if piece.isdigit():
+            n += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            n += 1 + (len(piece) - 1) // 6
+        else:
+            n += 1
+    return max(n, 1)
+
+
+def _empty(value) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _clean(value) -> str:
+    # Newlines and the column separator would break the line/table layout
+    return str(value).replace("\n", " ").replace("|", "/").strip()
+
+
+def _number(value) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return _clean(value)
+
+
+def _month(value) -> str:
+    parsed = parse_date(str(value))
+    return parsed.strftime("%Y-%m") if parsed else _clean(value)
+
+
+def _pairs(section: Dict, aliases: Dict[str, str]) -> List[str]:
+    out = []
+    for key, value in section.items():
+        if key in DROPPED_FIELDS or _empty(value):
+            continue
+        out.append(f"{aliases.get(key, key)}={_number(value)}")
+    return out
+
+
+def encode_profile(compressed: Dict, now: Optional[datetime] = None) -> str:
+    """Serializa un JSON comprimido en el formato compacto para el prompt (ver COMPACT_FORMAT_NOTE)."""
+    personal = compressed.get("personal") or {}
+    salary = compressed.get("salary") or {}
+    experiences = [e for e in compressed.get("experience") or [] if any(not _empty(v) for v in e.values())]
+
+    lines = []
+    head = _pairs(personal, PERSONAL_ALIASES)
+    if experiences:
+        head.append(f"yrs={_number(total_years(experiences, now))}")
+    if head:
+        lines.append("; ".join(head))
+    pay = _pairs(salary, SALARY_ALIASES)
+    if pay:
+        lines.append("; ".join(pay))
+
+    if experiences:
+        columns = [c for c in EXPERIENCE_COLUMNS if c != "End" and any(not _empty(e.get(c)) for e in experiences)]
+        columns.insert(columns.index("Start") + 1 if "Start" in columns else len(columns), "End")
+        for e in experiences:
+            for key in e:
+                if key not in columns and key not in DROPPED_FIELDS and not _empty(e[key]):
+                    columns.append(key)
+        lines.append("exp " + "|".join(EXPERIENCE_COLUMNS.get(c, c) for c in columns) + ":")
+        for e in experiences:
+            cells = []
+            for c in columns:
+                value = e.get(c)
+                if c == "End" and _empty(value):
+                    cells.append("now")
+                elif _empty(value):
+                    cells.append("")
+                elif c in ("Start", "End"):
+                    cells.append(_month(value))
+                else:
+                    cells.append(_clean(value))
+            lines.append("|".join(cells))
+    return "\n".join(lines)
+
+
+def profile_text(compressed_json_text: str) -> str:
+    """Versión compacta de un Compressed JSON; si el texto no es JSON se devuelve tal cual."""
+    try:
+        compressed = decode(compressed_json_text)
+    except ValueError:
+        return compressed_json_text
+    return encode_profile(compressed)
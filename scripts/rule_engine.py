@@ -0,0 +1,159 @@
+import logging
+import re
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence
+
+from .config import TIER1_COMPANIES, SHORTLIST_COUNTRIES, MAX_RATE_USD, MIN_AVAIL_HOURS
+
+log = logging.getLogger(__name__)
+
+DATE_FORMATS = (
+    "%Y-%m-%d",   # 2020-01-31
+    "%Y/%m/%d",   # 2020/01/31
+    "%d-%m-%Y",   # 31-01-2020
+    "%d/%m/%Y",   # 31/01/2020
+)
+
+MIN_YEARS = 4
+
+
+@lru_cache(maxsize=65536)
+def parse_date(s: str) -> Optional[datetime]:
+    """Parsea una fecha en cualquiera de DATE_FORMATS; cada string distinto se parsea una sola vez."""
+    if not s:
+        return None
+    s = s.strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(s, fmt)
+        except ValueError:
+            continue
+    log.warning(f"[WARN] Could not parse date '{s}'")
+    return None
+
+
+def _alternation(terms: Sequence[str]) -> Optional["re.Pattern[str]"]:
+    """Una sola regex \\b(?:a|b|...)\\b para toda la lista; None si la lista está vacía."""
+    if not terms:
+        return None
+    return re.compile(r"\b(?:" + "|".join(re.escape(t) for t in terms) + r")\b", re.IGNORECASE)
+
+
+def total_years(experiences: List[Dict], now: Optional[datetime] = None) -> float:
+    now = now or datetime.utcnow()
+    days = 0
+    for e in experiences:
+        start = parse_date(str(e.get("Start", "")))
+        end = parse_date(str(e.get("End", ""))) or now
+        if start and end and end > start:
+            days += (end - start).days
+    return round(days / 365.25, 2)
+
+
+class ShortlistRules:
+    """Reglas de shortlist compiladas una vez y evaluables en lote sobre muchos perfiles."""
+
+    def __init__(self, tier1_companies: Sequence[str] = TIER1_COMPANIES,
+                 countries: Sequence[str] = SHORTLIST_COUNTRIES,
+                 max_rate: float = MAX_RATE_USD, min_avail: float = MIN_AVAIL_HOURS,
+                 min_years: float = MIN_YEARS):
+        self.max_rate = max_rate
+        self.min_avail = min_avail
+        self.min_years = min_years
+        self._tier1_re = _alternation(tier1_companies)
+        self._country_re = _alternation(countries)
+
+    def worked_tier1(self, experiences: List[Dict]) -> bool:
+        return self._any_tier1([str(e.get("Company", "")) for e in experiences])
+
+    def _any_tier1(self, companies: List[str]) -> bool:
+        if self._tier1_re is None:
+            return False
+        return self._tier1_re.search(" | ".join(companies)) is not None
+
+    def location_ok(self, personal: Dict) -> bool:
+        return self._country_ok(str(personal.get("Location", "")))
+
+    def _country_ok(self, location: str) -> bool:
+        if self._country_re is None:
+            return False
+        return self._country_re.search(location) is not None
+
+    def columns(self, profiles: Sequence[Dict], now: Optional[datetime] = None) -> Dict[str, List]:
+        """Extrae cada input de las reglas como una columna (una lista por campo, alineada con profiles).
+
+        Acepta dicts del Compressed JSON o models.Applicant (fechas y rates ya parseados).
+        """
+        now = now or datetime.utcnow()
+        cols: Dict[str, List] = {"years": [], "tier1": [], "rate": [], "avail": [], "rate_raw": [], "avail_raw": [],
+                                 "location": [], "loc_ok": []}
+        for p in profiles:
+            if not isinstance(p, dict):
+                self._model_columns(p, now, cols)
+                continue
+            personal = p.get("personal") or {}
+            salary = p.get("salary") or {}
+            experiences = p.get("experience") or []
+            cols["years"].append(total_years(experiences, now))
+            cols["tier1"].append(self.worked_tier1(experiences))
+            cols["rate"].append(float(salary.get("Preferred Rate", 1e9)))
+            cols["avail"].append(float(salary.get("Availability (hrs/wk)", 0)))
+            cols["rate_raw"].append(salary.get("Preferred Rate", "N/A"))
+            cols["avail_raw"].append(salary.get("Availability (hrs/wk)", "N/A"))
+            cols["location"].append(personal.get("Location", "N/A"))
+            cols["loc_ok"].append(self.location_ok(personal))
+        return cols
+
+    def _model_columns(self, applicant, now: datetime, cols: Dict[str, List]):
+        salary = applicant.salary
+        rate_raw = salary.preferred_rate if salary is not None else None
+        avail_raw = salary.availability if salary is not None else None
+        location = applicant.location
+        cols["years"].append(applicant.total_years(now))
+        cols["tier1"].append(self._any_tier1(applicant.companies()))
+        # A value that is not a number fails in float() just like with the dict profile
+        cols["rate"].append(salary.rate if rate_raw is not None and salary.rate is not None
+                            else float(rate_raw if rate_raw is not None else 1e9))
+        cols["avail"].append(salary.hours if avail_raw is not None and salary.hours is not None
+                             else float(avail_raw if avail_raw is not None else 0))
+        cols["rate_raw"].append(rate_raw if rate_raw is not None else "N/A")
+        cols["avail_raw"].append(avail_raw if avail_raw is not None else "N/A")
+        cols["location"].append(location if location is not None else "N/A")
+        cols["loc_ok"].append(self._country_ok(str(location) if location is not None else ""))
+
+    def evaluate_batch(self, profiles: Sequence[Dict], now: Optional[datetime] = None) -> List[Dict]:
+        """Evalúa una lista de JSON comprimidos y devuelve [{"meets", "reason", "failed", "promise"}] en el mismo orden.
+
+        failed: reglas no cumplidas ("experience", "compensation", "location"). promise: reglas
+        cumplidas (0-3) más hasta 0.5 por años de experiencia y 0.25 por Tier-1, para ordenar.
+        """
+        cols = self.columns(profiles, now)
+        cond_exp = [y >= self.min_years or t for y, t in zip(cols["years"], cols["tier1"])]
+        cond_comp = [r <= self.max_rate and a >= self.min_avail for r, a in zip(cols["rate"], cols["avail"])]
+
+        out = []
+        for i in range(len(profiles)):
+            meets = cond_exp[i] and cond_comp[i] and cols["loc_ok"][i]
+            reasons = [
+                f"Experience: {cols['years'][i]} years total; Tier-1: {'yes' if cols['tier1'][i] else 'no'}",
+                f"Compensation: Preferred Rate={cols['rate_raw'][i]} <= ${self.max_rate}/h; "
+                f"Availability={cols['avail_raw'][i]} >= {self.min_avail} h/wk",
+                f"Location: {cols['location'][i]} in allowed set: {'yes' if cols['loc_ok'][i] else 'no'}",
+            ]
+            failed = [name for name, ok in (("experience", cond_exp[i]), ("compensation", cond_comp[i]),
+                                            ("location", cols["loc_ok"][i])) if not ok]
+            promise = 3 - len(failed) + min(cols["years"][i], 10) / 20 + (0.25 if cols["tier1"][i] else 0)
+            out.append({"meets": meets, "reason": " | ".join(reasons), "failed": failed, "promise": round(promise, 3)})
+        return out
+
+
+_default_rules: Optional[ShortlistRules] = None
+
+
+def default_rules() -> ShortlistRules:
+    """Reglas compiladas a partir del .env, construidas en el primer uso."""
+    global _default_rules
+    if _default_rules is None:
+        _default_rules = ShortlistRules()
+    return _default_rules
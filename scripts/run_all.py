@@ -1,54 +1,275 @@
+import argparse
 import json
-from typing import Optional
+import logging
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
 from .config import (
     TABLE_APPLICANTS, FIELD_APPLICANT_ID, FIELD_COMPRESSED_JSON,
-    FIELD_LLM_SUMMARY, FIELD_LLM_SCORE, FIELD_LLM_FOLLOWUPS
+    FIELD_LLM_SUMMARY, FIELD_LLM_SCORE, FIELD_LLM_FOLLOWUPS, SNAPSHOT_PATH, METRICS_PATH, LOG_LEVEL,
+    JOB_QUEUE_PATH, CHECKPOINT_PATH, RATE_COORDINATOR_PATH, LLM_EVAL_POLICY, LLM_RUN_TOKEN_BUDGET,
+    LLM_MAX_OUTPUT_TOKENS
+)
+from .airtable_client import BatchWriter, list_records
+from .codec import decode, encode, same_profile
+from .compression import (
+    compress_for_applicant, build_child_index, compress_from_index,
+    write_compressed_json_to_applicant
 )
-from .airtable_client import list_records, update_record
-from .compression import compress_for_applicant, write_compressed_json_to_applicant
 from .decompression import decompress_from_json_file
-from .shortlist import evaluate_shortlist, create_shortlisted_lead
-from .llm_client import call_llm
+from .dedup import DedupIndex
+from .shortlist import evaluate_shortlist, ShortlistIndex
+from .llm_client import call_llm, prompt_for
+from .llm_batch import BATCH_PROMPT_HEADER, call_llm_batch, format_followups
+from .llm_async import evaluate_many
+from .llm_router import get_router
+from .llm_cache import CACHE_MODES, LLMCache
+from .llm_policy import POLICIES, EvaluationPolicy
+from .prompt_encoding import estimate_tokens
+from .snapshot import open_snapshot
+from .incremental import load_checkpoint, save_checkpoint, new_high_water_mark, list_changed_applicants
+from .job_queue import Job, JobQueue, QueueSession
+from .log import setup_logging
+from .http_client import get_client
+from .metrics import get_metrics, merge_reports
+
+log = logging.getLogger(__name__)
+
+# Below this many changed applicants, 3 filtered queries each beat paging every child table
+_INCREMENTAL_BULK_MIN = 50
+
+# The only Applicants columns the pipeline reads; the LLM text fields are never downloaded
+APPLICANT_FIELDS = [FIELD_APPLICANT_ID, FIELD_COMPRESSED_JSON]
+
+# Jobs a queue worker thread takes per claim
+_CLAIM_BATCH = 10
 
+# Summary, score and follow-ups written when the LLM step cannot produce a result
+_SKIPPED_LLM_FIELDS = ("LLM evaluation skipped (no API key).", 0, "None")
 
-def process_applicant_record(rec: dict):
+
+def process_applicant_record(rec: dict, child_index: Optional[Dict] = None, writer: Optional[BatchWriter] = None,
+                             llm_cache: Optional[LLMCache] = None, skip_unchanged: bool = False,
+                             shortlist_index: Optional[ShortlistIndex] = None,
+                             llm_jobs: Optional[List[Tuple[str, str, str]]] = None,
+                             job: Optional[Job] = None, session: Optional[QueueSession] = None,
+                             dedup_index: Optional[DedupIndex] = None, policy: Optional[EvaluationPolicy] = None):
+    """llm_jobs: si se pasa, el paso LLM no se hace acá; se encola (rid, Applicant ID, JSON) para evaluarlo en lote.
+
+    job/session: applicant tomado de la cola de run_all --queue; las etapas ya hechas (JSON
+    comprimido, salida del LLM) se reutilizan y cada etapa nueva queda registrada.
+    dedup_index: si el applicant es copia de otro ya evaluado, se reutiliza el resultado de ese.
+    policy: decide según el veredicto si el applicant pasa por el LLM (ver scripts/llm_policy.py).
+    """
+    if writer is None:
+        with BatchWriter() as own_writer:
+            return process_applicant_record(rec, child_index=child_index, writer=own_writer, llm_cache=llm_cache,
+                                            skip_unchanged=skip_unchanged, shortlist_index=shortlist_index,
+                                            llm_jobs=llm_jobs, job=job, session=session, dedup_index=dedup_index,
+                                            policy=policy)
+
+    metrics = get_metrics()
     rid = rec["id"]
     fields = rec.get("fields", {})
     applicant_id_value = fields.get(FIELD_APPLICANT_ID)
+    if shortlist_index is None:
+        shortlist_index = ShortlistIndex.load(writer, applicant_id=applicant_id_value)
 
-    print(f"\n[PROCESS] Applicant {applicant_id_value} (rec_id={rid})")
+    log.info(f"[PROCESS] Applicant {applicant_id_value} (rec_id={rid})")
+
+    # 1) Compress (from the prefetched index when running in bulk)
+    with metrics.stage("compress"):
+        if job is not None and job.compressed is not None:
+            # Resumed job: reuse the JSON computed before the interruption
+            compressed_text = job.compressed
+            compressed_obj = decode(compressed_text)
+        else:
+            if child_index is not None:
+                compressed_obj = compress_from_index(child_index, rid)
+            else:
+                compressed_obj = compress_for_applicant(applicant_id_value)
+            # Encoded once: the same text is written, compared, shortlisted and sent to the LLM
+            compressed_text = encode(compressed_obj)
+            if session is not None:
+                session.advance(rid, "compressed", compressed=compressed_text)
+        stored = fields.get(FIELD_COMPRESSED_JSON)
+        unchanged = compressed_text == stored
+        if not unchanged and stored and same_profile(stored, compressed_obj):
+            # Same profile in an older format or schema version: keep the stored text as is
+            compressed_text, unchanged = stored, True
+        if unchanged and skip_unchanged:
+            log.debug(f"[SKIP] Compressed JSON unchanged for {applicant_id_value}, nothing to do")
+            metrics.inc("applicants_total", outcome="unchanged")
+            if session is not None:
+                session.finished(rid)
+            return
+        if unchanged:
+            log.debug(f"[COMPRESS] Compressed JSON unchanged for {applicant_id_value}, not rewriting")
+        else:
+            write_compressed_json_to_applicant(rid, compressed_obj, writer=writer, compressed_text=compressed_text)
+            log.debug(f"[COMPRESS] Compressed JSON queued for {applicant_id_value}")
 
-    # 1) Compress
-    compressed_obj = compress_for_applicant(applicant_id_value)
-    compressed_text = json.dumps(compressed_obj, ensure_ascii=False)
-    write_compressed_json_to_applicant(rid, compressed_obj)
-    print(f"[COMPRESS] Compressed JSON written for {applicant_id_value}")
+    # Copy of an applicant scored earlier in the run: reuse its verdict and LLM result
+    reused = dedup_index.reuse(rid) if dedup_index is not None else None
+    if reused is not None:
+        canonical_id, (summary, score, followups) = reused
+        # The lead belongs to the canonical applicant only
+        shortlist_index.remove(rid)
+        _write_llm_fields(writer, rid, f"Duplicate of applicant {canonical_id}. {summary}"[:600], score, followups,
+                          session)
+        metrics.inc("applicants_total", outcome="duplicate")
+        log.info(f"[DONE] Applicant {applicant_id_value} is a duplicate of {canonical_id}, result reused.")
+        return
 
     # 2) Shortlist
-    verdict = evaluate_shortlist(compressed_obj)
-    print(f"[SHORTLIST] Verdict for {applicant_id_value}: {verdict}")
-    if verdict["meets"]:
-        print(f"[SHORTLIST] Creating Shortlisted Lead for {applicant_id_value}")
-        create_shortlisted_lead(rid, compressed_text, verdict["reason"])
-    else:
-        print(f"[SHORTLIST] Applicant {applicant_id_value} did NOT meet criteria")
+    with metrics.stage("shortlist"):
+        verdict = evaluate_shortlist(compressed_obj)
+        log.debug(f"[SHORTLIST] Verdict for {applicant_id_value}: {verdict}")
+        if not verdict["meets"]:
+            log.debug(f"[SHORTLIST] Applicant {applicant_id_value} did NOT meet criteria")
+        # Creates, updates or removes the lead only when something changed
+        shortlist_index.apply(rid, verdict, compressed_text)
+        if session is not None and not job.reached("shortlisted"):
+            session.advance(rid, "shortlisted")
 
     # 3) LLM evaluation
-    try:
-        llm_output = call_llm(compressed_text)
-        summary, score, followups, issues = _parse_llm_output(llm_output)
-    except Exception as e:
-        print(f"[LLM] Skipping LLM eval for {applicant_id_value}: {e}")
-        summary = "LLM evaluation skipped (no API key)."
-        score = 0
-        followups = "None"
+    if job is not None and job.llm is not None:
+        # Scored before the interruption: only the write is left
+        summary, score, followups = job.llm
+        _write_llm_fields(writer, rid, summary, score, followups, session, dedup_index)
+        metrics.inc("applicants_total", outcome="processed")
+        log.info(f"[DONE] Applicant {applicant_id_value} processed (LLM result from the queue).")
+        return
+    if policy is not None and not policy.eligible(rid, verdict, changed=not unchanged):
+        # Rejected outright by the rules: not worth an LLM call under this policy
+        if not unchanged:
+            _clear_llm_fields(writer, rid)
+        metrics.inc("applicants_total", outcome="gated")
+        if session is not None:
+            session.finished(rid)
+        log.info(f"[DONE] Applicant {applicant_id_value} processed, no LLM evaluation under the {policy.mode} policy.")
+        return
+    if llm_jobs is not None:
+        llm_jobs.append((rid, str(applicant_id_value), compressed_text))
+        metrics.inc("applicants_total", outcome="queued")
+        log.info(f"[DONE] Applicant {applicant_id_value} processed, LLM evaluation queued for a batch.")
+        return
+    _score_one(rid, str(applicant_id_value), compressed_text, writer, llm_cache, session, dedup_index)
+    metrics.inc("applicants_total", outcome="processed")
+    log.info(f"[DONE] Applicant {applicant_id_value} processed.")
 
-    update_record(TABLE_APPLICANTS, rid, {
+
+def _score_one(rid: str, applicant_id_value: str, compressed_text: str, writer: BatchWriter,
+               llm_cache: Optional[LLMCache], session: Optional[QueueSession] = None,
+               dedup_index: Optional[DedupIndex] = None):
+    with get_metrics().stage("llm"):
+        try:
+            if llm_cache is not None:
+                llm_output = llm_cache.call(compressed_text, call_llm)
+            else:
+                llm_output = call_llm(compressed_text)
+            summary, score, followups, issues = _parse_llm_output(llm_output)
+        except Exception as e:
+            log.warning(f"[LLM] Skipping LLM eval for {applicant_id_value}: {e}")
+            get_metrics().inc("llm_skipped_total")
+            summary, score, followups = _SKIPPED_LLM_FIELDS
+
+    _write_llm_fields(writer, rid, summary, score, followups, session, dedup_index)
+
+
+def _write_llm_fields(writer: BatchWriter, rid: str, summary: str, score: int, followups: str,
+                      session: Optional[QueueSession] = None, dedup_index: Optional[DedupIndex] = None):
+    if dedup_index is not None and (summary, score, followups) != _SKIPPED_LLM_FIELDS:
+        dedup_index.record(rid, (summary, score, followups))
+    if session is not None:
+        # Stored before the write so a crash after this point never pays for the LLM call again
+        session.advance(rid, "llm_scored", llm=(summary, score, followups))
+    # Merged with the Compressed JSON update into a single PATCH by the writer
+    writer.update(TABLE_APPLICANTS, rid, {
         FIELD_LLM_SUMMARY: summary,
         FIELD_LLM_SCORE: score,
         FIELD_LLM_FOLLOWUPS: followups
     })
-    print(f"[DONE] Applicant {applicant_id_value} processed.\n")
+    if session is not None:
+        session.finished(rid)
+
+
+def _score_in_batches(jobs: List[Tuple[str, str, str]], writer: BatchWriter, llm_cache: Optional[LLMCache],
+                      batch_size: int, session: Optional[QueueSession] = None,
+                      dedup_index: Optional[DedupIndex] = None):
+    """Paso LLM de todos los applicants encolados: K perfiles por request, salida JSON validada."""
+    if not jobs:
+        return
+    results: Dict[str, Dict] = {}
+    todo = []
+    for rid, _, text in jobs:
+        cached = None
+        if llm_cache is not None and llm_cache.mode == "use":
+            cached = llm_cache.get(llm_cache.key(text, prompt_header=BATCH_PROMPT_HEADER))
+        if cached is not None:
+            results[rid] = json.loads(cached)
+        else:
+            todo.append((rid, text))
+
+    log.info(f"[LLM] Batch-scoring {len(todo)} applicants ({len(jobs) - len(todo)} cached), up to {batch_size} per request")
+    fresh, errors = call_llm_batch(todo, batch_size)
+    texts = {rid: text for rid, text in todo}
+    for rid, result in fresh.items():
+        results[rid] = result
+        if llm_cache is not None:
+            llm_cache.put(llm_cache.key(texts[rid], prompt_header=BATCH_PROMPT_HEADER),
+                          json.dumps(result, ensure_ascii=False))
+
+    for rid, applicant_id_value, _ in jobs:
+        result = results.get(rid)
+        if result is None:
+            log.warning(f"[LLM] Skipping LLM eval for {applicant_id_value}: {errors.get(rid, 'no result')}")
+            summary, score, followups = _SKIPPED_LLM_FIELDS
+        else:
+            summary = result["summary"][:600]
+            score = result["score"]
+            followups = format_followups(result["followups"])[:1000]
+        _write_llm_fields(writer, rid, summary, score, followups, session, dedup_index)
+    log.info(f"[LLM] Batch scoring done: {len(results)}/{len(jobs)} evaluated, {len(jobs) - len(results)} skipped")
+
+
+def _score_concurrently(jobs: List[Tuple[str, str, str]], writer: BatchWriter, llm_cache: Optional[LLMCache],
+                        concurrency: int, session: Optional[QueueSession] = None,
+                        dedup_index: Optional[DedupIndex] = None):
+    """Paso LLM de todos los applicants encolados con el cliente async; cada resultado se escribe al llegar."""
+    if not jobs:
+        return
+    by_rid = {rid: (applicant_id_value, text) for rid, applicant_id_value, text in jobs}
+    todo = []
+    for rid, applicant_id_value, text in jobs:
+        cached = llm_cache.get(llm_cache.key(text)) if llm_cache is not None and llm_cache.mode == "use" else None
+        if cached is not None:
+            summary, score, followups, _ = _parse_llm_output(cached)
+            _write_llm_fields(writer, rid, summary, score, followups, session, dedup_index)
+        else:
+            todo.append((rid, text))
+
+    def on_result(rid: str, output: Optional[str], error: Optional[BaseException]):
+        applicant_id_value, text = by_rid[rid]
+        if error is not None:
+            log.warning(f"[LLM] Skipping LLM eval for {applicant_id_value}: {error}")
+            summary, score, followups = _SKIPPED_LLM_FIELDS
+        else:
+            if llm_cache is not None:
+                llm_cache.put(llm_cache.key(text), output)
+            summary, score, followups, _ = _parse_llm_output(output)
+        _write_llm_fields(writer, rid, summary, score, followups, session, dedup_index)
+
+    log.info(f"[LLM] Scoring {len(todo)} applicants ({len(jobs) - len(todo)} cached), {concurrency} in flight")
+    stats = evaluate_many(todo, on_result, max_in_flight=concurrency)
+    log.info(f"[LLM] Concurrent scoring done: {stats}")
 
 
 def _parse_llm_output(txt: str):
@@ -90,17 +311,441 @@ def _parse_llm_output(txt: str):
     return summary[:600], score, followups[:1000], issues[:600]
 
 
-def run(applicant_id: Optional[str] = None):
-    if applicant_id:
-        recs = list_records(TABLE_APPLICANTS, filter_formula=f"{{{FIELD_APPLICANT_ID}}} = '{applicant_id}'")
+def _process_safely(rec: dict, child_index: Optional[Dict], writer: BatchWriter, llm_cache: Optional[LLMCache],
+                    skip_unchanged: bool, shortlist_index: ShortlistIndex,
+                    failures: List[Tuple[str, str]], lock: threading.Lock,
+                    llm_jobs: Optional[List[Tuple[str, str, str]]] = None,
+                    dedup_index: Optional[DedupIndex] = None, policy: Optional[EvaluationPolicy] = None):
+    """Procesa un applicant y registra el error en vez de abortar el run."""
+    try:
+        with get_metrics().stage("applicant"):
+            process_applicant_record(rec, child_index=child_index, writer=writer, llm_cache=llm_cache,
+                                     skip_unchanged=skip_unchanged, shortlist_index=shortlist_index,
+                                     llm_jobs=llm_jobs, dedup_index=dedup_index, policy=policy)
+    except Exception as e:
+        get_metrics().inc("applicants_total", outcome="failed")
+        applicant_id_value = rec.get("fields", {}).get(FIELD_APPLICANT_ID)
+        log.error(f"[ERROR] Applicant {applicant_id_value} (rec_id={rec['id']}) failed: {e}")
+        with lock:
+            failures.append((str(applicant_id_value), str(e)))
+
+
+def _process_records(recs: List[dict], workers: int, child_index: Optional[Dict], writer: BatchWriter,
+                     llm_cache: Optional[LLMCache], skip_unchanged: bool, shortlist_index: ShortlistIndex,
+                     failures: List[Tuple[str, str]], lock: threading.Lock,
+                     llm_jobs: Optional[List[Tuple[str, str, str]]], dedup_index: Optional[DedupIndex] = None,
+                     policy: Optional[EvaluationPolicy] = None):
+    if workers > 1:
+        # Airtable and LLM rate limits are enforced by the shared HTTP client,
+        # so extra workers only help until those budgets are saturated
+        log.info(f"[RUN] Processing with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="applicant") as pool:
+            for rec in recs:
+                pool.submit(_process_safely, rec, child_index, writer, llm_cache, skip_unchanged, shortlist_index,
+                            failures, lock, llm_jobs, dedup_index, policy)
     else:
-        recs = list_records(TABLE_APPLICANTS)
+        for rec in recs:
+            _process_safely(rec, child_index, writer, llm_cache, skip_unchanged, shortlist_index, failures, lock,
+                            llm_jobs, dedup_index, policy)
+
+
+def _llm_cost(text: str, llm_cache: Optional[LLMCache], batch: bool) -> int:
+    """Tokens estimados de evaluar un perfil (prompt + salida máxima); 0 si el resultado ya está en cache."""
+    if llm_cache is not None and llm_cache.mode == "use":
+        key = llm_cache.key(text, prompt_header=BATCH_PROMPT_HEADER) if batch else llm_cache.key(text)
+        if llm_cache.contains(key):
+            return 0
+    return estimate_tokens(prompt_for(text)) + LLM_MAX_OUTPUT_TOKENS
+
+
+def _clear_llm_fields(writer: BatchWriter, rid: str):
+    # The stored result describes an older profile: cleared so --unscored-only picks it up
+    writer.update(TABLE_APPLICANTS, rid, {FIELD_LLM_SUMMARY: "", FIELD_LLM_SCORE: None, FIELD_LLM_FOLLOWUPS: ""})
+
+
+def _defer_llm(writer: BatchWriter, rid: str, applicant_id_value: str, stale: bool,
+               session: Optional[QueueSession] = None):
+    """Applicant que no entró en el presupuesto del run: queda para otro run."""
+    if stale:
+        _clear_llm_fields(writer, rid)
+    get_metrics().inc("llm_deferred_total")
+    log.debug(f"[LLM] Applicant {applicant_id_value} deferred to a later run (token budget spent)")
+    if session is not None:
+        session.finished(rid)
+
+
+def _score_deferred(llm_jobs: Optional[List[Tuple[str, str, str]]], writer: BatchWriter,
+                    llm_cache: Optional[LLMCache], llm_batch: int, llm_concurrency: int,
+                    session: Optional[QueueSession] = None, dedup_index: Optional[DedupIndex] = None,
+                    policy: Optional[EvaluationPolicy] = None):
+    """Paso LLM de los applicants encolados (--llm-batch, --llm-concurrency o presupuesto); vacía la lista.
+
+    Con policy, los más prometedores van primero y los que no entran en el presupuesto se difieren.
+    """
+    if not llm_jobs:
+        return
+    jobs = list(llm_jobs)
+    llm_jobs.clear()
+    if policy is not None:
+        jobs, deferred = policy.admit(jobs, lambda text: _llm_cost(text, llm_cache, llm_batch > 1))
+        if deferred:
+            log.info(f"[LLM] Token budget: scoring {len(jobs)} applicants, {len(deferred)} deferred to a later run")
+        for rid, applicant_id_value, _ in deferred:
+            _defer_llm(writer, rid, applicant_id_value, policy.stale(rid), session)
+    with get_metrics().stage("llm_deferred"):
+        if llm_batch > 1:
+            _score_in_batches(jobs, writer, llm_cache, llm_batch, session, dedup_index)
+        elif llm_concurrency > 1:
+            _score_concurrently(jobs, writer, llm_cache, llm_concurrency, session, dedup_index)
+        else:
+            for rid, applicant_id_value, text in jobs:
+                _score_one(rid, applicant_id_value, text, writer, llm_cache, session, dedup_index)
+
+
+def _drain_queue(session: QueueSession, workers: int, child_index: Optional[Dict], writer: BatchWriter,
+                 llm_cache: Optional[LLMCache], skip_unchanged: bool, shortlist_index: ShortlistIndex,
+                 llm_jobs: Optional[List[Tuple[str, str, str]]], policy: Optional[EvaluationPolicy] = None):
+    """Cada worker toma jobs de la cola hasta vaciarla; los fallidos vuelven con backoff o van a dead letter."""
+    def work():
+        while True:
+            jobs = session.claim(_CLAIM_BATCH)
+            if not jobs:
+                wait = session.next_wait()
+                if wait is None:
+                    return
+                # Only retries waiting out their backoff are left
+                time.sleep(min(wait, 1.0))
+                continue
+            for job in jobs:
+                try:
+                    with get_metrics().stage("applicant"):
+                        process_applicant_record(job.record, child_index=child_index, writer=writer,
+                                                 llm_cache=llm_cache, skip_unchanged=skip_unchanged,
+                                                 shortlist_index=shortlist_index, llm_jobs=llm_jobs,
+                                                 job=job, session=session, policy=policy)
+                except Exception as e:
+                    get_metrics().inc("applicants_total", outcome="failed")
+                    session.failed(job, e)
+
+    if workers > 1:
+        log.info(f"[RUN] Processing the queue with {workers} workers")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="applicant") as pool:
+            for fut in [pool.submit(work) for _ in range(workers)]:
+                fut.result()
+    else:
+        work()
+
+
+def parse_shard(value: str) -> Tuple[int, int]:
+    """"i/N" (1 <= i <= N) -> (i, N)."""
+    try:
+        index, count = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {value!r}")
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}, got {value!r}")
+    return index, count
+
+
+def shard_of(applicant_id: str, count: int) -> int:
+    """Shard (1..count) de un Applicant ID; crc32 da lo mismo en todo proceso y máquina, hash() no."""
+    return zlib.crc32(applicant_id.encode("utf-8")) % count + 1
+
+
+def _shard_path(path: str, shard: Tuple[int, int]) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{shard[0]}of{shard[1]}{ext}"
+
+
+def run(applicant_id: Optional[str] = None, bulk: bool = True, workers: int = 1, llm_cache_mode: str = "use",
+        incremental: bool = False, source: str = "airtable", snapshot_path: str = SNAPSHOT_PATH,
+        llm_batch: int = 1, llm_concurrency: int = 1, metrics_path: str = METRICS_PATH,
+        queue_path: Optional[str] = None, unscored_only: bool = False, shard: Optional[Tuple[int, int]] = None,
+        rate_coordinator: str = RATE_COORDINATOR_PATH, dedup: bool = False, llm_policy: str = LLM_EVAL_POLICY,
+        llm_budget: int = LLM_RUN_TOKEN_BUDGET):
+    """queue_path: procesa vía la cola persistente; si hay un run sin terminar lo retoma (o se suma a él).
+
+    unscored_only: Airtable solo devuelve los applicants sin LLM Summary (nunca evaluados).
+    shard: (i, N) procesa solo los Applicant IDs del shard i; los límites de Airtable y del
+    LLM se comparten con los demás shards del host vía rate_coordinator, y la cola y el
+    checkpoint son propios de cada shard.
+    dedup: detecta applicants duplicados (scripts/dedup.py); cada copia reutiliza el veredicto y
+    el resultado del LLM de su applicant canónico en vez de pagar su propia llamada.
+    llm_policy/llm_budget: qué applicants pasan por el LLM y cuántos tokens puede gastar el run;
+    con presupuesto, los más prometedores se evalúan primero y el resto queda para otro run.
+    """
+    metrics = get_metrics()
+    policy = EvaluationPolicy(llm_policy, llm_budget)
+    since = None
+    high_water = None
+    list_fn = list_records
+    if source == "snapshot":
+        if incremental:
+            raise ValueError("--incremental needs live LAST_MODIFIED_TIME data and cannot run on a snapshot")
+        if unscored_only:
+            raise ValueError("--unscored-only filters on the Airtable side and cannot run on a snapshot")
+        # Reads come from the local snapshot and Airtable writes are only counted (dry run)
+        list_fn = open_snapshot(snapshot_path).list_records
+    if dedup and (applicant_id or incremental or queue_path or (not bulk and source != "snapshot")):
+        raise ValueError("--dedup compares every listed applicant and needs a full bulk run "
+                         "(no --applicant-id, --incremental, --queue or --no-bulk)")
+    checkpoint_path = CHECKPOINT_PATH
+    if shard:
+        if applicant_id:
+            raise ValueError("--shard splits whole runs and cannot be combined with --applicant-id")
+        get_client().share_rates(rate_coordinator)
+        checkpoint_path = _shard_path(CHECKPOINT_PATH, shard)
+        if queue_path:
+            queue_path = _shard_path(queue_path, shard)
+        log.info(f"[SHARD] Shard {shard[0]}/{shard[1]}, rate limits shared through {rate_coordinator}")
+    applicant_filter = None
+    if unscored_only:
+        if incremental:
+            raise ValueError("--incremental re-scores changed applicants and cannot be combined with --unscored-only")
+        applicant_filter = f"{{{FIELD_LLM_SUMMARY}}} = ''"
+
+    queue = run_id = None
+    if queue_path:
+        if applicant_id:
+            raise ValueError("--queue works on whole runs and cannot be combined with --applicant-id")
+        queue = JobQueue(queue_path)
+        reaped = queue.reap()
+        if reaped:
+            log.info(f"[QUEUE] Released {reaped} jobs held by processes that no longer exist")
+        run_id = queue.open_run()
+
+    if run_id is not None:
+        # Resume (or join) the unfinished run instead of listing Applicants again
+        recs = []
+        high_water = queue.high_water(run_id)
+        to_compress = queue.counts(run_id).get("pending", 0)
+        log.info(f"[QUEUE] Resuming run {run_id}: {queue.counts(run_id)}")
+    else:
+        with metrics.stage("list_applicants"):
+            if applicant_id:
+                by_id = f"{{{FIELD_APPLICANT_ID}}} = '{applicant_id}'"
+                recs = list_fn(TABLE_APPLICANTS, fields=APPLICANT_FIELDS,
+                               filter_formula=f"AND({by_id}, {applicant_filter})" if applicant_filter else by_id)
+            elif incremental:
+                # Taken before listing so edits made during the run are picked up next time
+                high_water = new_high_water_mark()
+                since = load_checkpoint(checkpoint_path)
+                if since:
+                    log.info(f"[RUN] Incremental run: changes since {since}")
+                    recs = list_changed_applicants(since, fields=APPLICANT_FIELDS)
+                else:
+                    log.info("[RUN] No checkpoint yet, processing every applicant")
+                    recs = list_fn(TABLE_APPLICANTS, fields=APPLICANT_FIELDS)
+            else:
+                recs = list_fn(TABLE_APPLICANTS, filter_formula=applicant_filter, fields=APPLICANT_FIELDS)
+        if shard:
+            listed = len(recs)
+            recs = [r for r in recs
+                    if shard_of(str(r.get("fields", {}).get(FIELD_APPLICANT_ID) or r["id"]), shard[1]) == shard[0]]
+            log.info(f"[SHARD] {len(recs)} of {listed} listed applicants belong to this shard")
+        to_compress = len(recs)
+        log.info(f"[RUN] Found {len(recs)} applicants to process")
+        if queue is not None:
+            run_id, created = queue.start_run(recs, FIELD_APPLICANT_ID, high_water)
+            if created:
+                log.info(f"[QUEUE] Queued run {run_id} with {len(recs)} applicants")
+            else:
+                # Another process opened a run first: work on that one
+                high_water = queue.high_water(run_id)
+                log.info(f"[QUEUE] Joining run {run_id}: {queue.counts(run_id)}")
+
+    # A full run pages each child table once instead of 3 filtered queries per applicant
+    child_index = None
+    with metrics.stage("prefetch_children"):
+        if source == "snapshot":
+            child_index = build_child_index(list_fn)
+        elif bulk and not applicant_id and to_compress and (since is None or to_compress >= _INCREMENTAL_BULK_MIN):
+            child_index = build_child_index()
+
+    dedup_index = None
+    if dedup and child_index is not None:
+        with metrics.stage("dedup_index"):
+            dedup_index = DedupIndex.build(recs, child_index)
+        log.info(f"[DEDUP] {dedup_index.summary()}")
+
+    llm_cache = LLMCache(mode=llm_cache_mode) if llm_cache_mode != "bypass" else None
+
+    failures: List[Tuple[str, str]] = []
+    lock = threading.Lock()
+    # With --llm-batch/--llm-concurrency the LLM step runs after every applicant is compressed and shortlisted
+    # and with a token budget, so the most promising applicants can be scored first
+    llm_jobs: Optional[List[Tuple[str, str, str]]] = \
+        [] if llm_batch > 1 or llm_concurrency > 1 or policy.prioritizes else None
+    with BatchWriter(dry_run=(source == "snapshot")) as writer:
+        with metrics.stage("load_shortlist"):
+            shortlist_index = ShortlistIndex.load(writer, applicant_id=applicant_id, list_fn=list_fn)
+        session = QueueSession(queue, run_id, writer) if queue is not None else None
+        if session is not None:
+            _drain_queue(session, workers, child_index, writer, llm_cache, incremental, shortlist_index, llm_jobs,
+                         policy)
+            _score_deferred(llm_jobs, writer, llm_cache, llm_batch, llm_concurrency, session, policy=policy)
+        else:
+            # With --dedup the canonical applicants go first, so their copies find a result to reuse
+            for batch in (dedup_index.split(recs) if dedup_index is not None else (recs,)):
+                _process_records(batch, workers, child_index, writer, llm_cache, incremental, shortlist_index,
+                                 failures, lock, llm_jobs, dedup_index, policy)
+                _score_deferred(llm_jobs, writer, llm_cache, llm_batch, llm_concurrency, dedup_index=dedup_index,
+                                policy=policy)
+        with metrics.stage("flush_writes"):
+            if session is not None:
+                # Flushes and marks the remaining finished jobs as written
+                session.close()
+            try:
+                writer.flush()
+            except Exception as e:
+                # Counted in writer.failed_sends and reported with the run's failures
+                log.error(f"[RUN] Flushing Airtable writes failed: {e}")
+
+    run_closed = False
+    if queue is not None:
+        failures = session.failures
+        run_closed = queue.finish_run_if_complete(run_id)
+        counts = queue.counts(run_id)
+        log.info(f"[QUEUE] Run {run_id}: {counts}" + ("" if run_closed else ", still open (resume with --queue)"))
+        # The checkpoint follows the whole run, which may have been split across processes and restarts
+        if run_closed and counts.get("dead"):
+            failures = failures or [("run", f"{counts['dead']} dead-lettered jobs")]
+        elif not run_closed:
+            high_water = None
+        queue.close()
+    else:
+        log.info(f"[RUN] Processed {len(recs) - len(failures)}/{len(recs)} applicants, {len(failures)} failed")
+        if writer.failed_sends:
+            # A failed batch carried writes queued by other applicants too, which still count as processed
+            failures.append(("writes", f"{writer.failed_sends} Airtable write batches failed, "
+                                       f"their records were not written"))
+    for failed_id, err in failures:
+        log.warning(f"[RUN]   {failed_id}: {err}")
+    log.info(f"[SHORTLIST] Shortlisted Leads: {shortlist_index.summary()}")
+    if dedup_index is not None:
+        log.info(f"[DEDUP] {dedup_index.summary()}")
+    if writer.dry_run:
+        log.info(f"[RUN] Dry run on snapshot, Airtable writes not sent: {writer.skipped}")
+    log.info(f"[LLM] Evaluation: {policy.summary()}")
+    log.info(f"[LLM] Providers: {get_router().stats()}")
+    if llm_cache is not None:
+        log.info(f"[LLM] Cache: {llm_cache.stats()}")
+        llm_cache.close()
+
+    if high_water:
+        if failures:
+            log.warning("[RUN] Checkpoint not advanced because some applicants failed")
+        else:
+            save_checkpoint(high_water, checkpoint_path)
+            log.info(f"[RUN] Checkpoint advanced to {high_water}")
+
+    for line in metrics.summary_lines():
+        log.info(f"[METRICS] {line}")
+    if metrics_path:
+        metrics.write_report(metrics_path)
+        log.info(f"[METRICS] Run report written to {metrics_path}")
+    return failures
+
+
+def _without_options(argv: List[str], names: Tuple[str, ...]) -> List[str]:
+    out, skip_value = [], False
+    for arg in argv:
+        if skip_value:
+            skip_value = False
+        elif arg in names:
+            skip_value = True
+        elif arg.split("=", 1)[0] not in names:
+            out.append(arg)
+    return out
+
+
+def run_sharded(count: int, argv: List[str], metrics_path: str = METRICS_PATH) -> Dict[int, int]:
+    """Lanza `count` procesos run_all --shard i/count en este host y junta sus reportes en uno.
+
+    Devuelve el exit code de cada shard.
+    """
+    reports_dir = tempfile.mkdtemp(prefix="run_all-shards-")
+    procs = []
+    for index in range(1, count + 1):
+        report = os.path.join(reports_dir, f"shard-{index}.json")
+        cmd = [sys.executable, "-m", "scripts.run_all", *argv, "--shard", f"{index}/{count}", "--metrics-out", report]
+        procs.append((index, report, subprocess.Popen(cmd)))
+    log.info(f"[SHARD] Started {count} shards")
+    codes = {index: proc.wait() for index, _, proc in procs}
+    merged = merge_reports([report for _, report, _ in procs if os.path.exists(report)])
+    shutil.rmtree(reports_dir, ignore_errors=True)
+
+    outcomes = {item["labels"].get("outcome"): item["value"]
+                for item in merged.to_json()["counters"].get("applicants_total", [])}
+    log.info(f"[SHARD] Applicants across shards: " + ", ".join(f"{k}={v:g}" for k, v in sorted(outcomes.items())))
+    for index, code in codes.items():
+        if code:
+            log.error(f"[SHARD] Shard {index}/{count} exited with code {code}")
+    for line in merged.summary_lines():
+        log.info(f"[METRICS] {line}")
+    if metrics_path:
+        merged.write_report(metrics_path)
+        log.info(f"[METRICS] Merged run report written to {metrics_path}")
+    return codes
 
-    print(f"\n[RUN] Found {len(recs)} applicants to process")
 
-    for rec in recs:
-        process_applicant_record(rec)
+def main():
+    parser = argparse.ArgumentParser(description="Compress, shortlist and LLM-score Applicants.")
+    parser.add_argument("--applicant-id", help="Process a single Applicant ID")
+    parser.add_argument("--no-bulk", action="store_true",
+                        help="Query child tables per applicant instead of prefetching them once")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of applicants processed concurrently (default: 1)")
+    parser.add_argument("--llm-cache", choices=CACHE_MODES, default="use",
+                        help="use: reuse cached LLM results; refresh: re-call and overwrite; bypass: ignore the cache")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only process applicants changed since the last checkpoint and skip unchanged ones")
+    parser.add_argument("--source", choices=("airtable", "snapshot"), default="airtable",
+                        help="snapshot: read from the local snapshot and skip all Airtable writes")
+    parser.add_argument("--snapshot-path", default=SNAPSHOT_PATH)
+    parser.add_argument("--llm-batch", type=int, default=1, metavar="K",
+                        help="Score K applicants per LLM request with structured JSON output (default: 1, off)")
+    parser.add_argument("--llm-concurrency", type=int, default=1, metavar="N",
+                        help="Score applicants with the async LLM client, N requests in flight (default: 1, off)")
+    parser.add_argument("--unscored-only", action="store_true",
+                        help="Only list applicants that have no LLM Summary yet (filtered by Airtable)")
+    parser.add_argument("--queue", nargs="?", const=JOB_QUEUE_PATH, metavar="PATH",
+                        help="Track per-applicant progress in a durable queue; resumes an unfinished run "
+                             f"and lets several processes share it (default path: {JOB_QUEUE_PATH})")
+    parser.add_argument("--llm-policy", choices=POLICIES, default=LLM_EVAL_POLICY,
+                        help="Which applicants get an LLM evaluation, based on the shortlist rules")
+    parser.add_argument("--llm-budget", type=int, default=LLM_RUN_TOKEN_BUDGET, metavar="TOKENS",
+                        help="Estimated LLM tokens this run may spend, most promising applicants first (0 = no limit)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Reuse the shortlist verdict and LLM result of the canonical applicant for duplicates")
+    parser.add_argument("--shard", type=parse_shard, metavar="I/N",
+                        help="Only process the applicants whose Applicant ID hashes to shard I of N")
+    parser.add_argument("--shards", type=int, metavar="N",
+                        help="Run N shards as local processes and merge their reports")
+    parser.add_argument("--rate-coordinator", default=RATE_COORDINATOR_PATH, metavar="PATH",
+                        help="SQLite file through which the shards of this host share rate limits")
+    parser.add_argument("--metrics-out", default=METRICS_PATH, metavar="PATH",
+                        help="Write the run report here (.json, or .prom/.txt for Prometheus text)")
+    parser.add_argument("--log-level", default=LOG_LEVEL, choices=("DEBUG", "INFO", "WARNING", "ERROR"),
+                        type=str.upper, help="DEBUG also logs per-applicant verdicts and compression details")
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+    if args.source == "snapshot" and (args.incremental or args.unscored_only):
+        parser.error("--source snapshot cannot be combined with --incremental or --unscored-only")
+    if args.shards:
+        if args.shard:
+            parser.error("--shards launches the shards itself; do not pass --shard")
+        codes = run_sharded(args.shards, _without_options(sys.argv[1:], ("--shards", "--metrics-out")),
+                            metrics_path=args.metrics_out)
+        sys.exit(1 if any(codes.values()) else 0)
+    failures = run(applicant_id=args.applicant_id, bulk=not args.no_bulk, workers=max(args.workers, 1),
+                   llm_cache_mode=args.llm_cache, incremental=args.incremental,
+                   source=args.source, snapshot_path=args.snapshot_path, llm_batch=args.llm_batch,
+                   llm_concurrency=args.llm_concurrency, metrics_path=args.metrics_out, queue_path=args.queue,
+                   unscored_only=args.unscored_only, shard=args.shard, rate_coordinator=args.rate_coordinator,
+                   dedup=args.dedup, llm_policy=args.llm_policy, llm_budget=args.llm_budget)
+    sys.exit(1 if failures else 0)
 
 
 if __name__ == "__main__":
-    run()
+    main()
@@ -1,105 +1,180 @@
-import json
-import re
-from datetime import datetime
-from .config import (
-    TABLE_SHORTLIST,
-    FIELD_SL_APPLICANT,
-    FIELD_SL_JSON,
-    FIELD_SL_REASON,
-)
-from .airtable_client import create_record
-from typing import Dict, List
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Union
 
 from .config import (
-    TABLE_SHORTLIST, TABLE_APPLICANTS,
-    FIELD_COMPRESSED_JSON, FIELD_APPLICANT_ID,
-    FIELD_SL_APPLICANT, FIELD_SL_JSON, FIELD_SL_REASON, FIELD_SL_CREATED_AT,
-    TIER1_COMPANIES, SHORTLIST_COUNTRIES, MAX_RATE_USD, MIN_AVAIL_HOURS
+    TABLE_SHORTLIST, TABLE_APPLICANTS, FIELD_COMPRESSED_JSON,
+    FIELD_SL_APPLICANT, FIELD_SL_JSON, FIELD_SL_REASON, SNAPSHOT_PATH
 )
-from .airtable_client import create_record, list_records
+from .airtable_client import BatchWriter, create_record, iter_records, list_records
+from .models import Applicant
+from .rule_engine import default_rules, parse_date, total_years
 
-DATE_FORMATS = (
-    "%Y-%m-%d",   # 2020-01-31
-    "%Y/%m/%d",   # 2020/01/31
-    "%d-%m-%Y",   # 31-01-2020
-    "%d/%m/%Y",   # 31/01/2020
-)
+log = logging.getLogger(__name__)
 
 def _parse_date(s: str):
-    if not s:
-        return None
-    s = s.strip()
-    for fmt in DATE_FORMATS:
-        try:
-            return datetime.strptime(s, fmt)
-        except ValueError:
-            continue
-    print(f"[WARN] Could not parse date '{s}'")
-    return None
+    return parse_date(s)
 
 def _total_years(experiences: List[Dict]) -> float:
-    days = 0
-    for e in experiences:
-        start = _parse_date(str(e.get("Start", "")))
-        end = _parse_date(str(e.get("End", ""))) or datetime.utcnow()
-        if start and end and end > start:
-            days += (end - start).days
-    return round(days / 365.25, 2)
+    return total_years(experiences)
 
 def _worked_tier1(experiences: List[Dict]) -> bool:
-    joined = " | ".join([str(e.get("Company", "")) for e in experiences])
-    for brand in TIER1_COMPANIES:
-        if re.search(rf"\b{re.escape(brand)}\b", joined, re.IGNORECASE):
-            return True
-    return False
+    return default_rules().worked_tier1(experiences)
 
 def _location_ok(personal: Dict) -> bool:
-    loc = str(personal.get("Location", ""))
-    for c in SHORTLIST_COUNTRIES:
-        if re.search(rf"\b{re.escape(c)}\b", loc, re.IGNORECASE):
-            return True
-    return False
+    return default_rules().location_ok(personal)
 
 def evaluate_shortlist(compressed: Dict) -> Dict:
-    personal = compressed.get("personal") or {}
-    salary = compressed.get("salary") or {}
-    experiences = compressed.get("experience") or []
-
-    yrs = _total_years(experiences)
-    cond_exp = (yrs >= 4) or _worked_tier1(experiences)
-    cond_comp = float(salary.get("Preferred Rate", 1e9)) <= MAX_RATE_USD and float(salary.get("Availability (hrs/wk)", 0)) >= MIN_AVAIL_HOURS
-    cond_loc = _location_ok(personal)
+    return default_rules().evaluate_batch([compressed])[0]
 
-    meets = all([cond_exp, cond_comp, cond_loc])
+def evaluate_shortlist_batch(profiles: List[Union[Dict, Applicant]]) -> List[Dict]:
+    """Evalúa muchos JSON comprimidos (dicts o models.Applicant) de una vez con las reglas compiladas."""
+    return default_rules().evaluate_batch(profiles)
 
-    reasons = []
-    reasons.append(f"Experience: {yrs} years total; Tier-1: {'yes' if _worked_tier1(experiences) else 'no'}")
-    reasons.append(f"Compensation: Preferred Rate={salary.get('Preferred Rate','N/A')} <= ${MAX_RATE_USD}/h; Availability={salary.get('Availability (hrs/wk)','N/A')} >= {MIN_AVAIL_HOURS} h/wk")
-    reasons.append(f"Location: {personal.get('Location','N/A')} in allowed set: {'yes' if cond_loc else 'no'}")
-
-    return {
-        "meets": meets,
-        "reason": " | ".join(reasons)
-    }
-
-def create_shortlisted_lead(applicant_record_id: str, compressed_json_text: str, score_reason: str):
+def create_shortlisted_lead(applicant_record_id: str, compressed_json_text: str, score_reason: str,
+                            writer: Optional[BatchWriter] = None, on_created: Optional[Callable[[str], None]] = None):
     fields = {
         FIELD_SL_APPLICANT: [applicant_record_id],  # link field expects array of rec IDs
         FIELD_SL_JSON: compressed_json_text,
         FIELD_SL_REASON: score_reason,
     }
-    print(f"[INFO] Creating Shortlisted Lead for {applicant_record_id}")
-    print(f"[DEBUG] Payload enviado a Airtable ({TABLE_SHORTLIST}): {fields}")
+    log.debug(f"[SHORTLIST] Creating Shortlisted Lead for {applicant_record_id}")
+    log.debug(f"[SHORTLIST] Payload enviado a Airtable ({TABLE_SHORTLIST}): {fields}")
+
+    if writer is not None:
+        writer.create(TABLE_SHORTLIST, fields, on_created=on_created)
+        return
 
     try:
-        create_record(TABLE_SHORTLIST, fields)
+        rec = create_record(TABLE_SHORTLIST, fields)
     except Exception as e:
-        print(f"[ERROR] Airtable rejected record for {applicant_record_id}: {e}")
+        log.error(f"[ERROR] Airtable rejected record for {applicant_record_id}: {e}")
         raise
-
-def run_shortlist():
-    print("\n=== Running Shortlist Evaluation ===")
-    applicants = list_records(TABLE_APPLICANTS)
+    if on_created is not None:
+        on_created(rec["id"])
+
+class ShortlistIndex:
+    """Shortlisted Leads existentes indexados por record ID del Applicant vinculado.
+
+    Permite upserts idempotentes: solo se crea, actualiza o borra un lead cuando cambia
+    el veredicto, el reason o el JSON, y los duplicados de runs anteriores se eliminan.
+    """
+
+    def __init__(self, leads: List[Dict], writer: BatchWriter):
+        self.writer = writer
+        self.counts = {"created": 0, "updated": 0, "unchanged": 0, "deleted": 0}
+        self._by_applicant: Dict[str, List[Dict]] = {}
+        self._lock = threading.Lock()
+        for lead in leads:
+            for applicant_rec_id in lead.get("fields", {}).get(FIELD_SL_APPLICANT) or []:
+                self._by_applicant.setdefault(applicant_rec_id, []).append(lead)
+
+    @classmethod
+    def load(cls, writer: BatchWriter, applicant_id: Optional[str] = None,
+             list_fn: Callable[..., List[Dict]] = list_records) -> "ShortlistIndex":
+        """Carga todos los leads (o solo los de un Applicant ID) en una sola pasada."""
+        fields = [FIELD_SL_APPLICANT, FIELD_SL_JSON, FIELD_SL_REASON]
+        if applicant_id and list_fn is list_records:
+            leads = list_fn(TABLE_SHORTLIST, filter_formula=f"{{{FIELD_SL_APPLICANT}}} = '{applicant_id}'", fields=fields)
+        else:
+            leads = list_fn(TABLE_SHORTLIST, fields=fields)
+        return cls(leads, writer)
+
+    def _create(self, applicant_record_id: str, lead: Dict):
+        def created(record_id: str):
+            with self._lock:
+                lead["id"] = record_id
+
+        fields = lead["fields"]
+        create_shortlisted_lead(applicant_record_id, fields[FIELD_SL_JSON], fields[FIELD_SL_REASON],
+                                writer=self.writer, on_created=created)
+
+    def _lead_id(self, lead: Dict) -> Optional[str]:
+        """Record ID del lead; si se creó en este run y su create sigue en la cola del writer, lo envía primero."""
+        if lead["id"] is None and lead.get("pending"):
+            self.writer.flush()
+            with self._lock:
+                # Still None on a dry run or when the create failed
+                lead["pending"] = False
+        return lead["id"]
+
+    def upsert(self, applicant_record_id: str, compressed_json_text: str, score_reason: str):
+        wanted = {FIELD_SL_JSON: compressed_json_text, FIELD_SL_REASON: score_reason}
+        with self._lock:
+            existing = self._by_applicant.get(applicant_record_id, [])
+            keep, extras = (existing[0], existing[1:]) if existing else (None, [])
+            if keep is None:
+                action = "created"
+            elif any(keep.get("fields", {}).get(k) != v for k, v in wanted.items()):
+                action = "updated"
+            else:
+                action = "unchanged"
+            # The same dict stays in the index, so a create still in flight fills in its ID
+            lead = keep if keep is not None else {"id": None, "pending": True}
+            lead["fields"] = {FIELD_SL_APPLICANT: [applicant_record_id], **wanted}
+            self._by_applicant[applicant_record_id] = [lead]
+            self.counts[action] += 1
+            self.counts["deleted"] += len([e for e in extras if e["id"]])
+
+        if action == "created":
+            self._create(applicant_record_id, lead)
+        elif action == "updated":
+            lead_id = self._lead_id(lead)
+            if lead_id:
+                log.debug(f"[SHORTLIST] Updating Shortlisted Lead {lead_id} for {applicant_record_id}")
+                self.writer.update(TABLE_SHORTLIST, lead_id, wanted)
+            elif not self.writer.dry_run:
+                # Its create never reached Airtable: create it with the new fields instead
+                with self._lock:
+                    lead["pending"] = True
+                self._create(applicant_record_id, lead)
+        for extra in extras:
+            if extra["id"]:
+                self.writer.delete(TABLE_SHORTLIST, extra["id"])
+
+    def remove(self, applicant_record_id: str):
+        with self._lock:
+            existing = self._by_applicant.pop(applicant_record_id, [])
+        for lead in existing:
+            # A lead created earlier in this run has an ID only once its create was sent
+            lead_id = self._lead_id(lead)
+            if lead_id:
+                with self._lock:
+                    self.counts["deleted"] += 1
+                log.debug(f"[SHORTLIST] Removing Shortlisted Lead {lead_id} for {applicant_record_id}")
+                self.writer.delete(TABLE_SHORTLIST, lead_id)
+
+    def apply(self, applicant_record_id: str, verdict: Dict, compressed_json_text: str):
+        if verdict["meets"]:
+            self.upsert(applicant_record_id, compressed_json_text, verdict["reason"])
+        else:
+            self.remove(applicant_record_id)
+
+    def summary(self) -> str:
+        return ", ".join(f"{v} {k}" for k, v in self.counts.items())
+
+def run_shortlist(source: str = "airtable", snapshot_path: Optional[str] = None):
+    log.info("=== Running Shortlist Evaluation ===")
+    list_fn = list_records
+    applicants_fn: Callable[..., Iterable[Dict]] = iter_records
+    # Only the Compressed JSON is read, and Airtable drops the applicants that have none
+    has_json: Optional[str] = f"NOT({{{FIELD_COMPRESSED_JSON}}} = '')"
+    if source == "snapshot":
+        # Reads from the local snapshot; verdicts are reported but nothing is written
+        from .snapshot import open_snapshot
+        list_fn = applicants_fn = open_snapshot(snapshot_path or SNAPSHOT_PATH).list_records
+        has_json = None
+    applicants = applicants_fn(TABLE_APPLICANTS, filter_formula=has_json, fields=[FIELD_COMPRESSED_JSON])
+    with BatchWriter(dry_run=(source == "snapshot")) as writer:
+        index = ShortlistIndex.load(writer, list_fn=list_fn)
+        _shortlist_records(applicants, index)
+    log.info(f"[SHORTLIST] Shortlisted Leads: {index.summary()}")
+    if writer.dry_run:
+        log.info(f"[SHORTLIST] Dry run, writes not sent: {writer.skipped}")
+    log.info("=== Done ===")
+
+def _shortlist_records(applicants: Iterable[Dict], index: ShortlistIndex):
+    parsed = []
     for rec in applicants:
         rec_id = rec["id"]
         fields = rec.get("fields", {})
@@ -107,18 +182,24 @@ def run_shortlist():
         if not json_text:
             continue
         try:
-            compressed = json.loads(json_text)
+            # Slotted model with interned strings and parsed dates: much smaller than the dict per applicant
+            parsed.append((rec_id, json_text, Applicant.from_json(json_text)))
         except Exception as e:
-            print(f"[WARN] Invalid JSON for Applicant {rec_id}: {e}")
+            log.warning(f"[WARN] Invalid JSON for Applicant {rec_id}: {e}")
             continue
 
-        result = evaluate_shortlist(compressed)
-        if result["meets"]:
-            create_shortlisted_lead(rec_id, json_text, result["reason"])
-        else:
-            print(f"[INFO] Applicant {rec_id} not shortlisted. Reason: {result['reason']}")
-
-    print("=== Done ===")
+    results = evaluate_shortlist_batch([compressed for _, _, compressed in parsed])
+    for (rec_id, json_text, _), result in zip(parsed, results):
+        if not result["meets"]:
+            log.debug(f"[SHORTLIST] Applicant {rec_id} not shortlisted. Reason: {result['reason']}")
+        index.apply(rec_id, result, json_text)
 
 if __name__ == "__main__":
-    run_shortlist()
+    import argparse
+    parser = argparse.ArgumentParser(description="Upsert Shortlisted Leads from stored Compressed JSON.")
+    parser.add_argument("--source", choices=("airtable", "snapshot"), default="airtable")
+    parser.add_argument("--snapshot-path", default=SNAPSHOT_PATH)
+    args = parser.parse_args()
+    from .log import setup_logging
+    setup_logging()
+    run_shortlist(source=args.source, snapshot_path=args.snapshot_path)
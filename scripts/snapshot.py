@@ -0,0 +1,123 @@
+import argparse
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+from .config import (
+    TABLE_APPLICANTS, TABLE_PERSONAL, TABLE_EXPERIENCE, TABLE_SALARY, TABLE_SHORTLIST,
+    FIELD_APPLICANT_ID, FIELD_SL_APPLICANT, SNAPSHOT_PATH
+)
+from .airtable_client import iter_records
+from .log import setup_logging
+
+log = logging.getLogger(__name__)
+
+ALL_TABLES = (TABLE_APPLICANTS, TABLE_PERSONAL, TABLE_SALARY, TABLE_EXPERIENCE, TABLE_SHORTLIST)
+
+_EQ_APPLICANT_ID = re.compile(r"^\{(?P<field>[^}]+)\}\s*=\s*'(?P<value>[^']*)'$")
+
+
+def _applicant_key(table_name: str, fields: Dict) -> Optional[str]:
+    """Clave de búsqueda por applicant: el Applicant ID en Applicants, el record ID vinculado en las demás."""
+    if table_name == TABLE_APPLICANTS:
+        value = fields.get(FIELD_APPLICANT_ID)
+        return str(value) if value is not None else None
+    link_field = FIELD_SL_APPLICANT if table_name == TABLE_SHORTLIST else FIELD_APPLICANT_ID
+    linked = fields.get(link_field) or []
+    return linked[0] if linked else None
+
+
+class SnapshotStore:
+    """Copia local (SQLite) de las cinco tablas, con la misma interfaz de lectura que airtable_client."""
+
+    def __init__(self, path: str = SNAPSHOT_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " tbl TEXT NOT NULL, id TEXT NOT NULL, applicant_key TEXT, fields TEXT NOT NULL,"
+            " seq INTEGER NOT NULL, PRIMARY KEY (tbl, id))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS records_applicant ON records(tbl, applicant_key)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._conn.commit()
+
+    def write_table(self, table_name: str, records: Iterable[Dict]) -> int:
+        self._conn.execute("DELETE FROM records WHERE tbl = ?", (table_name,))
+        rows = [
+            (table_name, r["id"], _applicant_key(table_name, r.get("fields", {})),
+             json.dumps(r.get("fields", {}), ensure_ascii=False, separators=(",", ":")), seq)
+            for seq, r in enumerate(records)
+        ]
+        self._conn.executemany(
+            "INSERT INTO records (tbl, id, applicant_key, fields, seq) VALUES (?, ?, ?, ?, ?)", rows
+        )
+        self._conn.commit()
+        return len(rows)
+
+    def set_meta(self, key: str, value: str):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+        self._conn.commit()
+
+    def meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _rows(self, sql: str, params) -> List[Dict]:
+        return [{"id": rid, "fields": json.loads(fields)} for rid, fields in self._conn.execute(sql, params)]
+
+    def list_records(self, table_name: str, filter_formula: Optional[str] = None,
+                     fields: Optional[List[str]] = None, page_size: int = 100) -> List[Dict]:
+        """Mismo contrato que airtable_client.list_records; solo entiende filtros {Applicant ID} = '...'."""
+        if filter_formula:
+            m = _EQ_APPLICANT_ID.match(filter_formula)
+            if not m or table_name != TABLE_APPLICANTS:
+                raise ValueError(f"Snapshot source does not support filterByFormula: {filter_formula}")
+            out = self._rows("SELECT id, fields FROM records WHERE tbl = ? AND applicant_key = ? ORDER BY seq",
+                             (table_name, m["value"]))
+        else:
+            out = self._rows("SELECT id, fields FROM records WHERE tbl = ? ORDER BY seq", (table_name,))
+        if fields:
+            out = [{**r, "fields": {k: v for k, v in r["fields"].items() if k in fields}} for r in out]
+        return out
+
+    def close(self):
+        self._conn.close()
+
+
+def export_snapshot(path: str = SNAPSHOT_PATH) -> SnapshotStore:
+    """Descarga las cinco tablas de Airtable (una pasada paginada por tabla) al archivo local."""
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    store = SnapshotStore(path)
+    for table_name in ALL_TABLES:
+        t0 = time.perf_counter()
+        n = store.write_table(table_name, iter_records(table_name))
+        log.info(f"[SNAPSHOT] {table_name}: {n} records in {time.perf_counter() - t0:.1f}s")
+    store.set_meta("exported_at", time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+    log.info(f"[SNAPSHOT] Saved to {path}")
+    return store
+
+
+def open_snapshot(path: str = SNAPSHOT_PATH) -> SnapshotStore:
+    if not os.path.exists(path):
+        raise RuntimeError(f"No snapshot at {path}; run `python -m scripts.snapshot` first")
+    store = SnapshotStore(path)
+    log.info(f"[SNAPSHOT] Reading from {path} (exported {store.meta('exported_at') or 'unknown'})")
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export all five Airtable tables to a local snapshot.")
+    parser.add_argument("--path", default=SNAPSHOT_PATH, help=f"SQLite file to write (default: {SNAPSHOT_PATH})")
+    args = parser.parse_args()
+    setup_logging()
+    export_snapshot(args.path).close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,505 @@
+import argparse
+import base64
+import calendar
+import hashlib
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Set
+
+import requests
+
+from .config import (
+    AIRTABLE_BASE_ID, TABLE_APPLICANTS, TABLE_PERSONAL, TABLE_EXPERIENCE, TABLE_SALARY,
+    FIELD_APPLICANT_ID, FIELD_COMPRESSED_JSON, FIELD_SHORTLIST_STATUS, FIELD_LLM_SUMMARY, FIELD_LLM_SCORE,
+    FIELD_LLM_FOLLOWUPS, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PUBLIC_URL, WEBHOOK_STATE_PATH,
+    WEBHOOK_DEBOUNCE_SECONDS, WEBHOOK_MAX_DELAY_SECONDS, WEBHOOK_POLL_SECONDS, JOB_MAX_ATTEMPTS, LOG_LEVEL
+)
+from .airtable_client import BatchWriter, base_request
+from .incremental import list_applicants_by_id
+from .llm_cache import CACHE_MODES, LLMCache
+from .llm_policy import EvaluationPolicy
+from .log import setup_logging
+from .metrics import get_metrics
+from .run_all import APPLICANT_FIELDS, process_applicant_record
+
+log = logging.getLogger(__name__)
+
+# Applicants columns the pipeline writes; edits touching only these never trigger a reprocess
+_OUTPUT_FIELDS = (FIELD_COMPRESSED_JSON, FIELD_SHORTLIST_STATUS, FIELD_LLM_SUMMARY, FIELD_LLM_SCORE,
+                  FIELD_LLM_FOLLOWUPS)
+
+# Airtable expires webhooks 7 days after creation or the last refresh
+_REFRESH_EVERY_SECONDS = 24 * 3600
+
+
+def _parse_ts(value: str) -> Optional[float]:
+    try:
+        return calendar.timegm(time.strptime(value[:19], "%Y-%m-%dT%H:%M:%S"))
+    except (TypeError, ValueError):
+        return None
+
+
+def load_state(path: str = WEBHOOK_STATE_PATH) -> Dict:
+    """Webhook en uso: {"webhook_id", "mac_secret", "cursor"}; vacío si todavía no se creó."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state: Dict, path: str = WEBHOOK_STATE_PATH):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+class Debouncer:
+    """Junta ráfagas de cambios por applicant.
+
+    Un applicant sale `debounce` segundos después de su último cambio, y nunca más de
+    `max_delay` después del primero (para que una edición continua no lo posponga siempre).
+    """
+
+    def __init__(self, debounce: float = WEBHOOK_DEBOUNCE_SECONDS, max_delay: float = WEBHOOK_MAX_DELAY_SECONDS):
+        self.debounce = debounce
+        self.max_delay = max(max_delay, debounce)
+        self._first: Dict[str, float] = {}
+        self._last: Dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._first)
+
+    def add(self, rec_ids: Iterable[str], now: float):
+        for rid in rec_ids:
+            self._first.setdefault(rid, now)
+            self._last[rid] = now
+
+    def _due(self, rid: str) -> float:
+        return min(self._last[rid] + self.debounce, self._first[rid] + self.max_delay)
+
+    def next_due(self) -> Optional[float]:
+        return min((self._due(rid) for rid in self._first), default=None)
+
+    def pop_due(self, now: float) -> List[str]:
+        due = [rid for rid in self._first if self._due(rid) <= now]
+        for rid in due:
+            del self._first[rid], self._last[rid]
+        return due
+
+
+class BaseSchema:
+    """IDs de tablas y campos (los payloads de webhooks no traen nombres), vía la API de metadata."""
+
+    def __init__(self, tables: List[Dict]):
+        by_name = {t["name"]: t for t in tables}
+
+        def field_ids(table_name: str, names: Iterable[str]) -> Set[str]:
+            fields = by_name.get(table_name, {}).get("fields", [])
+            return {f["id"] for f in fields if f["name"] in names}
+
+        self.applicants_id = by_name.get(TABLE_APPLICANTS, {}).get("id")
+        self.output_field_ids = field_ids(TABLE_APPLICANTS, _OUTPUT_FIELDS)
+        # Child table ID -> ID of its link field to Applicants
+        self.link_field_by_table: Dict[str, str] = {}
+        for name in (TABLE_PERSONAL, TABLE_SALARY, TABLE_EXPERIENCE):
+            table = by_name.get(name)
+            links = field_ids(name, (FIELD_APPLICANT_ID,))
+            if table and links:
+                self.link_field_by_table[table["id"]] = next(iter(links))
+        if not self.applicants_id:
+            raise RuntimeError(f"Table {TABLE_APPLICANTS!r} not found in base {AIRTABLE_BASE_ID}")
+
+    @classmethod
+    def fetch(cls) -> "BaseSchema":
+        # Needs the schema.bases:read scope on the token
+        resp = base_request("GET", f"meta/bases/{AIRTABLE_BASE_ID}/tables", "meta")
+        return cls(resp.json().get("tables", []))
+
+
+def _linked_ids(cells: Optional[Dict], link_field_id: str) -> Set[str]:
+    """Record IDs de Applicants en el link de una fila hija ([{"id", "name"}] o lista de IDs)."""
+    out = set()
+    for item in (cells or {}).get(link_field_id) or []:
+        rid = item.get("id") if isinstance(item, dict) else item
+        if rid:
+            out.add(rid)
+    return out
+
+
+class ChangeTracker:
+    """Traduce payloads de webhook a los record IDs de Applicants afectados.
+
+    Recuerda el applicant de cada fila hija vista, para atribuir también sus borrados
+    (un payload de borrado solo trae el record ID de la fila).
+    """
+
+    def __init__(self, schema: BaseSchema):
+        self.schema = schema
+        self._child_links: Dict[str, Set[str]] = {}
+        self.unattributed = 0
+
+    def affected(self, payload: Dict) -> Set[str]:
+        out: Set[str] = set()
+        for table_id, changes in (payload.get("changedTablesById") or {}).items():
+            if table_id == self.schema.applicants_id:
+                out.update((changes.get("createdRecordsById") or {}).keys())
+                for rid, change in (changes.get("changedRecordsById") or {}).items():
+                    changed = set((change.get("current") or {}).get("cellValuesByFieldId") or {})
+                    # Our own Compressed JSON / LLM writes come back as payloads too
+                    if changed - self.schema.output_field_ids:
+                        out.add(rid)
+                for rid in changes.get("destroyedRecordIds") or []:
+                    out.discard(rid)
+                continue
+            link = self.schema.link_field_by_table.get(table_id)
+            if link is None:
+                continue
+            for rid, created in (changes.get("createdRecordsById") or {}).items():
+                linked = _linked_ids(created.get("cellValuesByFieldId"), link)
+                self._child_links[rid] = linked
+                out.update(linked)
+            for rid, change in (changes.get("changedRecordsById") or {}).items():
+                now_linked: Set[str] = set()
+                for part in ("current", "unchanged"):
+                    now_linked |= _linked_ids((change.get(part) or {}).get("cellValuesByFieldId"), link)
+                # A row moved to another applicant affects both
+                before = _linked_ids((change.get("previous") or {}).get("cellValuesByFieldId"), link)
+                linked = now_linked or self._child_links.get(rid, set())
+                self._child_links[rid] = linked
+                out.update(linked | before)
+            for rid in changes.get("destroyedRecordIds") or []:
+                linked = self._child_links.pop(rid, None)
+                if linked:
+                    out.update(linked)
+                else:
+                    self.unattributed += 1
+                    log.debug(f"[PUSH] Deleted row {rid} of {table_id} cannot be traced to an applicant")
+        return out
+
+
+class _ReceiverHandler(BaseHTTPRequestHandler):
+    daemon: "PushDaemon"
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # noqa: A002 - requests are logged by the daemon
+        pass
+
+    def _reply(self, status: int, body: Dict):
+        raw = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def do_GET(self):
+        # Health check
+        self._reply(200, {"pending": self.daemon.pending, "cursor": self.daemon.state.get("cursor")})
+
+    def do_POST(self):
+        raw = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if not self.daemon.verify(raw, self.headers.get("X-Airtable-Content-MAC", "")):
+            get_metrics().inc("webhook_pings_total", result="bad_mac")
+            log.warning("[PUSH] Rejected a notification with an invalid MAC")
+            return self._reply(401, {"error": "invalid MAC"})
+        get_metrics().inc("webhook_pings_total", result="ok")
+        # The ping carries no data: the daemon loop lists the new payloads from its cursor
+        self.daemon.wake()
+        self._reply(200, {})
+
+
+class PushDaemon:
+    """Procesa applicants a medida que cambian, a partir de los webhooks de Airtable.
+
+    Un receptor HTTP recibe los pings, el loop principal pide los payloads desde el cursor
+    guardado, los traduce a applicants afectados, los agrupa con el Debouncer y corre
+    process_applicant_record solo sobre esos. El cursor se guarda cuando no queda nada
+    pendiente, así un reinicio retoma sin perder cambios (a lo sumo repite alguno).
+    """
+
+    def __init__(self, host: str = WEBHOOK_HOST, port: int = WEBHOOK_PORT,
+                 public_url: Optional[str] = WEBHOOK_PUBLIC_URL, state_path: str = WEBHOOK_STATE_PATH,
+                 debounce: float = WEBHOOK_DEBOUNCE_SECONDS, max_delay: float = WEBHOOK_MAX_DELAY_SECONDS,
+                 poll_seconds: float = WEBHOOK_POLL_SECONDS, workers: int = 1, llm_cache_mode: str = "use"):
+        self.host = host
+        self.port = port
+        self.public_url = public_url
+        self.state_path = state_path
+        self.poll_seconds = poll_seconds
+        self.workers = max(workers, 1)
+        self.state = load_state(state_path)
+        self.debouncer = Debouncer(debounce, max_delay)
+        self.llm_cache = LLMCache(mode=llm_cache_mode) if llm_cache_mode != "bypass" else None
+        # Same gating as run_all; applicants arrive one at a time, so there is no run budget to rank against
+        self.policy = EvaluationPolicy(token_budget=0)
+        self.tracker: Optional[ChangeTracker] = None
+        self._edited_at: Dict[str, float] = {}
+        # Failed processing attempts per applicant, cleared once it goes through
+        self._attempts: Dict[str, int] = {}
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._last_fetch = 0.0
+        self._last_refresh = 0.0
+        self._saved_cursor = self.state.get("cursor")
+
+    @property
+    def pending(self) -> int:
+        return len(self.debouncer)
+
+    # --- receiver -----------------------------------------------------
+    def start_receiver(self) -> int:
+        """Levanta el receptor de pings en un thread; devuelve el puerto (útil con port=0)."""
+        handler = type("Handler", (_ReceiverHandler,), {"daemon": self})
+        self._server = ThreadingHTTPServer((self.host, self.port), handler)
+        self._server.daemon_threads = True
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="webhook-receiver", daemon=True).start()
+        log.info(f"[PUSH] Listening for Airtable notifications on {self.host}:{self.port}")
+        return self.port
+
+    def verify(self, raw: bytes, mac_header: str) -> bool:
+        secret = self.state.get("mac_secret")
+        if not secret:
+            return True
+        expected = "hmac-sha256=" + hmac.new(base64.b64decode(secret), raw, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(expected, mac_header)
+
+    def wake(self):
+        self._wakeup.set()
+
+    def stop(self):
+        self._stop.set()
+        self._wakeup.set()
+
+    # --- webhook lifecycle --------------------------------------------
+    def _hooks_path(self, suffix: str = "") -> str:
+        return f"bases/{AIRTABLE_BASE_ID}/webhooks" + suffix
+
+    def ensure_webhook(self, schema: BaseSchema, recreate: bool = False):
+        """Reusa el webhook guardado o crea uno que incluye el link de las filas hijas en cada payload."""
+        if self.state.get("webhook_id") and recreate:
+            try:
+                base_request("DELETE", self._hooks_path(f"/{self.state['webhook_id']}"), "webhooks")
+            except requests.HTTPError as e:
+                log.warning(f"[PUSH] Could not delete webhook {self.state['webhook_id']}: {e}")
+            self.state = {}
+        if self.state.get("webhook_id"):
+            return
+        spec: Dict = {"options": {
+            "filters": {"dataTypes": ["tableData"]},
+            "includes": {"includeCellValuesInFieldIds": sorted(schema.link_field_by_table.values()),
+                         "includePreviousCellValues": True},
+        }}
+        body: Dict = {"specification": spec}
+        if self.public_url:
+            body["notificationUrl"] = self.public_url
+        else:
+            log.warning("[PUSH] WEBHOOK_PUBLIC_URL not set: no pings, payloads are only polled")
+        hook = base_request("POST", self._hooks_path(), "webhooks", json=body).json()
+        self.state = {"webhook_id": hook["id"], "mac_secret": hook.get("macSecretBase64"), "cursor": 1}
+        save_state(self.state, self.state_path)
+        self._saved_cursor = 1
+        log.info(f"[PUSH] Created webhook {hook['id']} (expires {hook.get('expirationTime')})")
+
+    def refresh(self):
+        base_request("POST", self._hooks_path(f"/{self.state['webhook_id']}/refresh"), "webhooks", json={})
+        self._last_refresh = time.monotonic()
+
+    # --- payloads -----------------------------------------------------
+    def fetch(self) -> int:
+        """Lista los payloads nuevos desde el cursor y encola sus applicants; devuelve cuántos payloads leyó."""
+        self._last_fetch = time.monotonic()
+        metrics = get_metrics()
+        count = 0
+        while True:
+            path = self._hooks_path(f"/{self.state['webhook_id']}/payloads")
+            data = base_request("GET", path, "webhooks", params={"cursor": self.state["cursor"]}).json()
+            now = time.monotonic()
+            for payload in data.get("payloads", []):
+                affected = self.tracker.affected(payload)
+                edited = _parse_ts(payload.get("timestamp", "")) or time.time()
+                for rid in affected:
+                    self._edited_at.setdefault(rid, edited)
+                self.debouncer.add(affected, now)
+                count += 1
+            self.state["cursor"] = data.get("cursor", self.state["cursor"])
+            if not data.get("mightHaveMore"):
+                break
+        metrics.inc("webhook_payloads_total", count)
+        if count:
+            log.debug(f"[PUSH] {count} payloads, {self.pending} applicants pending")
+        return count
+
+    def process(self, rec_ids: List[str]) -> List[str]:
+        """Corre las etapas de run_all sobre estos applicants; sin cambios en el Compressed JSON no escribe nada.
+
+        Devuelve los record IDs a reintentar: los que fallaron, o todos si falló un batch de escritura
+        (puede llevar escrituras de cualquiera de ellos).
+        """
+        metrics = get_metrics()
+        recs = list_applicants_by_id(sorted(rec_ids), fields=APPLICANT_FIELDS)
+        log.info(f"[PUSH] Processing {len(recs)} changed applicants")
+        failed: List[str] = []
+
+        def one(rec: Dict):
+            try:
+                with metrics.stage("applicant"):
+                    process_applicant_record(rec, writer=writer, llm_cache=self.llm_cache, skip_unchanged=True,
+                                             policy=self.policy)
+            except Exception as e:
+                metrics.inc("applicants_total", outcome="failed")
+                log.error(f"[PUSH] Applicant {rec['fields'].get(FIELD_APPLICANT_ID)} failed: {e}")
+                failed.append(rec["id"])
+
+        with BatchWriter() as writer:
+            if self.workers > 1 and len(recs) > 1:
+                with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="applicant") as pool:
+                    list(pool.map(one, recs))
+            else:
+                for rec in recs:
+                    one(rec)
+        if writer.failed_sends:
+            log.error(f"[PUSH] {writer.failed_sends} Airtable write batches failed, "
+                      f"retrying all {len(rec_ids)} applicants")
+            return list(rec_ids)
+        done = time.time()
+        for rid in rec_ids:
+            if rid in failed:
+                continue
+            self._attempts.pop(rid, None)
+            edited = self._edited_at.pop(rid, None)
+            if edited is not None:
+                # Edit in Airtable -> fields written back
+                metrics.observe("push_latency_seconds", max(done - edited, 0.0))
+        return failed
+
+    def _save_cursor(self):
+        if self.state.get("cursor") != self._saved_cursor:
+            save_state(self.state, self.state_path)
+            self._saved_cursor = self.state["cursor"]
+
+    def run_forever(self, recreate: bool = False):
+        schema = BaseSchema.fetch()
+        self.tracker = ChangeTracker(schema)
+        self.ensure_webhook(schema, recreate=recreate)
+        self.refresh()
+        log.info(f"[PUSH] Webhook {self.state['webhook_id']}, cursor {self.state['cursor']}")
+        # Catch up with whatever changed while the daemon was down
+        self.fetch()
+        while not self._stop.is_set():
+            now = time.monotonic()
+            next_due = self.debouncer.next_due()
+            wait = self._last_fetch + self.poll_seconds - now
+            if next_due is not None:
+                wait = min(wait, next_due - now)
+            if self._wakeup.wait(timeout=max(wait, 0.0)):
+                self._wakeup.clear()
+                if self._stop.is_set():
+                    break
+                self._fetch_safely()
+            elif time.monotonic() - self._last_fetch >= self.poll_seconds:
+                self._fetch_safely()
+            due = self.debouncer.pop_due(time.monotonic())
+            if due:
+                self._process_safely(due)
+            if not self.pending:
+                # Everything up to the cursor has been processed
+                self._save_cursor()
+            if time.monotonic() - self._last_refresh >= _REFRESH_EVERY_SECONDS:
+                self._refresh_safely()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.llm_cache is not None:
+            self.llm_cache.close()
+
+    def _fetch_safely(self):
+        try:
+            self.fetch()
+        except requests.HTTPError as e:
+            if e.response is not None and e.response.status_code == 404:
+                # Expired or deleted: changes made in between are in no payload
+                log.error("[PUSH] Webhook is gone; creating a new one. Run `python -m scripts.run_all "
+                          "--incremental` once to pick up changes made in between")
+                self.state = {}
+                self.ensure_webhook(self.tracker.schema)
+            else:
+                log.error(f"[PUSH] Listing payloads failed, retrying on the next poll: {e}")
+        except requests.RequestException as e:
+            log.error(f"[PUSH] Listing payloads failed, retrying on the next poll: {e}")
+
+    def _process_safely(self, due: List[str]):
+        try:
+            retry = self.process(due)
+        except requests.RequestException as e:
+            log.error(f"[PUSH] Processing {len(due)} applicants failed: {e}")
+            retry = due
+        if retry:
+            self._retry(retry)
+
+    def _retry(self, rec_ids: List[str]):
+        # Back into the debouncer: retried once the debounce delay has passed again, so the
+        # cursor is not saved past them. Up to JOB_MAX_ATTEMPTS, then given up like a dead letter
+        again = []
+        for rid in rec_ids:
+            self._attempts[rid] = self._attempts.get(rid, 0) + 1
+            if self._attempts[rid] < JOB_MAX_ATTEMPTS:
+                again.append(rid)
+            else:
+                del self._attempts[rid]
+                self._edited_at.pop(rid, None)
+                get_metrics().inc("applicants_total", outcome="dead")
+                log.error(f"[PUSH] Giving up on applicant {rid} after {JOB_MAX_ATTEMPTS} attempts; run "
+                          "`python -m scripts.run_all --incremental` once it can be processed again")
+        if again:
+            log.warning(f"[PUSH] Retrying {len(again)} applicants in {self.debouncer.debounce}s")
+            self.debouncer.add(again, time.monotonic())
+
+    def _refresh_safely(self):
+        try:
+            self.refresh()
+        except requests.RequestException as e:
+            log.error(f"[PUSH] Refreshing the webhook failed, retrying on the next poll: {e}")
+            # Due again one poll interval from now, well before the webhook expires
+            self._last_refresh = time.monotonic() - _REFRESH_EVERY_SECONDS + self.poll_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process applicants as they change, from Airtable webhooks.")
+    parser.add_argument("--host", default=WEBHOOK_HOST)
+    parser.add_argument("--port", type=int, default=WEBHOOK_PORT)
+    parser.add_argument("--public-url", default=WEBHOOK_PUBLIC_URL,
+                        help="URL Airtable posts notifications to (reaches --host:--port)")
+    parser.add_argument("--debounce", type=float, default=WEBHOOK_DEBOUNCE_SECONDS)
+    parser.add_argument("--max-delay", type=float, default=WEBHOOK_MAX_DELAY_SECONDS)
+    parser.add_argument("--poll", type=float, default=WEBHOOK_POLL_SECONDS)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--llm-cache", choices=CACHE_MODES, default="use")
+    parser.add_argument("--recreate", action="store_true", help="Delete the saved webhook and create a new one")
+    parser.add_argument("--log-level", default=LOG_LEVEL, choices=("DEBUG", "INFO", "WARNING", "ERROR"))
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+
+    daemon = PushDaemon(host=args.host, port=args.port, public_url=args.public_url, debounce=args.debounce,
+                        max_delay=args.max_delay, poll_seconds=args.poll, workers=args.workers,
+                        llm_cache_mode=args.llm_cache)
+    daemon.start_receiver()
+    try:
+        daemon.run_forever(recreate=args.recreate)
+    except KeyboardInterrupt:
+        log.info("[PUSH] Stopped")
+
+
+if __name__ == "__main__":
+    main()
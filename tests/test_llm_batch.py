@@ -0,0 +1,35 @@
+from scripts import codec, llm_batch
+
+PROFILE = {
+    "personal": {"Full Name": "Ana Pérez", "Location": "Madrid, Spain"},
+    # Repetitive enough for zlib to pay off
+    "experience": [{"Company": "Google", "Title": "Software Engineer", "Start": f"{2000 + i}-01-01",
+                    "End": f"{2000 + i}-12-31", "Technologies": "Python, Go, Kubernetes"} for i in range(20)],
+    "salary": {"Preferred Rate": 80, "Currency": "USD"},
+}
+
+
+def test_batch_prompt_expands_zlib_profiles():
+    stored = codec.encode(PROFILE, encoding="zlib", zlib_min_chars=0)
+    assert stored.startswith(codec.ZLIB_PREFIX)
+
+    prompt = llm_batch.build_batch_prompt([("0001", stored)])
+
+    assert codec.ZLIB_PREFIX not in prompt
+    assert codec.plain_json(stored) in prompt
+    assert "Ana Pérez" in prompt
+
+
+def test_call_llm_batch_sends_readable_json(monkeypatch):
+    monkeypatch.setattr(llm_batch, "LLM_PROMPT_FORMAT", "json")
+    stored = codec.encode(PROFILE, encoding="zlib", zlib_min_chars=0)
+    prompts = []
+
+    def complete_fn(prompt, max_tokens):
+        prompts.append(prompt)
+        return '[{"applicant_id": "0001", "summary": "Solid engineer.", "score": 8, "issues": [], "followups": []}]'
+
+    results, errors = llm_batch.call_llm_batch([("0001", stored)], batch_size=10, complete_fn=complete_fn)
+
+    assert not errors and results["0001"]["score"] == 8
+    assert codec.ZLIB_PREFIX not in prompts[0] and "Ana Pérez" in prompts[0]